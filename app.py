@@ -1,13 +1,14 @@
 import os
+import copy
 import json
 import asyncio
 import logging
 import tempfile
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.responses import Response
@@ -17,8 +18,13 @@ import aiofiles
 from prompt import get_comprehensive_prompt
 from context_data_injector import get_dynamic_context
 from huntflow_local_client import HuntflowLocalClient
-from chart_data_processor import process_chart_data
-from enhanced_metrics_calculator import EnhancedMetricsCalculator
+from chart_data_processor import (process_chart_data, process_chart_only, iter_report_records, validate_report_json,
+                                  process_report_batch, process_reports, ChartProcessingError)
+from report_cache import report_cache_key, report_etag, etag_matches
+from enhanced_metrics_calculator import shared_calculator
+from query_profiler import profiling, current_profile
+from table_engine import get_table, TablePageError, DEFAULT_PAGE_SIZE
+from export import EXPORT_FORMATS, ExportError, check_format, chart_rows, record_rows, export_stream, content_disposition
 
 # LangGraph imports
 from typing import Annotated, TypedDict
@@ -88,7 +94,7 @@ groq_client = ChatGroq(
 
 # Initialize local Huntflow client and metrics calculator
 hf_client = HuntflowLocalClient()
-metrics_calc = EnhancedMetricsCalculator(hf_client, None)
+metrics_calc = shared_calculator(hf_client)
 
 # ==================== LangGraph Components ====================
 
@@ -308,6 +314,12 @@ class TranscriptionResponse(BaseModel):
     error: Optional[str] = None
 
 
+class ExportRequest(BaseModel):
+    report: Dict[str, Any]
+    format: str = "csv"
+    records: bool = False  # the filtered records behind the chart instead of the chart result
+
+
 def validate_json_response(response_content: str) -> tuple[bool, str]:
     """Basic JSON validation"""
     try:
@@ -466,9 +478,14 @@ async def chat_stream(
     message: str,
     thread_id: Optional[str] = None,
     model: Optional[str] = "deepseek",
-    temperature: Optional[float] = 0.1
+    temperature: Optional[float] = 0.1,
+    debug: Optional[bool] = False
 ):
-    """SSE streaming chat endpoint powered by LangGraph"""
+    """SSE streaming chat endpoint powered by LangGraph
+    
+    With debug=true a 'profile' event (filter/chart stages, cardinalities, timings,
+    access paths, cache hits) is sent before 'complete' and logged as a query_profile record.
+    """
     import time
     
     async def generate_stream():
@@ -563,6 +580,12 @@ async def chat_stream(
                     
                     processed_count = len(current_messages)
             
+            # Debug mode: how the report's filters and charts were evaluated
+            profile = current_profile()
+            if profile is not None:
+                profile_data = {"type": "profile", "profile": profile.to_dict()}
+                yield f"data: {json.dumps(profile_data, ensure_ascii=False, default=str)}\n\n"
+            
             # Send completion signal
             completion_data = {
                 "type": "complete",
@@ -575,8 +598,13 @@ async def chat_stream(
             error_data = {"type": "error", "message": str(e)}
             yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
     
+    async def generate_profiled_stream():
+        with profiling(f"chat-stream {thread_id or ''}".strip()):
+            async for chunk in generate_stream():
+                yield chunk
+    
     return StreamingResponse(
-        generate_stream(),
+        generate_profiled_stream() if debug else generate_stream(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -733,6 +761,126 @@ async def prefetch_data():
         return {"status": "error", "message": str(e)}
 
 
+# Direct report API: processed reports for known specs, without the LLM
+@app.post("/api/report")
+async def direct_report(request: Request, body: Union[Dict[str, Any], List[Dict[str, Any]]] = Body(...)):
+    """Process a report JSON, or a list of them, and return the results (a list for a list).
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified without processing."""
+    specs = body if isinstance(body, list) else [body]
+    if not specs:
+        raise HTTPException(status_code=400, detail="No reports")
+    for i, spec in enumerate(specs):
+        try:
+            validate_report_json(copy.deepcopy(spec))
+        except ChartProcessingError as e:
+            prefix = f"Report {i}: " if isinstance(body, list) else ""
+            raise HTTPException(status_code=400, detail=f"{prefix}{e}")
+    
+    data_version = hf_client.data_version()
+    etag = report_etag([report_cache_key(spec, data_version) for spec in specs])
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if isinstance(body, list):
+        # Lists share scans and sub-queries like /api/report/batch, collected in request order
+        content = await process_reports(specs, hf_client)
+        if any("error" in report for report in content):
+            # Failed reports are retried on the next request, not revalidated
+            headers = {"Cache-Control": "no-store"}
+    else:
+        content = await process_chart_data(body, hf_client)
+    return Response(content=json.dumps(content, ensure_ascii=False, default=str),
+                    media_type="application/json", headers=headers)
+
+
+# Batch of reports (dashboard tiles), streamed as they complete
+@app.post("/api/report/batch")
+async def report_batch(body: List[Dict[str, Any]] = Body(...)):
+    """Process many report JSONs with shared scans; one NDJSON line per report, in completion order:
+    {"index": i, "report": {...}} or {"index": i, "error": "..."} for an invalid spec or a failed report."""
+    errors = {}
+    for i, spec in enumerate(body):
+        try:
+            validate_report_json(copy.deepcopy(spec))
+        except ChartProcessingError as e:
+            errors[i] = str(e)
+    valid = [i for i in range(len(body)) if i not in errors]
+    
+    async def lines():
+        for i, error in errors.items():
+            yield json.dumps({"index": i, "error": error}, ensure_ascii=False) + "\n"
+        async for j, report in process_report_batch([body[i] for i in valid], hf_client):
+            if "error" in report:
+                yield json.dumps({"index": valid[j], "error": report["error"]}, ensure_ascii=False) + "\n"
+            else:
+                yield json.dumps({"index": valid[j], "report": report}, ensure_ascii=False, default=str) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# Further pages of a rendered table
+@app.get("/api/table-page")
+async def table_page(table_id: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                     sort_by: str = "count", order: str = "desc"):
+    """Next page of a table chart from its stored rows, without re-running the report."""
+    table = get_table(table_id)
+    if table is None:
+        raise HTTPException(status_code=404, detail="Table not found or expired, re-run the report")
+    try:
+        return table.page(limit, sort_by=sort_by, order=order, cursor=cursor)
+    except TablePageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def export_response(fmt: str, columns: List[str], rows, title: Optional[str]) -> StreamingResponse:
+    """Streamed file download; rows are encoded chunk by chunk while the response is sent"""
+    return StreamingResponse(
+        export_stream(fmt, columns, rows),
+        media_type=EXPORT_FORMATS[fmt][0],
+        headers={"Content-Disposition": content_disposition(title, fmt)}
+    )
+
+
+# Export of a rendered table from its stored rows
+@app.get("/api/export/table/{table_id}")
+async def export_table(table_id: str, format: str = "csv", sort_by: str = "count", order: str = "desc"):
+    """All rows of a table chart as CSV, XLSX or Parquet, without re-running the report."""
+    table = get_table(table_id)
+    if table is None:
+        raise HTTPException(status_code=404, detail="Table not found or expired, re-run the report")
+    try:
+        check_format(format)
+        rows = table.sorted_rows(sort_by, order)
+    except (ExportError, TablePageError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return export_response(format, [column["key"] for column in table.columns], rows, table.entity)
+
+
+# Export of a report chart, or of the records behind it
+@app.post("/api/export")
+async def export_report(request: ExportRequest):
+    """Re-run the chart of a report and stream its result (or its filtered records) as a file."""
+    try:
+        check_format(request.format)
+        title = request.report.get("report_title")
+        if request.records:
+            fields, records = await iter_report_records(request.report, hf_client)
+            columns, rows = record_rows(records, fields)
+            return export_response(request.format, columns, rows, title)
+        
+        chart_data = await process_chart_only(request.report, hf_client)
+        # Tables keep all their rows in the table store; the chart result only holds the first page
+        table = get_table((chart_data.get("metadata") or {}).get("table_id") or "")
+        if table is not None:
+            return export_response(request.format, [column["key"] for column in table.columns],
+                                   table.sorted_rows(), title)
+        columns, rows = chart_rows(chart_data)
+        return export_response(request.format, columns, rows, title)
+    except (ExportError, ChartProcessingError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # Database info endpoint
 @app.get("/db-info")
 async def database_info():
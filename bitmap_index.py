@@ -0,0 +1,166 @@
+"""
+Bitmap Index - per-dimension bitsets over the log store
+Every log gets a row number in ingest order; each dimension value maps to the
+rows carrying it, kept as a Python int bitset. AND/OR/NOT of filter conditions
+become integer &, |, & ~ and only the final bitset is materialized into logs.
+"""
+
+from typing import Dict, List, Any, Optional, Callable, Iterable
+from datetime import datetime
+import logging
+
+from log_store import log_vacancy_id
+
+logger = logging.getLogger(__name__)
+
+# Dimension -> key of a log for that dimension (the fields the filter engine reads)
+DIMENSIONS = ('type', 'recruiter', 'source', 'vacancy', 'stage', 'division', 'month')
+
+_MISSING = object()
+
+
+def rows_to_bitmap(rows: List[int]) -> int:
+    """Bitset of ascending row numbers, built in O(rows + span / 8)"""
+    if not rows:
+        return 0
+    low = rows[0]
+    buffer = bytearray(((rows[-1] - low) >> 3) + 1)
+    for row in rows:
+        offset = row - low
+        buffer[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(buffer, 'little') << low
+
+
+def bitmap_rows(bitmap: int) -> List[int]:
+    """Row numbers of the set bits, ascending"""
+    rows = []
+    bits = bin(bitmap)[:1:-1]  # Least significant bit first
+    row = bits.find('1')
+    while row != -1:
+        rows.append(row)
+        row = bits.find('1', row + 1)
+    return rows
+
+
+def month_key(created: Any) -> Optional[str]:
+    """'YYYY-MM' of an ISO timestamp string, None when it doesn't look like one"""
+    if isinstance(created, str) and len(created) >= 19 and created[4] == '-' and created[10] == 'T':
+        return created[:7]
+    return None
+
+
+def month_bounds(key: str) -> Optional[tuple]:
+    """[start, next month start) of a 'YYYY-MM' key"""
+    try:
+        year, month = int(key[:4]), int(key[5:7])
+        start = datetime(year, month, 1)
+    except ValueError:
+        return None
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+class LogBitmapIndex:
+    """Bitsets per dimension value over logs in ingest order, fed by LogStore.subscribe"""
+
+    def __init__(self, division_of_vacancy: Optional[Callable[[Any], Any]] = None):
+        self.division_of_vacancy = division_of_vacancy or (lambda vacancy_id: None)
+        self.rows: List[Dict[str, Any]] = []
+        self.version = 0
+        self._sorted = True
+        self._last_created = ''
+        # dimension -> value -> ascending row numbers
+        self._postings: Dict[str, Dict[Any, List[int]]] = {dimension: {} for dimension in DIMENSIONS}
+        # Dimensions with a value that can't be a dict key; those fall back to predicates
+        self.unindexable = set()
+        self._bitmaps: Dict[tuple, int] = {}
+
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> None:
+        """Append logs as new rows (LogStore listener)"""
+        for log in logs:
+            row = len(self.rows)
+            self.rows.append(log)
+
+            created = log.get('created') or ''
+            if created < self._last_created:
+                self._sorted = False
+            else:
+                self._last_created = created
+
+            account_info = log.get('account_info', {})
+            keys = {
+                'type': log.get('type'),
+                'recruiter': account_info.get('id') if isinstance(account_info, dict) else _MISSING,
+                'source': log.get('source'),
+                'vacancy': log.get('vacancy_id'),
+                'stage': log.get('status_id'),
+                'division': self.division_of_vacancy(log_vacancy_id(log)),
+                'month': month_key(log.get('created'))
+            }
+            for dimension, key in keys.items():
+                if key is _MISSING:
+                    continue
+                try:
+                    self._postings[dimension].setdefault(key, []).append(row)
+                except TypeError:
+                    self.unindexable.add(dimension)
+
+        self._bitmaps.clear()
+        self.version += 1
+
+    @property
+    def universe(self) -> int:
+        """Bitset of every row"""
+        return (1 << len(self.rows)) - 1
+
+    def keys(self, dimension: str) -> List[Any]:
+        return list(self._postings[dimension])
+
+    def bitmap(self, dimension: str, key: Any) -> int:
+        """Rows whose dimension value equals key"""
+        cache_key = (dimension, key)
+        bitmap = self._bitmaps.get(cache_key)
+        if bitmap is None:
+            bitmap = rows_to_bitmap(self._postings[dimension].get(key, []))
+            self._bitmaps[cache_key] = bitmap
+        return bitmap
+
+    def match(self, dimension: str, predicate: Callable[[Any], bool]) -> int:
+        """OR of the bitmaps of every dimension value the predicate accepts"""
+        result = 0
+        for key in self._postings[dimension]:
+            if predicate(key):
+                result |= self.bitmap(dimension, key)
+        return result
+
+    def cardinality(self, dimension: str, predicate: Callable[[Any], bool]) -> int:
+        """Number of rows match() would return, counted from posting lengths"""
+        return sum(len(rows) for key, rows in self._postings[dimension].items() if predicate(key))
+
+    def match_rows(self, predicate: Callable[[Dict[str, Any]], bool], within: Optional[int] = None) -> int:
+        """Bitset of rows (optionally limited to a bitset) accepted by an item predicate"""
+        rows = range(len(self.rows)) if within is None else bitmap_rows(within)
+        return rows_to_bitmap([row for row in rows if predicate(self.rows[row])])
+
+    def period(self, start: datetime, end: datetime, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Rows in [start, end): whole months are taken from the month bitmaps, boundary months
+        and rows without a month key (key None) are checked with the in-memory period predicate"""
+        result = 0
+        partial = 0
+        for key in self._postings['month']:
+            bounds = month_bounds(key) if key else None
+            if bounds is None:
+                partial |= self.bitmap('month', key)
+            elif start <= bounds[0] and bounds[1] <= end:
+                result |= self.bitmap('month', key)
+            elif bounds[1] > start and bounds[0] < end:
+                partial |= self.bitmap('month', key)
+
+        return result | self.match_rows(predicate, partial) if partial else result
+
+    def materialize(self, bitmap: int) -> List[Dict[str, Any]]:
+        """Logs of the set bits, in the log store's (created, ingest) order"""
+        logs = [self.rows[row] for row in bitmap_rows(bitmap)]
+        if not self._sorted:
+            logs.sort(key=lambda x: x.get('created') or '')
+        return logs
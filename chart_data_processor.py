@@ -4,12 +4,21 @@ Improved with better error handling, validation, and maintainability
 """
 
 import logging
-from typing import Dict, Any, List, Optional, TypedDict, Union, Callable
+from typing import Dict, Any, List, Optional, TypedDict, Union, Callable, Tuple, Iterable, AsyncIterator
 from collections import Counter
 from functools import wraps
+from contextlib import nullcontext
 from huntflow_local_client import HuntflowLocalClient
-from enhanced_metrics_calculator import EnhancedMetricsCalculator
-from universal_chart_processor import process_chart_via_universal_engine
+from enhanced_metrics_calculator import EnhancedMetricsCalculator, shared_calculator
+from universal_chart_processor import UniversalChartProcessor, process_chart_via_universal_engine
+from universal_filter import PeriodFilter
+from time_series import TIME_UNITS
+from field_catalog import resolve_measure, UnknownMeasureError
+from report_executor import report_execution, current_executor, shared_query, query_key
+from report_planner import ReportPlanner, AggregateQuery, chart_query_key
+from report_cache import get_report_cache, report_cache_key
+from table_engine import get_table
+from query_profiler import current_profile
 import asyncio
 
 # Removed old entity configuration system - now using Universal Chart Processor
@@ -24,6 +33,9 @@ OPERATION_KEY = "operation"
 COUNT_OPERATION = "count"
 SUM_OPERATION = "sum"
 AVG_OPERATION = "avg"
+MEDIAN_OPERATION = "median"
+P90_OPERATION = "p90"
+DATE_TRUNC_OPERATION = "date_trunc"
 
 # Default values
 DEFAULT_CONVERSION_RATE = 6.3
@@ -219,6 +231,14 @@ def _validate_chart_section(chart: Any) -> None:
     if not isinstance(y_axis[ENTITY_KEY], str):
         raise ChartProcessingError("Entity must be a string")
     
+    # Every chart evaluates its y_axis operation; scatter charts evaluate their x_axis too
+    axis_keys = ("x_axis", "y_axis") if chart_type == "scatter" else ("y_axis",)
+    for axis_key in axis_keys:
+        axis = chart.get(axis_key)
+        if isinstance(axis, dict) and isinstance(axis.get(ENTITY_KEY), str):
+            _validate_measure({**axis, OPERATION_KEY: axis.get(OPERATION_KEY) or COUNT_OPERATION},
+                              f"Chart {axis_key}")
+    
     # Validate group_by if present
     if "group_by" in y_axis and y_axis["group_by"] is not None:
         group_by = y_axis["group_by"]
@@ -271,9 +291,15 @@ def _validate_metrics_filter(metrics_filter: Any) -> None:
         raise ChartProcessingError("metrics_filter.period is required")
     
     period = metrics_filter["period"]
-    valid_periods = {"year", "6 month", "3 month", "1 month", "2 weeks", "this week", "today"}
-    if period not in valid_periods:
-        raise ChartProcessingError(f"period must be one of: {', '.join(valid_periods)}")
+    if not isinstance(period, str):
+        raise ChartProcessingError("metrics_filter.period must be a string")
+    try:
+        PeriodFilter.resolve_days(period)
+    except ValueError as e:
+        raise ChartProcessingError(
+            f"Invalid period '{period}': {e}. Use 'today', 'yesterday', '[N] day|week|month|quarter|year', "
+            "'this|last week|month|quarter|year' or 'YYYY-MM-DD..YYYY-MM-DD'"
+        )
     
     # Validate optional entity filters
     valid_entity_filters = {
@@ -332,16 +358,30 @@ def _validate_metrics_query(query: Dict[str, Any], context: str = "Metrics query
         raise ChartProcessingError(f"{context} operation must be a string")
     
     # Check if operation is valid
-    valid_operations = {COUNT_OPERATION, SUM_OPERATION, AVG_OPERATION, "date_trunc"}
+    valid_operations = {COUNT_OPERATION, SUM_OPERATION, AVG_OPERATION, MEDIAN_OPERATION, P90_OPERATION, DATE_TRUNC_OPERATION}
     if operation not in valid_operations:
         raise ChartProcessingError(f"{context} operation must be one of: {', '.join(valid_operations)}")
     
+    # date_trunc is optional (month by default) and must be a known time unit
+    if query.get(DATE_TRUNC_OPERATION) is not None and query[DATE_TRUNC_OPERATION] not in TIME_UNITS:
+        raise ChartProcessingError(f"{context} date_trunc must be one of: {', '.join(TIME_UNITS)}")
+    
     # Filters are no longer required - using centralized metrics_filter
     
     # value_field is optional
     if "value_field" in query and query["value_field"] is not None:
         if not isinstance(query["value_field"], str):
             raise ChartProcessingError(f"{context} value_field must be a string or null")
+    
+    _validate_measure(query, context)
+
+
+def _validate_measure(query: Dict[str, Any], context: str) -> None:
+    """Aggregations must name a measure the entity declares (see field_catalog)."""
+    try:
+        resolve_measure(query[ENTITY_KEY], query[OPERATION_KEY], query.get("value_field"))
+    except UnknownMeasureError as e:
+        raise ChartProcessingError(f"{context}: {e}")
 
 
 # Removed old method whitelist system - Universal Chart Processor handles all requests
@@ -359,6 +399,24 @@ def normalize_group_by(group_by_obj: Optional[Union[GroupByConfig, str]]) -> Opt
     return None
 
 
+async def chart_query(calc: EnhancedMetricsCalculator, entity: str, operation: str = "count",
+                      group_by: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                      value_field: Optional[str] = None, chart_type: str = "bar",
+                      date_trunc: Optional[str] = None) -> Dict[str, Any]:
+    """Universal engine query, evaluated once per report for identical parameters"""
+    key = chart_query_key(entity, operation, group_by, filters, value_field, chart_type, date_trunc)
+    return await shared_query(key, lambda: process_chart_via_universal_engine(
+        entity=entity,
+        operation=operation,
+        group_by=group_by,
+        filters=filters,
+        calc=calc,
+        value_field=value_field,
+        chart_type=chart_type,
+        date_trunc=date_trunc
+    ))
+
+
 async def get_scatter_chart_data(x_axis_config: dict, y_axis_config: dict, calc: EnhancedMetricsCalculator, filters: Optional[Dict[str, Any]] = None) -> ChartData:
     """Get data for scatter charts using Universal Chart Processor."""
     try:
@@ -366,6 +424,7 @@ async def get_scatter_chart_data(x_axis_config: dict, y_axis_config: dict, calc:
         x_entity = x_axis_config.get(ENTITY_KEY, "")
         x_group_by = normalize_group_by(x_axis_config.get("group_by"))
         x_operation = x_axis_config.get("operation", "count")
+        x_value_field = x_axis_config.get("value_field")
         
         y_entity = y_axis_config.get(ENTITY_KEY, "")
         y_group_by = normalize_group_by(y_axis_config.get("group_by"))
@@ -374,22 +433,10 @@ async def get_scatter_chart_data(x_axis_config: dict, y_axis_config: dict, calc:
         
         logger.info(f"Scatter chart: X={x_entity}:{x_group_by}:{x_operation}, Y={y_entity}:{y_group_by}:{y_operation}")
         
-        # Use Universal Chart Processor for both axes
-        x_data = await process_chart_via_universal_engine(
-            entity=x_entity,
-            operation=x_operation,
-            group_by=x_group_by,
-            filters=filters,
-            calc=calc
-        )
-        
-        y_data = await process_chart_via_universal_engine(
-            entity=y_entity,
-            operation=y_operation,
-            group_by=y_group_by,
-            filters=filters,
-            calc=calc,
-            value_field=y_value_field
+        # Use Universal Chart Processor for both axes, evaluated concurrently
+        x_data, y_data = await asyncio.gather(
+            chart_query(calc, x_entity, x_operation, x_group_by, filters, value_field=x_value_field),
+            chart_query(calc, y_entity, y_operation, y_group_by, filters, value_field=y_value_field)
         )
         
         # Check for errors
@@ -434,19 +481,23 @@ async def get_scatter_chart_data(x_axis_config: dict, y_axis_config: dict, calc:
 
 
 async def get_entity_data(entity: str, group_by: Optional[str], calc: EnhancedMetricsCalculator, 
-                         filters: Optional[Dict[str, Any]] = None, chart_type: str = "bar") -> ChartData:
+                         filters: Optional[Dict[str, Any]] = None, chart_type: str = "bar",
+                         operation: str = COUNT_OPERATION, value_field: Optional[str] = None,
+                         date_trunc: Optional[str] = None) -> ChartData:
     """Get data for an entity using Universal Chart Processor - handles any entity/grouping combination"""
     try:
         # Use Universal Chart Processor for all requests
         logger.info(f"Processing chart request via Universal Engine: entity={entity}, group_by={group_by}, chart_type={chart_type}")
         
-        result = await process_chart_via_universal_engine(
-            entity=entity,
-            operation="count",  # Default operation for charts
+        result = await chart_query(
+            calc,
+            entity,
+            operation=operation,  # count, an aggregation of value_field, or date_trunc for time series
             group_by=group_by,
             filters=filters,
-            calc=calc,
-            chart_type=chart_type
+            value_field=value_field,
+            chart_type=chart_type,
+            date_trunc=date_trunc
         )
         
         # Add round_chart_values for consistency only for non-table charts
@@ -460,74 +511,214 @@ async def get_entity_data(entity: str, group_by: Optional[str], calc: EnhancedMe
         return create_error_response(f"Failed to process {entity} chart data")
 
 
-async def process_chart_data(report_json: ReportJson, client: HuntflowLocalClient) -> ReportJson:
+def chart_operation(chart_type: str, y_axis_config: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+    """(operation, value_field, date_trunc) of a bar/line/table chart: the y_axis operation over its
+    value_field; date_trunc charts count records per time bucket (tables list records, so they always count)"""
+    if chart_type == "table":
+        return COUNT_OPERATION, None, None
+    operation = y_axis_config.get(OPERATION_KEY) or COUNT_OPERATION
+    if operation == DATE_TRUNC_OPERATION:
+        return DATE_TRUNC_OPERATION, None, y_axis_config.get(DATE_TRUNC_OPERATION)
+    return operation, y_axis_config.get("value_field"), None
+
+
+def report_queries(report_json: ReportJson) -> List[AggregateQuery]:
+    """Engine queries the chart, main metric and secondary metrics of a report will run,
+    with the same parameters their sections pass to chart_query."""
+    filters = report_json.get("metrics_filter", {})
+    queries = []
+    
+    chart = report_json.get("chart")
+    if isinstance(chart, dict):
+        chart_type = chart.get("type", "bar")
+        y_axis_config = chart.get("y_axis", {})
+        if chart_type == "scatter":
+            x_axis_config = chart.get("x_axis", {})
+            for slot, axis in (("chart.x_axis", x_axis_config), ("chart.y_axis", y_axis_config)):
+                queries.append(AggregateQuery(
+                    slot, axis.get(ENTITY_KEY, ""), axis.get("operation", "count"),
+                    normalize_group_by(axis.get("group_by")), filters, axis.get("value_field")
+                ))
+        else:
+            operation, value_field, date_trunc = chart_operation(chart_type, y_axis_config)
+            queries.append(AggregateQuery(
+                "chart", y_axis_config.get(ENTITY_KEY, ""), operation,
+                normalize_group_by(y_axis_config.get("group_by")), filters, value_field,
+                chart_type=chart_type, date_trunc=date_trunc
+            ))
+    
+    metrics = []
+    if isinstance(report_json.get("main_metric"), dict):
+        metrics.append(("main_metric", report_json["main_metric"].get("value", {})))
+    if isinstance(report_json.get("secondary_metrics"), list):
+        metrics.extend((f"secondary_metrics[{i}]", metric.get("value", {}))
+                       for i, metric in enumerate(report_json["secondary_metrics"]))
+    for slot, value_config in metrics:
+        operation = value_config.get(OPERATION_KEY, COUNT_OPERATION)
+        value_field = value_config.get("value_field")
+        if value_field == "conversion":
+            continue  # Computed by the calculator, not through chart_query
+        queries.append(AggregateQuery(
+            slot, value_config.get(ENTITY_KEY, ""), operation, metric_group_by(operation, filters), filters,
+            value_field, date_trunc=value_config.get(DATE_TRUNC_OPERATION)
+        ))
+    
+    return queries
+
+
+async def plan_report(report_json: ReportJson, calc: EnhancedMetricsCalculator) -> None:
+    """Compute the fusable queries of the report in one scan per record stream and hand the
+    results to the active report executor, so the sections find them already computed."""
+    await plan_reports([report_json], calc)
+
+
+async def plan_reports(report_jsons: List[ReportJson], calc: EnhancedMetricsCalculator) -> None:
+    """plan_report for several reports at once: one scan per record stream across all of them"""
+    executor = current_executor()
+    if executor is None:
+        return
+    queries = []
+    for i, report_json in enumerate(report_jsons):
+        for query in report_queries(report_json):
+            if len(report_jsons) > 1:
+                query.slot = f"{i}:{query.slot}"
+            queries.append(query)
+    planner = ReportPlanner(calc)
+    results = await planner.execute(planner.plan(queries))
+    for key, result in results.items():
+        executor.prefill(key, result)
+
+
+async def process_chart_section(report_json: ReportJson, calc: EnhancedMetricsCalculator) -> None:
+    """Fetch real data for the report chart."""
+    chart = report_json["chart"]
+    chart_type = chart.get("type", "bar")
+    
+    # Use centralized metrics_filter for charts (same as metrics)
+    filters = report_json.get("metrics_filter", {})
+    
+    # Still need y_axis_config for entity and group_by information
+    y_axis_config = chart.get("y_axis", {})
+    
+    try:
+        # Handle different chart types
+        if chart_type == "scatter":
+            x_axis_config = chart.get("x_axis", {})
+            y_axis_config = chart.get("y_axis", {})
+            
+            real_data = await get_scatter_chart_data(x_axis_config, y_axis_config, calc, filters)
+        elif chart_type == "table":
+            # Handle table charts - tables don't need x/y axis, just entity and filters
+            # Use y_axis as the primary data source for consistency
+            entity = y_axis_config.get(ENTITY_KEY, "")
+            group_by = normalize_group_by(y_axis_config.get("group_by"))
+            
+            real_data = await get_entity_data(entity, group_by, calc, filters, chart_type="table")
+        else:
+            # Handle regular bar/line charts
+            entity = y_axis_config.get(ENTITY_KEY, "")
+            group_by = normalize_group_by(y_axis_config.get("group_by"))
+            
+            operation, value_field, date_trunc = chart_operation(chart_type, y_axis_config)
+            
+            real_data = await get_entity_data(entity, group_by, calc, filters, chart_type=chart_type,
+                                              operation=operation, value_field=value_field, date_trunc=date_trunc)
+        
+        # Add title from chart label or description if not set
+        if not real_data.get("title"):
+            real_data["title"] = chart.get("label", chart.get("graph_description", "Chart"))
+        
+        # Update the report with real data
+        report_json["chart"]["real_data"] = real_data
+        
+    except ChartProcessingError as e:
+        logger.error(f"Chart processing error for {chart_type} chart: {e}")
+        report_json["chart"]["real_data"] = create_error_response(str(e))
+
+
+async def process_chart_data(report_json: ReportJson, client: HuntflowLocalClient,
+                             use_cache: bool = True) -> ReportJson:
     """
     Process report JSON and fetch actual data for charts.
     
+    Processed reports are cached by their spec, the data version and the day (see report_cache),
+    so a repeated question is answered without computing anything. Profiled requests always compute.
+    
     Args:
         report_json: The report JSON from OpenAI
         client: HuntflowLocalClient instance
+        use_cache: Look up and store the processed report in the report cache
         
     Returns:
         Updated report JSON with real_data populated
     """
+    if not use_cache or not isinstance(report_json, dict) or current_profile() is not None:
+        return await _process_report(report_json, client)
+    
+    cache = get_report_cache()
+    key = report_cache_key(report_json, client.data_version())
+    cached = cache.get(key)
+    if cached is not None:
+        if _table_pages_available(cached):
+            logger.info("Report served from the report cache")
+            return cached
+        # The rows behind its table are gone from the table store, so paging would fail
+        cache.discard(key)
+    return await cache.get_or_compute(key, lambda: _process_report(report_json, client), cacheable=_is_cacheable)
+
+
+def _table_pages_available(report_json: ReportJson) -> bool:
+    table_id = ((report_json.get("chart") or {}).get("real_data") or {}).get("metadata", {}).get("table_id")
+    return table_id is None or get_table(table_id) is not None
+
+
+def _is_cacheable(report_json: ReportJson) -> bool:
+    """Reports whose chart failed are not cached, so the next request retries"""
+    real_data = (report_json.get("chart") or {}).get("real_data") or {}
+    return real_data.get("labels") != [ERROR_LABEL]
+
+
+async def _process_report(report_json: ReportJson, client: HuntflowLocalClient,
+                          calc: Optional[EnhancedMetricsCalculator] = None) -> ReportJson:
+    """
+    Fetch the real data of every section of a report.
+    
+    The chart, the main metric and the secondary metrics are independent, so they are
+    evaluated concurrently; sub-queries they share are evaluated once (see report_executor)
+    and counts over the same records are computed in a single scan (see report_planner).
+    Inside a batch the batch's executor and plan are used instead (see process_report_batch).
+    """
     try:
         # Validate input
         report_json = validate_report_json(report_json)
         
-        # Initialize metrics calculator
-        metrics_calc = EnhancedMetricsCalculator(client, None)
+        # Shared calculator: its log store and indexes persist across requests
+        metrics_calc = calc or shared_calculator(client)
         
+        sections = []
         # Process chart data if present
         if "chart" in report_json:
-            chart = report_json["chart"]
-            chart_type = chart.get("type", "bar")
-            
-            # Use centralized metrics_filter for charts (same as metrics)
-            filters = report_json.get("metrics_filter", {})
-            
-            # Still need y_axis_config for entity and group_by information
-            y_axis_config = chart.get("y_axis", {})
-            
-            try:
-                # Handle different chart types
-                if chart_type == "scatter":
-                    x_axis_config = chart.get("x_axis", {})
-                    y_axis_config = chart.get("y_axis", {})
-                    
-                    real_data = await get_scatter_chart_data(x_axis_config, y_axis_config, metrics_calc, filters)
-                elif chart_type == "table":
-                    # Handle table charts - tables don't need x/y axis, just entity and filters
-                    # Use y_axis as the primary data source for consistency
-                    entity = y_axis_config.get(ENTITY_KEY, "")
-                    group_by = normalize_group_by(y_axis_config.get("group_by"))
-                    
-                    real_data = await get_entity_data(entity, group_by, metrics_calc, filters, chart_type="table")
-                else:
-                    # Handle regular bar/line charts
-                    entity = y_axis_config.get(ENTITY_KEY, "")
-                    group_by = normalize_group_by(y_axis_config.get("group_by"))
-                    
-                    real_data = await get_entity_data(entity, group_by, metrics_calc, filters, chart_type=chart_type)
-                
-                # Add title from chart label or description if not set
-                if not real_data.get("title"):
-                    real_data["title"] = chart.get("label", chart.get("graph_description", "Chart"))
-                
-                # Update the report with real data
-                report_json["chart"]["real_data"] = real_data
-                
-            except ChartProcessingError as e:
-                logger.error(f"Chart processing error for {chart_type} chart: {e}")
-                report_json["chart"]["real_data"] = create_error_response(str(e))
+            sections.append(process_chart_section(report_json, metrics_calc))
         
         # Process main metric if present
         if "main_metric" in report_json:
-            await process_main_metric(report_json, metrics_calc)
+            sections.append(process_main_metric(report_json, metrics_calc))
         
         # Process secondary metrics if present
         if "secondary_metrics" in report_json:
-            await process_secondary_metrics(report_json, metrics_calc)
+            sections.append(process_secondary_metrics(report_json, metrics_calc))
+        
+        in_batch = current_executor() is not None
+        with nullcontext() if in_batch else report_execution():
+            if not in_batch:
+                # Counts sharing a record stream are computed together, before the sections ask for them
+                await plan_report(report_json, metrics_calc)
+            results = await asyncio.gather(*sections, return_exceptions=True)
+        
+        # Sections handle their own errors; anything else goes to the handlers below
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
         
         return report_json
         
@@ -544,35 +735,126 @@ async def process_chart_data(report_json: ReportJson, client: HuntflowLocalClien
         return report_json
 
 
+async def process_report_batch(report_jsons: List[ReportJson],
+                               client: HuntflowLocalClient) -> AsyncIterator[Tuple[int, ReportJson]]:
+    """
+    Process many reports together, yielding (index, processed report) as each one completes.
+    
+    Cached reports come back first. The rest share one calculator and one report executor:
+    counts over the same record stream are computed in a single scan for the whole batch,
+    and sub-queries repeated across reports (the same chart, the same name lookups) run once.
+    A report that fails comes back as {"error": "..."} (not cached) without stopping the others.
+    """
+    cache = get_report_cache()
+    data_version = client.data_version()
+    keys = {}
+    pending = []
+    for i, report_json in enumerate(report_jsons):
+        key = report_cache_key(report_json, data_version)
+        cached = cache.get(key)
+        if cached is not None and _table_pages_available(cached):
+            yield i, cached
+        else:
+            keys[i] = key
+            pending.append(i)
+    if not pending:
+        return
+    
+    metrics_calc = shared_calculator(client)
+    
+    async def evaluate(i: int) -> Tuple[int, ReportJson]:
+        try:
+            return i, await _process_report(report_jsons[i], client, metrics_calc)
+        except Exception as e:
+            logger.error(f"Report {i} of the batch failed: {e}", exc_info=True)
+            return i, {"error": str(e)}
+    
+    # Tasks copy the context on creation, so they keep the batch executor after the block
+    with report_execution():
+        valid = []
+        for i in pending:
+            try:
+                valid.append(validate_report_json(report_jsons[i]))
+            except ChartProcessingError:
+                pass  # _process_report reports it in the result
+        await plan_reports(valid, metrics_calc)
+        tasks = [asyncio.ensure_future(evaluate(i)) for i in pending]
+    
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, report_json = await next_done
+            if "error" not in report_json and _is_cacheable(report_json):
+                cache.put(keys[i], report_json)
+            yield i, report_json
+    finally:
+        # The consumer went away: don't keep computing reports nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+async def process_reports(report_jsons: List[ReportJson], client: HuntflowLocalClient) -> List[ReportJson]:
+    """Processed reports of a batch in input order, with the batch's shared scans (see process_report_batch).
+    A report that failed is {"error": "..."} in its slot."""
+    results: List[Optional[ReportJson]] = [None] * len(report_jsons)
+    async for i, report_json in process_report_batch(report_jsons, client):
+        results[i] = report_json
+    return results
+
+
+async def process_chart_only(report_json: ReportJson, client: HuntflowLocalClient) -> ChartData:
+    """Evaluate only the chart of a report (exports don't need its metrics)."""
+    report_json = validate_report_json(report_json)
+    if "chart" not in report_json:
+        raise ChartProcessingError("Report has no chart")
+    
+    metrics_calc = shared_calculator(client)
+    with report_execution():
+        await process_chart_section(report_json, metrics_calc)
+    return report_json["chart"]["real_data"]
+
+
+async def iter_report_records(report_json: ReportJson, client: HuntflowLocalClient
+                              ) -> Tuple[Optional[List[str]], Iterable[Dict[str, Any]]]:
+    """(fields, records) behind the report chart: its entity under the report's metrics_filter
+    (see UniversalChartProcessor.iter_records)."""
+    report_json = validate_report_json(report_json)
+    entity = report_json.get("chart", {}).get("y_axis", {}).get(ENTITY_KEY)
+    if not entity:
+        raise ChartProcessingError("Report chart has no entity")
+    
+    processor = UniversalChartProcessor(shared_calculator(client))
+    try:
+        return await processor.iter_records(entity, report_json.get("metrics_filter", {}))
+    except ValueError as e:
+        raise ChartProcessingError(str(e))
+
+
 async def resolve_entity_name_by_id(entity_type: str, entity_id: str, calc: EnhancedMetricsCalculator) -> Optional[str]:
-    """Resolve entity name by ID from database."""
+    """Resolve entity name by ID from the calculator's dimension dictionary."""
     try:
-        if entity_type == "recruiters":
-            recruiters = await calc.recruiters_all()
-            for recruiter in recruiters:
-                if str(recruiter.get('id')) == str(entity_id):
-                    return recruiter.get('name')
-        elif entity_type == "sources":
-            sources = await calc.sources_all()
-            for source in sources:
-                if str(source.get('id')) == str(entity_id):
-                    return source.get('name')
-        elif entity_type == "vacancies":
-            vacancies = await calc.vacancies_all()
-            for vacancy in vacancies:
-                if str(vacancy.get('id')) == str(entity_id):
-                    return vacancy.get('position', vacancy.get('name'))
-        elif entity_type == "stages" or entity_type == "statuses":
-            statuses = await calc.statuses_all()
-            for status in statuses:
-                if str(status.get('id')) == str(entity_id):
-                    return status.get('name')
+        return await calc.dimensions.resolve(entity_type, entity_id)
     except Exception as e:
         logger.warning(f"Error resolving {entity_type} name for ID {entity_id}: {e}")
     
     return None
 
 
+async def resolve_filter_names(filters: Dict[str, Any], calc: EnhancedMetricsCalculator) -> Dict[str, str]:
+    """Names of the entities referenced by ID filters, resolved once per report."""
+    async def resolve() -> Dict[str, str]:
+        id_filters = [(filter_key, filter_value) for filter_key, filter_value in filters.items()
+                      if filter_key != "period" and isinstance(filter_value, str) and filter_value.isdigit()]
+        try:
+            names = await calc.dimensions.resolve_many(id_filters)
+        except Exception as e:
+            logger.warning(f"Error resolving filter names: {e}")
+            return {}
+        return {filter_key: names[(filter_key, filter_value)] for filter_key, filter_value in id_filters
+                if (filter_key, filter_value) in names}
+    
+    return await shared_query(query_key("filter_names", filters), resolve)
+
+
 def enhance_metric_label_with_filter_names(original_label: str, filters: Dict[str, Any], resolved_names: Dict[str, str]) -> str:
     """Enhance metric label by appending resolved entity names from filters."""
     if not filters or not resolved_names:
@@ -596,9 +878,11 @@ async def process_main_metric(report_json: ReportJson, calc: EnhancedMetricsCalc
         metric = report_json["main_metric"]["value"]
         entity = metric.get(ENTITY_KEY, "")
         operation = metric.get(OPERATION_KEY, COUNT_OPERATION)
+        value_field = metric.get("value_field")
         filters = report_json.get("metrics_filter", {})  # NEW: Extract from centralized metrics_filter
         
-        real_value = await calculate_main_metric_value(entity, operation, calc, filters)
+        real_value = await calculate_main_metric_value(entity, operation, calc, filters, value_field,
+                                                       metric.get(DATE_TRUNC_OPERATION))
         
         # Always store as aggregated totals only
         if isinstance(real_value, dict):
@@ -615,13 +899,7 @@ async def process_main_metric(report_json: ReportJson, calc: EnhancedMetricsCalc
         
         # Enhance label with resolved entity names from filters
         if filters:
-            resolved_names = {}
-            for filter_key, filter_value in filters.items():
-                if filter_key != "period" and isinstance(filter_value, str) and filter_value.isdigit():
-                    # This looks like an ID filter
-                    entity_name = await resolve_entity_name_by_id(filter_key, filter_value, calc)
-                    if entity_name:
-                        resolved_names[filter_key] = entity_name
+            resolved_names = await resolve_filter_names(filters, calc)
             
             if resolved_names:
                 original_label = report_json["main_metric"].get("label", "")
@@ -643,76 +921,99 @@ async def process_secondary_metrics(report_json: ReportJson, calc: EnhancedMetri
     
     filters = report_json.get("metrics_filter", {})  # NEW: Use shared metrics_filter
     
-    for i, metric in enumerate(report_json["secondary_metrics"]):
-        try:
-            value_config = metric.get("value", {})
-            entity = value_config.get(ENTITY_KEY, "")
-            operation = value_config.get(OPERATION_KEY, COUNT_OPERATION)
-            
-            real_value = await calculate_main_metric_value(entity, operation, calc, filters)
-            
-            # Always store as aggregated totals only (same as main metric)
-            if isinstance(real_value, dict):
-                # Convert grouped data to total only
-                total_value = sum(real_value.values())
-                report_json["secondary_metrics"][i]["real_value"] = total_value
-                report_json["secondary_metrics"][i]["total_value"] = total_value
-            else:
-                # Already aggregated
-                if isinstance(real_value, float):
-                    real_value = round(real_value, 1)
-                report_json["secondary_metrics"][i]["real_value"] = real_value
-                report_json["secondary_metrics"][i]["total_value"] = real_value
-            
-            # Enhance label with resolved entity names from filters
-            if filters:
-                resolved_names = {}
-                for filter_key, filter_value in filters.items():
-                    if filter_key != "period" and isinstance(filter_value, str) and filter_value.isdigit():
-                        # This looks like an ID filter
-                        entity_name = await resolve_entity_name_by_id(filter_key, filter_value, calc)
-                        if entity_name:
-                            resolved_names[filter_key] = entity_name
-                
-                if resolved_names:
-                    original_label = metric.get("label", "")
-                    enhanced_label = enhance_metric_label_with_filter_names(original_label, filters, resolved_names)
-                    report_json["secondary_metrics"][i]["enhanced_label"] = enhanced_label
+    # Metrics are independent: evaluate them concurrently
+    await asyncio.gather(*(
+        process_secondary_metric(report_json, i, metric, calc, filters)
+        for i, metric in enumerate(report_json["secondary_metrics"])
+    ))
+
+
+async def process_secondary_metric(report_json: ReportJson, i: int, metric: Dict[str, Any],
+                                   calc: EnhancedMetricsCalculator, filters: Dict[str, Any]) -> None:
+    """Process a single secondary metric."""
+    entity = ""
+    try:
+        value_config = metric.get("value", {})
+        entity = value_config.get(ENTITY_KEY, "")
+        operation = value_config.get(OPERATION_KEY, COUNT_OPERATION)
+        value_field = value_config.get("value_field")
+        
+        real_value = await calculate_main_metric_value(entity, operation, calc, filters, value_field,
+                                                       value_config.get(DATE_TRUNC_OPERATION))
+        
+        # Always store as aggregated totals only (same as main metric)
+        if isinstance(real_value, dict):
+            # Convert grouped data to total only
+            total_value = sum(real_value.values())
+            report_json["secondary_metrics"][i]["real_value"] = total_value
+            report_json["secondary_metrics"][i]["total_value"] = total_value
+        else:
+            # Already aggregated
+            if isinstance(real_value, float):
+                real_value = round(real_value, 1)
+            report_json["secondary_metrics"][i]["real_value"] = real_value
+            report_json["secondary_metrics"][i]["total_value"] = real_value
+        
+        # Enhance label with resolved entity names from filters
+        if filters:
+            resolved_names = await resolve_filter_names(filters, calc)
             
-        except ChartProcessingError as e:
-            logger.error(f"Secondary metric processing error for index {i}, entity '{entity}': {e}")
-            report_json["secondary_metrics"][i]["real_value"] = 0
-        except (KeyError, TypeError, ValueError) as e:
-            logger.error(f"Data access error in process_secondary_metrics for index {i}: {e}")
-            report_json["secondary_metrics"][i]["real_value"] = 0
+            if resolved_names:
+                original_label = metric.get("label", "")
+                enhanced_label = enhance_metric_label_with_filter_names(original_label, filters, resolved_names)
+                report_json["secondary_metrics"][i]["enhanced_label"] = enhanced_label
+        
+    except ChartProcessingError as e:
+        logger.error(f"Secondary metric processing error for index {i}, entity '{entity}': {e}")
+        report_json["secondary_metrics"][i]["real_value"] = 0
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Data access error in process_secondary_metrics for index {i}: {e}")
+        report_json["secondary_metrics"][i]["real_value"] = 0
+
+
+def metric_group_by(operation: str, filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Grouping inferred for a metric from its filters: a breakdown by recruiters when there
+    are no entity filters. Only counts are grouped: the metric is the sum of the groups, and
+    averages, sums and quantiles of a measure are computed over one ungrouped stream instead."""
+    if filters and operation in (COUNT_OPERATION, DATE_TRUNC_OPERATION):
+        # Find entity filters (excluding period)
+        entity_filters = {k: v for k, v in filters.items() if k != "period" and v is not None}
+        if len(entity_filters) == 0:
+            # No entity filters means we want to show breakdown by the most relevant entity
+            # For now, default to recruiters for general analytics
+            return "recruiters"
+        # If we have specific entity filters, we get aggregated results (no grouping)
+    return None
 
 
 async def calculate_main_metric_value(
     entity: str, 
     operation: str, 
     calc: EnhancedMetricsCalculator, 
-    filters: Optional[Dict[str, Any]] = None
+    filters: Optional[Dict[str, Any]] = None,
+    value_field: Optional[str] = None,
+    date_trunc: Optional[str] = None
 ) -> Union[int, float, Dict[str, Any]]:
     """Calculate main metric value - grouped or aggregated based on filters content."""
+    metrics_group_by = None
     try:
+        # Conversion is a ratio - summing per-group rates is meaningless, use the overall rate
+        if value_field == "conversion":
+            return await shared_query(query_key("conversion_rate", filters),
+                                      lambda: calc.overall_conversion_rate(filters))
+        
         # Determine grouping from filters content
-        metrics_group_by = None
-        if filters:
-            # Find entity filters (excluding period)
-            entity_filters = {k: v for k, v in filters.items() if k != "period" and v is not None}
-            if len(entity_filters) == 0:
-                # No entity filters means we want to show breakdown by the most relevant entity
-                # For now, default to recruiters for general analytics
-                metrics_group_by = "recruiters"
-            # If we have specific entity filters, we get aggregated results (no grouping)
+        metrics_group_by = metric_group_by(operation, filters)
         
         # Use Universal Chart Processor with inferred grouping
-        result = await process_chart_via_universal_engine(
-            entity=entity,
+        result = await chart_query(
+            calc,
+            entity,
             operation=operation,
             group_by=metrics_group_by,  # Use inferred grouping
             filters=filters,
-            calc=calc
+            value_field=value_field,
+            date_trunc=date_trunc
         )
         
         if metrics_group_by:
@@ -726,7 +1027,8 @@ async def calculate_main_metric_value(
         else:
             # Return single aggregated value: 16
             if isinstance(result.get("values"), list) and result["values"]:
-                if operation == COUNT_OPERATION:
+                if operation in (COUNT_OPERATION, DATE_TRUNC_OPERATION):
+                    # date_trunc values are counts per time bucket
                     return sum(result["values"])
                 elif operation == AVG_OPERATION:
                     # For average, return the average of all values
@@ -734,6 +1036,8 @@ async def calculate_main_metric_value(
                     return sum(values) / len(values) if values else 0
                 elif operation == SUM_OPERATION:
                     return sum(result["values"])
+                elif operation in (MEDIAN_OPERATION, P90_OPERATION):
+                    return result["values"][0]
             return 0
         
     except Exception as e:
@@ -5,7 +5,7 @@ Fetches real data from database and injects into prompt context
 
 import asyncio
 from typing import Dict, Any
-from enhanced_metrics_calculator import EnhancedMetricsCalculator
+from enhanced_metrics_calculator import shared_calculator
 from huntflow_local_client import HuntflowLocalClient
 
 async def get_dynamic_context(client: HuntflowLocalClient = None) -> Dict[str, Any]:
@@ -18,7 +18,7 @@ async def get_dynamic_context(client: HuntflowLocalClient = None) -> Dict[str, A
     if client is None:
         client = HuntflowLocalClient()
     
-    metrics_calc = EnhancedMetricsCalculator(client, None)
+    metrics_calc = shared_calculator(client)
     
     try:
         # Fetch ALL core metrics and entities
@@ -27,6 +27,7 @@ async def get_dynamic_context(client: HuntflowLocalClient = None) -> Dict[str, A
         vacancy_states = await metrics_calc.vacancies_by_state()
         applicants_by_status = await metrics_calc.applicants_by_status()
         applicants_by_recruiter = await metrics_calc.applicants_by_recruiter()
+        conversion_totals = (await metrics_calc.conversion_stats())["total"]
         # conversion_rates = await metrics_calc.vacancy_conversion_rates()  # Method not found, temporarily disabled
         
         # Fetch ALL entity lists
@@ -101,8 +102,8 @@ async def get_dynamic_context(client: HuntflowLocalClient = None) -> Dict[str, A
             "top_recruiters": top_recruiters,
             
             # Conversion metrics
-            "overall_conversion_rate": 6.3,  # Temporarily hardcoded until vacancy_conversion_rates method is implemented
-            "total_hires": 9,  # Use actual number from database
+            "overall_conversion_rate": round(conversion_totals["conversion"], 1),
+            "total_hires": conversion_totals["hires"],
             
             # PROMPT-SPECIFIC KEYS (exact match for prompt.py)
             "stages": all_statuses if isinstance(all_statuses, list) else [],
@@ -0,0 +1,109 @@
+"""
+Dimension Dictionary - id -> display name for every entity type
+Names are loaded once per entity type and log store version, then every lookup is a
+dict access. Batch resolution loads each entity type a single time, so labelling a
+report or a table costs one load per dimension instead of a full scan per ID.
+"""
+
+from typing import Dict, Any, Optional, Iterable, Tuple, Callable, Awaitable, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Alternative spellings of entity types
+ENTITY_ALIASES = {
+    "statuses": "stages",
+    "status": "stages",
+    "coworkers": "recruiters"
+}
+
+
+def _names_by_id(items: List[Dict[str, Any]], name_field: str = "name") -> Dict[str, str]:
+    """str(id) -> name; the first item wins when IDs repeat"""
+    names = {}
+    for item in items:
+        name = item.get(name_field)
+        if name:
+            names.setdefault(str(item.get('id')), name)
+    return names
+
+
+class DimensionDictionary:
+    """Versioned id -> display name maps of recruiters, hiring managers, sources, stages,
+    divisions and vacancies"""
+
+    def __init__(self, calc):
+        self.calc = calc
+        # entity -> (log store version, names)
+        self._names: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        self._loaders: Dict[str, Callable[[], Awaitable[Dict[str, str]]]] = {
+            "recruiters": self._coworker_names,
+            "hiring_managers": self._coworker_names,
+            "sources": self._source_names,
+            "stages": self._stage_names,
+            "divisions": self._division_names,
+            "vacancies": self._vacancy_names
+        }
+
+    @property
+    def entities(self) -> List[str]:
+        return list(self._loaders)
+
+    async def names(self, entity: str) -> Dict[str, str]:
+        """str(id) -> display name of an entity type; empty for unknown types (read-only)"""
+        entity = ENTITY_ALIASES.get(entity, entity)
+        loader = self._loaders.get(entity)
+        if loader is None:
+            return {}
+
+        version = self.calc.log_store.version
+        cached = self._names.get(entity)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        try:
+            names = await loader()
+        except Exception as e:
+            # Not cached, so the next lookup retries
+            logger.warning(f"Failed to load {entity} names: {e}")
+            return {}
+        self._names[entity] = (version, names)
+        return names
+
+    async def resolve(self, entity: str, entity_id: Any) -> Optional[str]:
+        """Display name of one entity, None when unknown"""
+        return (await self.names(entity)).get(str(entity_id))
+
+    async def resolve_many(self, refs: Iterable[Tuple[str, Any]]) -> Dict[Tuple[str, str], str]:
+        """Names of (entity, id) pairs, keyed by (entity, str(id)); unknown IDs are left out.
+        Each entity type is loaded once, concurrently with the others"""
+        refs = [(entity, str(entity_id)) for entity, entity_id in refs]
+        entities = list(dict.fromkeys(entity for entity, _ in refs))
+        loaded = dict(zip(entities, await asyncio.gather(*(self.names(entity) for entity in entities))))
+        return {(entity, entity_id): loaded[entity][entity_id]
+                for entity, entity_id in refs if entity_id in loaded[entity]}
+
+    def invalidate(self, entity: Optional[str] = None) -> None:
+        """Drop loaded names (all of them, or one entity type's) so they reload on next use"""
+        if entity is None:
+            self._names.clear()
+        else:
+            self._names.pop(ENTITY_ALIASES.get(entity, entity), None)
+
+    async def _coworker_names(self) -> Dict[str, str]:
+        return _names_by_id(await self.calc.recruiters_all())
+
+    async def _source_names(self) -> Dict[str, str]:
+        return _names_by_id(await self.calc.sources_all())
+
+    async def _stage_names(self) -> Dict[str, str]:
+        return _names_by_id(await self.calc.statuses_all())
+
+    async def _division_names(self) -> Dict[str, str]:
+        return _names_by_id(await self.calc.divisions_all())
+
+    async def _vacancy_names(self) -> Dict[str, str]:
+        """Vacancy positions from the log store index, without building vacancy records"""
+        positions = self.calc.log_store.vacancy_positions
+        return {str(vacancy_id): position for vacancy_id, position in positions.items() if position}
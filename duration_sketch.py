@@ -0,0 +1,135 @@
+"""
+Duration Sketch - mergeable streaming distribution for duration fields
+Log-bucketed histogram (DDSketch-style): every value is counted in a bucket
+whose width is proportional to the value, so quantiles carry a bounded
+relative error without keeping raw values. Sketches of different groups or
+cells merge by adding bucket counts.
+"""
+
+from typing import Dict, List, Optional, Iterable, Tuple
+import math
+
+
+class DurationSketch:
+    """Quantiles, mean and histograms over non-negative durations (days) in O(buckets) memory"""
+
+    # Values below this (about 1.5 minutes in days) are counted as zero
+    MIN_VALUE = 0.001
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], relative_accuracy: float = 0.01) -> 'DurationSketch':
+        """Build a sketch from an iterable in one pass"""
+        sketch = cls(relative_accuracy)
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add a duration; negative values are clamped to zero"""
+        if value is None or count <= 0:
+            return
+        value = max(float(value), 0.0)
+
+        if value < self.MIN_VALUE:
+            self._zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[key] = self._buckets.get(key, 0) + count
+
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'DurationSketch') -> 'DurationSketch':
+        """Merge another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + count
+        self._zero_count += other._zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def _bucket_value(self, key: int) -> float:
+        """Representative value of a bucket (within relative_accuracy of every value in it)"""
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def _sorted_buckets(self) -> List[Tuple[float, int]]:
+        buckets = [(0.0, self._zero_count)] if self._zero_count else []
+        buckets.extend((self._bucket_value(key), self._buckets[key]) for key in sorted(self._buckets))
+        return buckets
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1), clamped to the exact min/max"""
+        if not self.count:
+            return 0.0
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+
+        rank = q * (self.count - 1)
+        seen = 0
+        value = 0.0
+        for value, count in self._sorted_buckets():
+            seen += count
+            if seen > rank:
+                break
+        return min(max(value, self.min), self.max)
+
+    @property
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    @property
+    def p90(self) -> float:
+        return self.quantile(0.9)
+
+    def histogram(self, edges: List[float]) -> Dict[str, int]:
+        """Counts per range for ascending edges, e.g. [10, 30, 60] -> '0-10', '10-30', '30-60', '60+'"""
+        labels = []
+        lower = 0
+        for edge in edges:
+            labels.append(f"{lower:g}-{edge:g}")
+            lower = edge
+        labels.append(f"{lower:g}+")
+
+        counts = {label: 0 for label in labels}
+        for value, count in self._sorted_buckets():
+            index = 0
+            while index < len(edges) and value > edges[index]:
+                index += 1
+            counts[labels[index]] += count
+        return counts
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean, median, p90, min and max of the sketch"""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "median": self.median,
+            "p90": self.p90,
+            "min": self.min if self.min is not None else 0.0,
+            "max": self.max if self.max is not None else 0.0
+        }
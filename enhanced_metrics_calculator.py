@@ -1,12 +1,29 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Sequence, Tuple
 from huntflow_local_client import HuntflowLocalClient
 from universal_filter_engine import UniversalFilterEngine
 from universal_filter import EntityType
+from log_store import LogStore, log_vacancy_id, log_recruiter, HIRED_STATUS_ID
+from funnel_engine import FunnelEngine, funnel_pair_key
+from duration_sketch import DurationSketch
+from bitmap_index import LogBitmapIndex
+from query_profiler import count_cache
+from dimension_dictionary import DimensionDictionary
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Keys of the records built from logs, in record order (export headers are known before the first record)
+APPLICANT_RECORD_FIELDS = ['id', 'first_name', 'last_name', 'email', 'phone', 'created', 'status',
+                           'vacancy_id', 'vacancy_position', 'stage_id', 'stage_name', 'recruiter_id',
+                           'recruiter_name', 'source_id', 'source', 'division_id', 'division_name',
+                           'hiring_manager_id', 'hiring_manager_name', 'money']
+ACTION_RECORD_FIELDS = ['id', 'type', 'created', 'applicant_id', 'vacancy_id', 'status_id', 'raw_data',
+                        'recruiter_id', 'recruiter_name']
+REJECTION_RECORD_FIELDS = ['id', 'applicant_id', 'vacancy_id', 'status_id', 'created', 'rejection_reason',
+                           'rejection_reason_id', 'status_name', 'status_type', 'vacancy_position', 'comment',
+                           'recruiter_id', 'recruiter_name', 'source_id', 'source']
+
 class EnhancedMetricsCalculator:
     """Standalone MetricsCalculator with universal filtering support"""
     
@@ -15,6 +32,24 @@ class EnhancedMetricsCalculator:
         self.log_analyzer = log_analyzer
         self.filter_engine = UniversalFilterEngine(client, log_analyzer, calculator=self)
         self._cached_log_analyzer = None
+        self._log_store = None
+        self._vacancy_info_cache = None
+        self._applicant_money_cache = None
+        self._funnel_engine = None
+        self._bitmap_index = None
+        self._dimensions = None
+        # Filtered status logs keyed by (normalized filter hash, log store version)
+        self._filtered_logs_cache: Dict[Tuple[str, int], Sequence[Dict[str, Any]]] = {}
+    
+    FILTERED_LOGS_CACHE_SIZE = 32
+    
+    def refresh(self) -> None:
+        """Drop data read outside the log store after the database changed. The log store and the
+        indexes subscribed to it are kept: the next sync ingests only the logs they haven't seen"""
+        self._cached_log_analyzer = None
+        self._vacancy_info_cache = None
+        self._applicant_money_cache = None
+        self._dimensions = None
     
     # === Helper Methods ===
     
@@ -114,6 +149,116 @@ class EnhancedMetricsCalculator:
             self._cached_log_analyzer = LogAnalyzer(self.client.db_path)
         return self._cached_log_analyzer
     
+    @property
+    def log_store(self) -> LogStore:
+        """Indexed view over merged logs, synced with the analyzer on access"""
+        if self._log_store is None:
+            self._log_store = LogStore()
+        self._log_store.sync(self.cached_log_analyzer.get_merged_logs())
+        return self._log_store
+    
+    @property
+    def log_bitmap_index(self) -> LogBitmapIndex:
+        """Bitmap indexes over the log store rows, kept current through a store subscription.
+        Built once per shared store; later requests and new logs only extend it"""
+        store = self.log_store
+        if self._bitmap_index is None:
+            # Looked up per ingested log, so logs arriving after a refresh see current divisions
+            self._bitmap_index = LogBitmapIndex(
+                lambda vacancy_id: self._vacancy_info_map().get(vacancy_id, {}).get('division_id')
+            )
+            store.subscribe(self._bitmap_index.ingest)
+        return self._bitmap_index
+    
+    @property
+    def dimensions(self) -> DimensionDictionary:
+        """id -> display name maps of every entity type, loaded once per log store version"""
+        if self._dimensions is None:
+            self._dimensions = DimensionDictionary(self)
+        return self._dimensions
+    
+    async def filtered_status_logs(self, filters: Optional[Dict[str, Any]] = None) -> Sequence[Dict[str, Any]]:
+        """Status logs matching the filters, shared by every caller with equivalent filters (read-only)"""
+        store = self.log_store
+        if not filters:
+            return store.status_logs
+        
+        filter_set = self.filter_engine.parse_prompt_filters(filters)
+        cache_key = (filter_set.canonical_hash, store.version)
+        filtered_logs = self._filtered_logs_cache.get(cache_key)
+        count_cache("filtered_status_logs", hit=filtered_logs is not None)
+        if filtered_logs is None:
+            filtered_logs = await self.filter_engine.apply_log_filters(EntityType.APPLICANTS, filter_set, store.status_logs)
+            if len(self._filtered_logs_cache) >= self.FILTERED_LOGS_CACHE_SIZE:
+                self._filtered_logs_cache.pop(next(iter(self._filtered_logs_cache)))
+            self._filtered_logs_cache[cache_key] = filtered_logs
+        return filtered_logs
+    
+    async def _source_names(self) -> Dict[Any, str]:
+        """Map applicant source ID -> source name from applicant_sources"""
+        sources = await self.sources_all()
+        return {src.get('id'): src.get('name', 'Unknown') for src in sources if src.get('id') is not None}
+    
+    async def _hired_status_ids(self) -> set:
+        """IDs of vacancy statuses of type 'hired'"""
+        statuses = await self.statuses_all()
+        hired_ids = {status.get('id') for status in statuses if status.get('type') == 'hired'}
+        return hired_ids or {HIRED_STATUS_ID}  # Fallback to the known hired status ID
+    
+    def _vacancy_info_map(self) -> Dict[Any, Dict[str, Any]]:
+        """Map vacancy_id -> division and hiring manager info, loaded with one query per table"""
+        if self._vacancy_info_cache is not None:
+            return self._vacancy_info_cache
+        
+        import json
+        import sqlite3
+        
+        result = {}
+        try:
+            conn = sqlite3.connect(self.client.db_path)
+            cursor = conn.cursor()
+            division_names = dict(cursor.execute("SELECT id, name FROM divisions").fetchall())
+            coworker_names = dict(cursor.execute("SELECT id, name FROM coworkers").fetchall())
+            for vacancy_id, raw_data in cursor.execute("SELECT id, raw_data FROM vacancies"):
+                vacancy_data = json.loads(raw_data) if raw_data else {}
+                division_id = vacancy_data.get('account_division')
+                coworkers = vacancy_data.get('coworkers', [])
+                hiring_manager_id = coworkers[0] if isinstance(coworkers, list) and coworkers else None
+                result[vacancy_id] = {
+                    'division_id': division_id,
+                    'division_name': division_names.get(division_id),
+                    'hiring_manager_id': hiring_manager_id,
+                    'hiring_manager_name': coworker_names.get(hiring_manager_id)
+                }
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to load vacancy info: {e}")
+        
+        self._vacancy_info_cache = result
+        return result
+    
+    def _applicant_money_map(self) -> Dict[Any, Any]:
+        """Map applicant_id -> salary expectation (free text), for records built from logs"""
+        if self._applicant_money_cache is not None:
+            return self._applicant_money_cache
+        
+        import json
+        import sqlite3
+        
+        result = {}
+        try:
+            conn = sqlite3.connect(self.client.db_path)
+            for applicant_id, raw_data in conn.execute("SELECT id, raw_data FROM applicants"):
+                money = (json.loads(raw_data) if raw_data else {}).get('money')
+                if money:
+                    result[applicant_id] = money
+            conn.close()
+        except Exception as e:
+            logger.warning(f"Failed to load applicant salary expectations: {e}")
+        
+        self._applicant_money_cache = result
+        return result
+    
     async def _fetch_all_paginated(self, endpoint: str, page_size: int = 500) -> List[Dict[str, Any]]:
         """Generic pagination handler for better performance"""
         all_items = []
@@ -139,6 +284,11 @@ class EnhancedMetricsCalculator:
     
     async def applicants_all(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get all applicants data with pagination and filtering support"""
+        return list(await self.iter_applicants(filters))
+    
+    async def iter_applicants(self, filters: Optional[Dict[str, Any]] = None) -> Iterable[Dict[str, Any]]:
+        """Lazy applicant records: deduplication and enrichment happen in-stream, one record at a time.
+        Without filters, the API's applicant list (in memory, with the API's fields)"""
         
         # If no special filters, return basic applicant data using optimized pagination
         if not filters:
@@ -146,12 +296,8 @@ class EnhancedMetricsCalculator:
                 f"/v2/accounts/{self.client.account_id}/applicants/search"
             )
         
-        # If filters provided, get applicants tied to open vacancies from logs
-        analyzer = self.cached_log_analyzer
-        
-        # Get all status logs 
-        all_logs = analyzer.get_merged_logs()
-        status_logs = [log for log in all_logs if log.get('type') == 'STATUS']
+        # If filters provided, get applicants tied to target vacancies from status logs
+        status_logs = self.log_store.status_logs
         
         # Get vacancies based on filters (with error handling)
         try:
@@ -166,95 +312,61 @@ class EnhancedMetricsCalculator:
             target_vacancy_ids = {v['id'] for v in target_vacancies}
         except Exception:
             # If vacancies call fails, use all vacancy IDs from logs
-            target_vacancy_ids = {log.get('vacancy_id', log.get('vacancy')) 
-                                for log in status_logs if log.get('vacancy_id') or log.get('vacancy')}
+            target_vacancy_ids = {log_vacancy_id(log) for log in status_logs if log_vacancy_id(log)}
         
-        # Apply Universal Filtering for all filtering including period
-        filtered_logs = status_logs
-        if filters:
-            filter_set = self.filter_engine.parse_prompt_filters(filters)
-            filtered_logs = await self.filter_engine.apply_filters(EntityType.APPLICANTS, filter_set, status_logs)
+        # Apply Universal Filtering for all filtering including period (references, no copies)
+        filtered_logs = await self.filtered_status_logs(filters)
         
-        # Get unique applicants with applications to target vacancies
-        active_applicants = set()
-        for log in filtered_logs:
-            vacancy_id = log.get('vacancy_id', log.get('vacancy'))
-            applicant_id = log.get('applicant_id')
-            
-            # If we have vacancy filters, check target vacancies; otherwise include all
-            if target_vacancy_ids:
-                if vacancy_id in target_vacancy_ids and applicant_id:
-                    active_applicants.add(applicant_id)
-            else:
-                # No vacancy filtering available, include all applicants from filtered logs
-                if applicant_id:
-                    active_applicants.add(applicant_id)
-        
-        # Convert to applicant records
-        applicant_records = []
-        for log in filtered_logs:
-            applicant_id = log.get('applicant_id')
-            if applicant_id in active_applicants:
-                # Create applicant record from log data
-                vacancy_id = log.get('vacancy_id', log.get('vacancy'))
-                applicant_record = {
-                    'id': applicant_id,
-                    'first_name': log.get('first_name', ''),
-                    'last_name': log.get('last_name', ''),
-                    'email': log.get('email'),
-                    'phone': log.get('phone', ''),
-                    'created': log.get('created', ''),
-                    'status': {'name': log.get('status_name', 'Unknown')},
-                    'vacancy_id': vacancy_id,
-                    'vacancy_position': log.get('vacancy_position', ''),
-                    'stage_id': log.get('status_id'),  # Current stage
-                    'stage_name': log.get('status_name', 'Unknown')
-                }
-                
-                # Extract recruiter information from account_info field (already parsed)
-                account_info = log.get("account_info", {})
-                if isinstance(account_info, dict):
-                    applicant_record["recruiter_id"] = account_info.get("id")
-                    applicant_record["recruiter_name"] = account_info.get("name")
-                else:
-                    applicant_record["recruiter_id"] = None
-                    applicant_record["recruiter_name"] = None
-                
-                # Extract source information
-                applicant_record["source_id"] = log.get("source")
-                applicant_record["source"] = log.get("source")
-                applicant_records.append(applicant_record)
+        # Applicants with applications to target vacancies; without vacancy filtering include all
+        active_applicants = None
+        if target_vacancy_ids:
+            active_applicants = {
+                log.get('applicant_id') for log in filtered_logs
+                if log.get('applicant_id') and log_vacancy_id(log) in target_vacancy_ids
+            }
         
-        # Remove duplicates by applicant_id
+        return self._applicant_records(filtered_logs, active_applicants, self._vacancy_info_map(),
+                                       self._applicant_money_map())
+    
+    def _applicant_records(self, logs: Iterable[Dict[str, Any]], active_applicants: Optional[set],
+                           vacancy_info: Dict[Any, Dict[str, Any]],
+                           money: Optional[Dict[Any, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield one enriched record per applicant, from the first log seen for that applicant"""
         seen_applicants = set()
-        unique_applicants = []
-        for record in applicant_records:
-            if record['id'] not in seen_applicants:
-                seen_applicants.add(record['id'])
-                unique_applicants.append(record)
-        
-        # Add division and hiring manager info from vacancies
-        vacancy_info_cache = {}
-        for applicant in unique_applicants:
-            vacancy_id = applicant.get('vacancy_id')
-            if vacancy_id and vacancy_id not in vacancy_info_cache:
-                # Query vacancy for division/hiring manager info
-                vacancy_info = await self._get_vacancy_division_info(vacancy_id)
-                vacancy_info_cache[vacancy_id] = vacancy_info
+        for log in logs:
+            applicant_id = log.get('applicant_id')
+            if not applicant_id or applicant_id in seen_applicants:
+                continue
+            if active_applicants is not None and applicant_id not in active_applicants:
+                continue
+            seen_applicants.add(applicant_id)
             
-            if vacancy_id and vacancy_id in vacancy_info_cache:
-                info = vacancy_info_cache[vacancy_id]
-                applicant['division_id'] = info.get('division_id')
-                applicant['division_name'] = info.get('division_name')
-                applicant['hiring_manager_id'] = info.get('hiring_manager_id')
-                applicant['hiring_manager_name'] = info.get('hiring_manager_name')
-            else:
-                applicant['division_id'] = None
-                applicant['division_name'] = None
-                applicant['hiring_manager_id'] = None
-                applicant['hiring_manager_name'] = None
-        
-        return unique_applicants
+            vacancy_id = log_vacancy_id(log)
+            recruiter_id, recruiter_name = log_recruiter(log)
+            info = vacancy_info.get(vacancy_id, {}) if vacancy_id else {}
+            
+            yield {
+                'id': applicant_id,
+                'first_name': log.get('first_name', ''),
+                'last_name': log.get('last_name', ''),
+                'email': log.get('email'),
+                'phone': log.get('phone', ''),
+                'created': log.get('created', ''),
+                'status': {'name': log.get('status_name', 'Unknown')},
+                'vacancy_id': vacancy_id,
+                'vacancy_position': log.get('vacancy_position', ''),
+                'stage_id': log.get('status_id'),  # Current stage
+                'stage_name': log.get('status_name', 'Unknown'),
+                'recruiter_id': recruiter_id,
+                'recruiter_name': recruiter_name,
+                'source_id': log.get("source"),
+                'source': log.get("source"),
+                'division_id': info.get('division_id'),
+                'division_name': info.get('division_name'),
+                'hiring_manager_id': info.get('hiring_manager_id'),
+                'hiring_manager_name': info.get('hiring_manager_name'),
+                'money': money.get(applicant_id) if money else None
+            }
     
     async def recruiters_all(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get recruiters data (from coworkers endpoint)"""
@@ -339,7 +451,7 @@ class EnhancedMetricsCalculator:
             
             # Look for hire events to determine closure
             hire_logs = [log for log in logs if log.get('type') == 'STATUS' and 
-                        log.get('status_id') == 103682]  # Hired status ID
+                        log.get('status_id') == HIRED_STATUS_ID]
             
             if hire_logs:
                 # Vacancy is closed (has hires)
@@ -455,14 +567,6 @@ class EnhancedMetricsCalculator:
         """Get all recruitment stages (alias for statuses_all)"""
         return await self.statuses_all(filters)
     
-    async def actions(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Get all recruiter actions from logs"""
-        analyzer = self.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
-        
-        # Apply Universal Filtering if filters provided  
-        return await self._apply_universal_filters(all_logs, EntityType.ACTIONS, filters)
-    
     async def get_applicants(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get applicants with universal filtering support"""
         
@@ -544,44 +648,27 @@ class EnhancedMetricsCalculator:
     
     async def applicants_by_source(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """Group applicants by their source with Universal Filtering support"""
-        # Get the total number of applicants for realistic distribution
-        applicants_data = await self.applicants_all(filters)
-        total_applicants = len(applicants_data)
-        
-        # Since source mapping is inconsistent between logs and API, 
-        # provide realistic distribution based on typical recruitment sources
-        if total_applicants == 0:
-            return {}
-        
-        # Create realistic source distribution based on total applicants
-        base_distribution = {
-            "HeadHunter": 0.35,
-            "LinkedIn": 0.25, 
-            "SuperJob": 0.15,
-            "Рекомендация": 0.12,
-            "Хабр карьера": 0.08,
-            "Агентство": 0.05
-        }
+        store = self.log_store
         
-        result = {}
-        remaining = total_applicants
+        # Use Universal Filtering on status logs, same as applicants_by_status
+        filtered_logs = await self.filtered_status_logs(filters)
         
-        # Distribute applicants across sources
-        for source, percentage in base_distribution.items():
-            count = max(1, int(total_applicants * percentage))
-            if remaining <= 0:
-                break
-            if count > remaining:
-                count = remaining
-            result[source] = count
-            remaining -= count
+        source_names = await self._source_names()
         
-        # Add any remaining to the first source
-        if remaining > 0:
-            first_source = list(result.keys())[0]
-            result[first_source] += remaining
+        # One grouped pass: distinct applicant -> indexed source -> source name
+        source_counts: Dict[str, int] = {}
+        seen_applicants = set()
+        for log in filtered_logs:
+            applicant_id = log.get('applicant_id')
+            if applicant_id is None or applicant_id in seen_applicants:
+                continue
+            seen_applicants.add(applicant_id)
+            
+            source_id = store.source_by_applicant.get(applicant_id)
+            source_name = source_names.get(source_id, 'Unknown')
+            source_counts[source_name] = source_counts.get(source_name, 0) + 1
         
-        return result
+        return source_counts
     
     async def vacancies_by_state(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """Group vacancies by their state with Universal Filtering support"""
@@ -609,14 +696,13 @@ class EnhancedMetricsCalculator:
     
     async def applicants_by_recruiter(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """Group applicants by their recruiter with Universal Filtering support"""
-        applicants_data = await self.applicants_all(filters)
-        
-        # Group by recruiter
+        # Count in-stream, without materializing applicant records
         recruiter_counts: Dict[str, int] = {}
-        for applicant in applicants_data:
-            recruiter_name = 'Unknown'
-            if 'recruiter' in applicant and applicant['recruiter']:
-                recruiter_name = applicant['recruiter'].get('name', 'Unknown')
+        for applicant in await self.iter_applicants(filters):
+            recruiter_name = applicant.get('recruiter_name')
+            if not recruiter_name and applicant.get('recruiter'):
+                recruiter_name = applicant['recruiter'].get('name')
+            recruiter_name = recruiter_name or 'Unknown'
             recruiter_counts[recruiter_name] = recruiter_counts.get(recruiter_name, 0) + 1
         
         return recruiter_counts
@@ -667,17 +753,8 @@ class EnhancedMetricsCalculator:
     
     async def applicants_by_status(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """Group applicants by their current status using log data with Universal Filtering support"""
-        analyzer = self.cached_log_analyzer
-        
-        # Get all status logs (applicant-vacancy-status combinations)
-        all_logs = analyzer.get_merged_logs()
-        status_logs = [log for log in all_logs if log.get('type') == 'STATUS']
-        
-        # Use Universal Filtering for all filtering including period
-        filtered_logs = status_logs
-        if filters:
-            filter_set = self.filter_engine.parse_prompt_filters(filters)
-            filtered_logs = await self.filter_engine.apply_filters(EntityType.APPLICANTS, filter_set, status_logs)
+        # Status logs of the log store, so filters take the period slice and bitmap paths
+        filtered_logs = await self.filtered_status_logs(filters)
         
         # Count by status name
         status_counts: Dict[str, int] = {}
@@ -687,6 +764,30 @@ class EnhancedMetricsCalculator:
         
         return status_counts
     
+    async def funnel(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Funnel stages with reach counts, stage-to-stage conversion and median days in stage
+        
+        With filters, the cohort is every applicant-vacancy pair with a matching status log;
+        each pair is then measured over its full transition history.
+        """
+        engine = await self._get_funnel_engine()
+        return engine.report(await self._funnel_cohort(filters))
+    
+    async def _get_funnel_engine(self) -> FunnelEngine:
+        """FunnelEngine subscribed to the log store, created on first use"""
+        store = self.log_store  # Syncing the store feeds new logs to the engine
+        if self._funnel_engine is None:
+            self._funnel_engine = FunnelEngine(await self.statuses_all())
+            store.subscribe(self._funnel_engine.ingest)
+        return self._funnel_engine
+    
+    async def _funnel_cohort(self, filters: Optional[Dict[str, Any]]) -> Optional[set]:
+        """Applicant-vacancy pairs with a status log matching the filters (None = all pairs)"""
+        if not filters:
+            return None
+        filtered_logs = await self.filtered_status_logs(filters)
+        return {funnel_pair_key(log) for log in filtered_logs}
+    
     async def applicants_by_stage(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """Alias for applicants_by_status"""
         return await self.applicants_by_status(filters)
@@ -695,160 +796,199 @@ class EnhancedMetricsCalculator:
         """Group hires by recruiter with Universal Filtering support"""
         hires_data = await self.hires(filters)
         
-        # Group by recruiter using log data to find who handled the hire
-        analyzer = self.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
-        
+        # The recruiter who most recently worked with the applicant, from the log store index
+        store = self.log_store
         recruiter_hires: Dict[str, int] = {}
-        
         for hire in hires_data:
-            applicant_id = hire.get('applicant_id')
-            
-            # Find the recruiter who handled this hire from logs
-            applicant_logs = [log for log in all_logs if log.get('applicant_id') == applicant_id]
-            
-            recruiter_name = 'Unknown'
-            if applicant_logs:
-                # Get the most recent recruiter who worked with this applicant
-                recent_log = max(applicant_logs, key=lambda x: x.get('created', ''))
-                account_info = recent_log.get('account_info', {})
-                if isinstance(account_info, dict):
-                    recruiter_name = account_info.get('name', 'Unknown')
-            
+            recruiter_name = store.recruiter_name_for_applicant(hire.get('applicant_id'))
             recruiter_hires[recruiter_name] = recruiter_hires.get(recruiter_name, 0) + 1
         
         return recruiter_hires
     
     async def time_to_hire_by_recruiter(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
         """Calculate average time to hire by recruiter with Universal Filtering support"""
-        hires_data = await self.hires(filters)
-        
-        # Group time to hire by recruiter
-        analyzer = self.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
-        
-        recruiter_times = {}
-        recruiter_counts = {}
-        
-        for hire in hires_data:
-            applicant_id = hire.get('applicant_id')
-            time_to_hire = hire.get('time_to_hire', 0)
-            
-            # Find the recruiter who handled this hire
-            applicant_logs = [log for log in all_logs if log.get('applicant_id') == applicant_id]
-            
-            recruiter_name = 'Unknown'
-            if applicant_logs:
-                recent_log = max(applicant_logs, key=lambda x: x.get('created', ''))
-                account_info = recent_log.get('account_info', {})
-                if isinstance(account_info, dict):
-                    recruiter_name = account_info.get('name', 'Unknown')
-            
-            # Accumulate time and count for average calculation
-            if recruiter_name not in recruiter_times:
-                recruiter_times[recruiter_name] = 0
-                recruiter_counts[recruiter_name] = 0
+        sketches = await self.duration_sketches("hires", "recruiters", filters)
+        return {recruiter: sketch.mean for recruiter, sketch in sketches.items()}
+    
+    async def duration_sketches(self, entity: str, group_by: Optional[str] = None,
+                                filters: Optional[Dict[str, Any]] = None) -> Dict[str, DurationSketch]:
+        """Mergeable duration sketches per group, built in one pass
+        
+        entity: hires (time_to_hire), vacancies (days_active) or stages (time in stage, grouped by stage)
+        group_by: recruiters, sources or None for a single "total" group (ignored for stages)
+        """
+        if entity == "stages":
+            engine = await self._get_funnel_engine()
+            stage_names = {stage.get('id'): stage.get('name', 'Unknown') for stage in engine.stages}
+            sketches = engine.time_in_stage_sketches(await self._funnel_cohort(filters))
+            return {stage_names.get(status_id, 'Unknown'): sketch for status_id, sketch in sketches.items()}
+        
+        if entity == "hires":
+            items = await self.hires(filters)
+            value_field = 'time_to_hire'
+        elif entity == "vacancies":
+            items = await self.vacancies_all(filters)
+            value_field = 'days_active'
+        else:
+            raise ValueError(f"No duration field for entity: {entity}")
+        
+        store = self.log_store
+        source_names = await self._source_names() if group_by == "sources" else {}
+        
+        sketches: Dict[str, DurationSketch] = {}
+        for item in items:
+            value = item.get(value_field)
+            if not isinstance(value, (int, float)):
+                continue
             
-            recruiter_times[recruiter_name] += time_to_hire
-            recruiter_counts[recruiter_name] += 1
-        
-        # Calculate averages
-        recruiter_averages = {}
-        for recruiter in recruiter_times:
-            if recruiter_counts[recruiter] > 0:
-                recruiter_averages[recruiter] = recruiter_times[recruiter] / recruiter_counts[recruiter]
+            if group_by == "recruiters":
+                if entity == "hires":
+                    key = store.recruiter_name_for_applicant(item.get('applicant_id'))
+                else:
+                    key = item.get('recruiter') or 'Unknown'
+            elif group_by == "sources":
+                key = source_names.get(store.source_by_applicant.get(item.get('applicant_id')), 'Unknown')
             else:
-                recruiter_averages[recruiter] = 0
+                key = "total"
+            
+            if key not in sketches:
+                sketches[key] = DurationSketch()
+            sketches[key].add(value)
         
-        return recruiter_averages
+        return sketches
+    
+    async def duration_distribution(self, entity: str, group_by: Optional[str] = None,
+                                    filters: Optional[Dict[str, Any]] = None,
+                                    histogram_edges: Optional[List[float]] = None) -> Dict[str, Dict[str, Any]]:
+        """count/mean/median/p90/min/max (and optional histogram) of durations per group"""
+        distribution = {}
+        for key, sketch in (await self.duration_sketches(entity, group_by, filters)).items():
+            summary = sketch.summary()
+            if histogram_edges:
+                summary["histogram"] = sketch.histogram(histogram_edges)
+            distribution[key] = summary
+        return distribution
     
     async def actions(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get all recruiter actions (log entries) with optional filtering"""
+        return list(await self.iter_actions(filters))
+    
+    async def iter_actions(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Lazy action records; logs are filtered first, records are built only when consumed"""
+        logs = self.log_store.logs
         
-        # Get all logs from analyzer
-        analyzer = self.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
+        # Action records keep the log's id and created, so filtering the logs is equivalent
+        if filters:
+            filter_set = self.filter_engine.parse_prompt_filters(filters)
+            logs = await self.filter_engine.apply_log_filters(EntityType.ACTIONS, filter_set, logs)
         
-        # Convert logs to action records
-        action_records = []
-        for log in all_logs:
-            # Each log entry represents an action
-            action_record = {
-                'id': log.get('id'),
-                'type': log.get('type', 'UNKNOWN'),
-                'created': log.get('created'),
-                'applicant_id': log.get('applicant_id'),
-                'vacancy_id': log.get('vacancy_id'),
-                'status_id': log.get('status_id'),
-                'raw_data': log.get('raw_data')
+        return (self._action_record(log) for log in logs)
+    
+    def _action_record(self, log: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a log entry to an action record"""
+        recruiter_id, recruiter_name = log_recruiter(log)
+        return {
+            'id': log.get('id'),
+            'type': log.get('type', 'UNKNOWN'),
+            'created': log.get('created'),
+            'applicant_id': log.get('applicant_id'),
+            'vacancy_id': log.get('vacancy_id'),
+            'status_id': log.get('status_id'),
+            'raw_data': log.get('raw_data'),
+            'recruiter_id': recruiter_id,
+            'recruiter_name': recruiter_name
+        }
+    
+    async def conversion_stats(self, group_by: Optional[str] = None,
+                               filters: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, float]]:
+        """Distinct applicants, hires and conversion rate (%) per group in a single pass over status logs
+        
+        group_by: recruiters, sources, vacancies, divisions or None for a single "total" group
+        """
+        store = self.log_store
+        
+        filtered_logs = await self.filtered_status_logs(filters)
+        
+        hired_status_ids = await self._hired_status_ids()
+        
+        # Resolve group key -> display name lazily, only for the dimension requested
+        if group_by == "recruiters":
+            def group_key(log):
+                recruiter_id, recruiter_name = log_recruiter(log)
+                return recruiter_name or (f'Recruiter {recruiter_id}' if recruiter_id else 'Unknown')
+        elif group_by == "sources":
+            source_names = await self._source_names()
+            def group_key(log):
+                return source_names.get(store.source_by_applicant.get(log.get('applicant_id')), 'Unknown')
+        elif group_by == "vacancies":
+            def group_key(log):
+                return log.get('vacancy_position') or 'Unknown'
+        elif group_by == "divisions":
+            vacancy_info = self._vacancy_info_map()
+            def group_key(log):
+                return vacancy_info.get(log_vacancy_id(log), {}).get('division_name') or 'Unknown'
+        elif group_by is None:
+            def group_key(log):
+                return "total"
+        else:
+            raise ValueError(f"Unsupported conversion grouping: {group_by}")
+        
+        group_applicants: Dict[str, set] = {}
+        group_hires: Dict[str, set] = {}
+        for log in filtered_logs:
+            applicant_id = log.get('applicant_id')
+            if applicant_id is None:
+                continue
+            key = group_key(log)
+            group_applicants.setdefault(key, set()).add(applicant_id)
+            if log.get('status_id') in hired_status_ids:
+                group_hires.setdefault(key, set()).add(applicant_id)
+        
+        stats = {}
+        for key, applicants in group_applicants.items():
+            hires_count = len(group_hires.get(key, ()))
+            stats[key] = {
+                "applicants": len(applicants),
+                "hires": hires_count,
+                "conversion": (hires_count / len(applicants)) * 100
             }
-            
-            # Extract recruiter information from account_info
-            account_info = log.get("account_info", {})
-            if isinstance(account_info, dict):
-                action_record["recruiter_id"] = account_info.get("id")
-                action_record["recruiter_name"] = account_info.get("name")
-            else:
-                action_record["recruiter_id"] = None
-                action_record["recruiter_name"] = None
-            
-            action_records.append(action_record)
         
-        # Apply Universal Filtering
-        if filters:
-            action_records = await self._apply_universal_filters(
-                action_records, EntityType.ACTIONS, filters
-            )
+        if group_by is None and not stats:
+            stats["total"] = {"applicants": 0, "hires": 0, "conversion": 0.0}
         
-        return action_records
+        return stats
+    
+    async def overall_conversion_rate(self, filters: Optional[Dict[str, Any]] = None) -> float:
+        """Conversion rate (hires/applicants, %) across all filtered applicants"""
+        stats = await self.conversion_stats(None, filters)
+        return stats["total"]["conversion"]
     
     async def recruiters_conversion_rate(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
         """Calculate conversion rate (hires/applicants) for each recruiter"""
-        
-        # Get hires and applicants with filters
-        hires = await self.hires(filters or {})
-        applicants = await self.applicants_all(filters or {})
-        
-        # Group by recruiter
-        recruiter_hires = {}
-        recruiter_applicants = {}
-        recruiter_names = {}
-        
-        # Count hires by recruiter
-        for hire in hires:
-            recruiter_id = hire.get('recruiter_id')
-            recruiter_name = hire.get('recruiter_name', 'Unknown')
-            if recruiter_id:
-                recruiter_hires[recruiter_id] = recruiter_hires.get(recruiter_id, 0) + 1
-                recruiter_names[recruiter_id] = recruiter_name
-        
-        # Count applicants by recruiter
-        for applicant in applicants:
-            recruiter_id = applicant.get('recruiter_id')
-            recruiter_name = applicant.get('recruiter_name', 'Unknown')
-            if recruiter_id:
-                recruiter_applicants[recruiter_id] = recruiter_applicants.get(recruiter_id, 0) + 1
-                recruiter_names[recruiter_id] = recruiter_name
-        
-        # Calculate conversion rates
-        conversion_rates = {}
-        for recruiter_id in set(list(recruiter_hires.keys()) + list(recruiter_applicants.keys())):
-            hires_count = recruiter_hires.get(recruiter_id, 0)
-            applicants_count = recruiter_applicants.get(recruiter_id, 0)
-            recruiter_name = recruiter_names.get(recruiter_id, f'Recruiter {recruiter_id}')
-            
-            if applicants_count > 0:
-                conversion_rate = (hires_count / applicants_count) * 100
-            else:
-                # If no applicants but has hires, set a high conversion rate
-                conversion_rate = 100.0 if hires_count > 0 else 0.0
-            
-            conversion_rates[recruiter_name] = conversion_rate
-        
-        return conversion_rates
+        stats = await self.conversion_stats("recruiters", filters)
+        return {name: group["conversion"] for name, group in stats.items()}
+    
+    async def sources_conversion_rate(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Calculate conversion rate (hires/applicants) for each source"""
+        stats = await self.conversion_stats("sources", filters)
+        return {name: group["conversion"] for name, group in stats.items()}
+    
+    async def vacancies_conversion_rate(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Calculate conversion rate (hires/applicants) for each vacancy"""
+        stats = await self.conversion_stats("vacancies", filters)
+        return {name: group["conversion"] for name, group in stats.items()}
+    
+    async def divisions_conversion_rate(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Calculate conversion rate (hires/applicants) for each division"""
+        stats = await self.conversion_stats("divisions", filters)
+        return {name: group["conversion"] for name, group in stats.items()}
     
     async def rejections(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Get all rejections (status changes to rejection status) with optional filtering"""
+        return list(await self.iter_rejections(filters))
+    
+    async def iter_rejections(self, filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Lazy rejection records; logs are filtered first, records are built only when consumed"""
         
         # Get rejection reasons mapping from API
         try:
@@ -861,58 +1001,61 @@ class EnhancedMetricsCalculator:
             logger.warning(f"Failed to get rejection reasons: {e}")
             rejection_reasons_map = {}
         
-        # Get all logs from analyzer
-        analyzer = self.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
+        # Rejection records keep the log's id and created, so filtering the logs is equivalent
+        logs = self.log_store.logs
+        if filters:
+            filter_set = self.filter_engine.parse_prompt_filters(filters)
+            logs = await self.filter_engine.apply_log_filters(EntityType.REJECTIONS, filter_set, logs)
         
-        # Filter for rejection logs
-        rejection_logs = []
-        for log in all_logs:
+        return (
+            self._rejection_record(log, rejection_reasons_map)
+            for log in logs
             # Check if this is a rejection (has rejection_reason or status indicates rejection)
-            if (log.get('rejection_reason') or 
+            if (log.get('rejection_reason') or
                 (log.get('status_name') and 'отказ' in log.get('status_name', '').lower()) or
-                (log.get('status_type') and log.get('status_type') == 'trash')):
-                rejection_logs.append(log)
-        
-        # Convert logs to rejection records
-        rejection_records = []
-        for log in rejection_logs:
-            rejection_reason_id = log.get('rejection_reason')
-            rejection_reason_name = rejection_reasons_map.get(rejection_reason_id, 'Не указана причина') if rejection_reason_id else 'Не указана причина'
-            
-            rejection_record = {
-                'id': log.get('id'),
-                'applicant_id': log.get('applicant_id'),
-                'vacancy_id': log.get('vacancy_id'),
-                'status_id': log.get('status_id'),
-                'created': log.get('created'),
-                'rejection_reason': rejection_reason_name,  # Use readable name instead of ID
-                'rejection_reason_id': rejection_reason_id,  # Keep ID for reference
-                'status_name': log.get('status_name'),
-                'status_type': log.get('status_type'),
-                'vacancy_position': log.get('vacancy_position'),
-                'comment': log.get('comment')
-            }
-            
-            # Extract recruiter information from account_info
-            account_info = log.get("account_info", {})
-            if isinstance(account_info, dict):
-                rejection_record["recruiter_id"] = account_info.get("id")
-                rejection_record["recruiter_name"] = account_info.get("name")
-            else:
-                rejection_record["recruiter_id"] = None
-                rejection_record["recruiter_name"] = None
-            
-            # Extract source information
-            rejection_record["source_id"] = log.get("source")
-            rejection_record["source"] = log.get("source")
-            
-            rejection_records.append(rejection_record)
-        
-        # Apply Universal Filtering
-        if filters:
-            rejection_records = await self._apply_universal_filters(
-                rejection_records, EntityType.REJECTIONS, filters
-            )
-        
-        return rejection_records
\ No newline at end of file
+                (log.get('status_type') and log.get('status_type') == 'trash'))
+        )
+    
+    def _rejection_record(self, log: Dict[str, Any], rejection_reasons_map: Dict[Any, str]) -> Dict[str, Any]:
+        """Convert a rejection log entry to a rejection record"""
+        rejection_reason_id = log.get('rejection_reason')
+        rejection_reason_name = rejection_reasons_map.get(rejection_reason_id, 'Не указана причина') if rejection_reason_id else 'Не указана причина'
+        recruiter_id, recruiter_name = log_recruiter(log)
+        
+        return {
+            'id': log.get('id'),
+            'applicant_id': log.get('applicant_id'),
+            'vacancy_id': log.get('vacancy_id'),
+            'status_id': log.get('status_id'),
+            'created': log.get('created'),
+            'rejection_reason': rejection_reason_name,  # Use readable name instead of ID
+            'rejection_reason_id': rejection_reason_id,  # Keep ID for reference
+            'status_name': log.get('status_name'),
+            'status_type': log.get('status_type'),
+            'vacancy_position': log.get('vacancy_position'),
+            'comment': log.get('comment'),
+            'recruiter_id': recruiter_id,
+            'recruiter_name': recruiter_name,
+            'source_id': log.get("source"),
+            'source': log.get("source")
+        }
+
+
+# db path -> (calculator, data version it was last refreshed for)
+_shared_calculators: Dict[str, Tuple[EnhancedMetricsCalculator, str]] = {}
+
+
+def shared_calculator(client: HuntflowLocalClient) -> EnhancedMetricsCalculator:
+    """Process-wide calculator of the client's database. Its log store, indexes and caches outlive
+    single requests; when the database changes it is refreshed, not rebuilt"""
+    data_version = client.data_version()
+    shared = _shared_calculators.get(client.db_path)
+    if shared is None:
+        calc = EnhancedMetricsCalculator(client, None)
+    else:
+        calc = shared[0]
+        if shared[1] != data_version:
+            logger.info(f"Database {client.db_path} changed, refreshing the shared calculator")
+            calc.refresh()
+    _shared_calculators[client.db_path] = (calc, data_version)
+    return calc
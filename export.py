@@ -0,0 +1,278 @@
+"""
+Export - streaming CSV/XLSX/Parquet of chart results, tables and filtered records
+Rows come from generators and are encoded chunk by chunk, so an export of hundreds of
+thousands of records never holds more than one chunk of rows in memory. CSV is streamed
+as it is encoded, so its header is known up front: the fixed fields of records built
+from logs, or the keys of rows already in memory. XLSX and Parquet rows are staged in a
+spooled temporary file (on disk beyond a few MB) first, so their columns also take keys
+first seen in later rows, and Parquet column types are widened over all rows
+(int -> float -> string), so no value is lost to a type guessed too early.
+openpyxl and pyarrow are optional: without them only that format is unavailable.
+"""
+
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple, Callable
+import csv
+import io
+import itertools
+import json
+import logging
+import tempfile
+import urllib.parse
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+logger = logging.getLogger(__name__)
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+# Rows encoded at a time
+CHUNK_ROWS = 5000
+# Bytes per streamed piece of XLSX/Parquet files
+STREAM_CHUNK_BYTES = 64 * 1024
+# Temporary XLSX/Parquet files stay in memory up to this size
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class ExportError(ValueError):
+    """Unknown format, missing optional dependency or nothing to export"""
+
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int = CHUNK_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _cell(value: Any) -> Any:
+    """Scalar cell value: nested lists and dicts become JSON text"""
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def chart_rows(chart_data: Dict[str, Any]) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """Columns and rows of a chart result: table rows, scatter points, or labels with their
+    values (one column per series for multi-series time charts)"""
+    if "columns" in chart_data and "rows" in chart_data:
+        columns = [column["key"] for column in chart_data["columns"]]
+        return columns, iter(chart_data["rows"])
+
+    if "points" in chart_data:
+        points = chart_data["points"]
+        columns = list(dict.fromkeys(key for point in points for key in point)) or ["x", "y"]
+        return columns, iter(points)
+
+    labels = chart_data.get("labels", [])
+    series = chart_data.get("series") or []
+    columns = ["label", "value"] + [s["name"] for s in series]
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        for i, label in enumerate(labels):
+            row = {"label": label, "value": chart_data["values"][i]}
+            for s in series:
+                row[s["name"]] = s["values"][i]
+            yield row
+    return columns, rows()
+
+
+def record_rows(records: Iterable[Dict[str, Any]],
+                fields: Optional[List[str]] = None) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """Columns and rows of raw entity records: the fixed fields of records built from logs, else the
+    keys of all records listed in memory, or of the first chunk of a stream without known fields"""
+    if isinstance(records, list):
+        first, rest = records, iter(())
+    else:
+        rest = iter(records)
+        first = next(chunked(rest), [])
+    if not first:
+        raise ExportError("Nothing to export")
+    columns = list(fields) if fields else list(dict.fromkeys(key for record in first for key in record))
+    return columns, itertools.chain(first, rest)
+
+
+def export_stream(fmt: str, columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encoded file, piece by piece; check_format() first to fail before the response starts"""
+    check_format(fmt)
+    if fmt == "csv":
+        return _csv_stream(columns, rows)
+    if fmt == "xlsx":
+        return _file_stream(_write_xlsx, columns, rows)
+    return _file_stream(_write_parquet, columns, rows)
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "xlsx" and openpyxl is None:
+        raise ExportError("XLSX export needs openpyxl")
+    if fmt == "parquet" and pyarrow is None:
+        raise ExportError("Parquet export needs pyarrow")
+
+
+def _csv_stream(columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    # BOM, so Excel opens UTF-8 (Cyrillic) text correctly
+    yield "\ufeff".encode("utf-8")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    known = set(columns)
+    dropped = set()
+    for chunk in chunked(rows):
+        for row in chunk:
+            if not known.issuperset(row):
+                dropped.update(key for key in row if key not in known)
+        writer.writerows([_cell(row.get(column)) for column in columns] for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+    if dropped:
+        # The header was written before these keys appeared
+        logger.warning(f"CSV export left out fields missing from its header: {', '.join(sorted(map(str, dropped)))}")
+
+
+def _file_stream(write, columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as file:
+        write(file, columns, rows)
+        file.seek(0)
+        while True:
+            data = file.read(STREAM_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+
+def _stage_rows(staged, columns: List[str], rows: Iterable[Dict[str, Any]],
+                observe: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[str]:
+    """Write rows to staged as JSON lines; returns the columns followed by keys first seen in the rows"""
+    columns = list(columns)
+    known = set(columns)
+    for chunk in chunked(rows):
+        for row in chunk:
+            if not known.issuperset(row):
+                for key in row:
+                    if key not in known:
+                        known.add(key)
+                        columns.append(key)
+            if observe is not None:
+                observe(row)
+            staged.write(json.dumps(row, ensure_ascii=False, default=str))
+            staged.write("\n")
+    return columns
+
+
+def _staged_rows(staged) -> Iterator[Dict[str, Any]]:
+    staged.seek(0)
+    return (json.loads(line) for line in staged)
+
+
+def _write_xlsx(file, columns: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+", encoding="utf-8") as staged:
+        columns = _stage_rows(staged, columns, rows)
+        # Write-only workbooks keep rows out of memory once they are appended
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("export")
+        sheet.append(columns)
+        for row in _staged_rows(staged):
+            sheet.append([_cell(row.get(column)) for column in columns])
+        workbook.save(file)
+
+
+def _value_kind(value: Any) -> Optional[str]:
+    """Parquet kind of one value: bool, int, float or string (None for missing values)"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "string"
+
+
+def _widen(kind: Optional[str], value_kind: Optional[str]) -> Optional[str]:
+    """Narrowest kind holding both: int and float widen to float, any other mix to string"""
+    if value_kind is None or value_kind == kind:
+        return kind
+    if kind is None:
+        return value_kind
+    if {kind, value_kind} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+def _arrow_type(kind: Optional[str]):
+    if kind == "bool":
+        return pyarrow.bool_()
+    if kind == "int":
+        return pyarrow.int64()
+    if kind == "float":
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _arrow_value(value: Any, arrow_type) -> Any:
+    """Value converted to its (widened) column type"""
+    if value is None:
+        return None
+    if arrow_type == pyarrow.string():
+        value = _cell(value)
+        return value if isinstance(value, str) else str(value)
+    if arrow_type == pyarrow.float64():
+        return float(value)
+    return value
+
+
+def _write_parquet(file, columns: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+    # Column types must hold every value, not just the first chunk's: types are widened while
+    # the rows are staged, then the rows are written one row group per chunk
+    kinds: Dict[str, Optional[str]] = {}
+
+    def observe(row: Dict[str, Any]) -> None:
+        for key, value in row.items():
+            kinds[key] = _widen(kinds.get(key), _value_kind(value))
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+", encoding="utf-8") as staged:
+        columns = _stage_rows(staged, columns, rows, observe)
+        schema = pyarrow.schema([(str(column), _arrow_type(kinds.get(column))) for column in columns])
+        writer = parquet.ParquetWriter(file, schema)
+        try:
+            for chunk in chunked(_staged_rows(staged)):
+                arrays = [
+                    pyarrow.array([_arrow_value(row.get(column), field.type) for row in chunk], type=field.type)
+                    for column, field in zip(columns, schema)
+                ]
+                writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+        finally:
+            writer.close()
+
+
+def content_disposition(name: Optional[str], fmt: str) -> str:
+    """Attachment header named after a report or table title (UTF-8 name, ASCII fallback)"""
+    extension = EXPORT_FORMATS[fmt][1]
+    name = " ".join((name or "").split()) or "export"
+    fallback = "".join(c if c.isascii() and (c.isalnum() or c in "-_") else "_" for c in name).strip("_") or "export"
+    return (f'attachment; filename="{fallback}.{extension}"; '
+            f"filename*=UTF-8''{urllib.parse.quote(f'{name}.{extension}')}")
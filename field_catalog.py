@@ -0,0 +1,111 @@
+"""
+Field Catalog - numeric measures of each entity for sum/avg/median/p90
+Aggregations name their measure explicitly (value_field) and the measure is resolved
+against the catalog before any data is read: unknown measures are rejected up front,
+and values are read from one declared column per item instead of scanning item keys.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Iterable
+import re
+
+AGGREGATIONS = ("sum", "avg", "median", "p90")
+
+# Measures computed by the calculator from counts, for any entity (see _process_conversion_request)
+DERIVED_MEASURES = ("conversion",)
+
+# Funnel rows are aggregated per stage already (see _process_funnel_request)
+FUNNEL_MEASURES = ("reached", "current", "conversion", "median_days_in_stage", "p90_days_in_stage")
+
+_AMOUNT = re.compile(r"\d[\d\s]*")
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """Leading number of a free-text amount ('120 000 руб', '75000 RUR'); the currency is not converted"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _AMOUNT.search(value)
+    if match is None:
+        return None
+    return float("".join(match.group(0).split()))
+
+
+class UnknownMeasureError(ValueError):
+    """Aggregation over a measure the entity doesn't declare"""
+
+
+@dataclass(frozen=True)
+class Measure:
+    """Numeric column of an entity"""
+    name: str
+    unit: str
+    # Converts raw values that aren't numbers (e.g. amounts stored as text)
+    parse: Optional[Callable[[Any], Optional[float]]] = None
+
+    def values(self, items: Iterable[Dict[str, Any]]) -> List[float]:
+        """Column values of the items that have one"""
+        field = self.name
+        if self.parse is None:
+            return [value for value in (item.get(field) for item in items)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        parse = self.parse
+        return [value for value in (parse(item.get(field)) for item in items) if value is not None]
+
+
+ENTITY_MEASURES: Dict[str, Dict[str, Measure]] = {
+    "hires": {
+        "time_to_hire": Measure("time_to_hire", "days")
+    },
+    "vacancies": {
+        "days_active": Measure("days_active", "days"),
+        "hire_count": Measure("hire_count", "count")
+    },
+    "applicants": {
+        "money": Measure("money", "amount", parse=parse_amount)
+    },
+    "stages": {
+        "stay_duration": Measure("stay_duration", "days")
+    }
+}
+
+# Measure of an aggregation without value_field
+DEFAULT_MEASURES = {
+    "hires": "time_to_hire",
+    "vacancies": "days_active"
+}
+
+
+def resolve_measure(entity: str, operation: str, value_field: Optional[str]) -> Optional[Measure]:
+    """Measure an operation aggregates; None for counts, funnel and derived measures.
+    Raises UnknownMeasureError for a measure the entity doesn't declare"""
+    if entity == "funnel":
+        if value_field is not None and value_field not in FUNNEL_MEASURES:
+            raise UnknownMeasureError(f"Unknown funnel measure '{value_field}', "
+                                      f"available: {', '.join(FUNNEL_MEASURES)}")
+        return None
+    if value_field in DERIVED_MEASURES or operation not in AGGREGATIONS:
+        return None
+
+    measures = ENTITY_MEASURES.get(entity, {})
+    if value_field is None:
+        value_field = DEFAULT_MEASURES.get(entity)
+        if value_field is None:
+            raise UnknownMeasureError(f"{operation} of {entity} needs a value_field{_available(entity)}")
+    measure = measures.get(value_field)
+    if measure is None:
+        raise UnknownMeasureError(f"Unknown measure '{value_field}' for {entity}{_available(entity)}")
+    return measure
+
+
+def _available(entity: str) -> str:
+    names = list(ENTITY_MEASURES.get(entity, {})) + list(DERIVED_MEASURES)
+    return f", available: {', '.join(names)}"
+
+
+def value_fields_by_entity() -> Dict[str, List[str]]:
+    """Accepted value_field names per entity (for the prompt)"""
+    fields = {entity: list(measures) + list(DERIVED_MEASURES) for entity, measures in ENTITY_MEASURES.items()}
+    fields["funnel"] = list(FUNNEL_MEASURES)
+    return fields
@@ -0,0 +1,224 @@
+"""
+Filter Compiler - turns filters into specialized predicates
+Constants are converted and the operator is dispatched once at compile time,
+so evaluating a predicate per item is a plain function call instead of the
+if/elif chain with per-row conversions of UniversalFilterEngine._matches_filter.
+"""
+
+from typing import Any, Callable, Iterable, Optional
+from datetime import datetime
+import re
+
+from universal_filter import UniversalFilter, PeriodFilter, FilterOperator
+
+Predicate = Callable[[Any], bool]
+
+_TZ_OFFSET = re.compile(r'[+]\d{2}:\d{2}$')
+
+
+def _parse_number(value: str) -> Optional[float]:
+    """int(value), else float(value), else None"""
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
+def _hashable_members(value: Any) -> Optional[frozenset]:
+    """frozenset of a list/tuple/set value when every member is hashable"""
+    if not isinstance(value, (list, tuple, set, frozenset)):
+        return None
+    try:
+        return frozenset(value)
+    except TypeError:
+        return None
+
+
+def _compile_equals(expected: Any) -> Predicate:
+    """Equality with the same numeric/string coercions as _matches_filter"""
+    if isinstance(expected, str):
+        expected_number = _parse_number(expected)
+        compare_upper = expected.lower() in ['open', 'closed']
+        expected_upper = expected.upper()
+
+        def match(field_value: Any) -> bool:
+            if isinstance(field_value, (int, float)):
+                return field_value == (expected_number if expected_number is not None else expected)
+            if isinstance(field_value, str):
+                # Vacancy state case variations: 'open' -> 'OPEN', 'closed' -> 'CLOSED'
+                return field_value.upper() == expected_upper if compare_upper else field_value == expected
+            return field_value == expected
+        return match
+
+    if isinstance(expected, (int, float)):
+        expected_str = str(expected)
+
+        def match(field_value: Any) -> bool:
+            if isinstance(field_value, str):
+                try:
+                    return int(field_value) == expected
+                except ValueError:
+                    try:
+                        return float(field_value) == expected
+                    except ValueError:
+                        return field_value == expected_str
+            return field_value == expected
+        return match
+
+    return lambda field_value: field_value == expected
+
+
+def _compile_membership(values: Any, negate: bool) -> Predicate:
+    """IN / NOT_IN with a hash lookup when the values allow it"""
+    members = _hashable_members(values)
+
+    def contains(field_value: Any) -> bool:
+        if members is not None:
+            try:
+                return field_value in members
+            except TypeError:
+                pass
+        return field_value in values
+
+    if negate:
+        return lambda field_value: not contains(field_value)
+    return contains
+
+
+def _compile_comparison(threshold: Any, compare: Callable[[float, float], bool]) -> Predicate:
+    """Numeric comparison against a threshold converted once"""
+    try:
+        threshold = float(threshold)
+    except (ValueError, TypeError):
+        return lambda field_value: False
+
+    def match(field_value: Any) -> bool:
+        try:
+            return compare(float(field_value), threshold)
+        except (ValueError, TypeError):
+            return False
+    return match
+
+
+def _compile_between(bounds: Any) -> Predicate:
+    try:
+        lower, upper = bounds[0], bounds[1]
+    except (TypeError, IndexError, KeyError):
+        return lambda field_value: False
+
+    def match(field_value: Any) -> bool:
+        try:
+            return lower <= float(field_value) <= upper
+        except (ValueError, TypeError):
+            return False
+    return match
+
+
+def compile_value_matcher(filter_obj: UniversalFilter) -> Predicate:
+    """Predicate over a single field value, equivalent to UniversalFilterEngine._matches_filter"""
+    operator = filter_obj.operator
+    value = filter_obj.value
+
+    if operator == FilterOperator.EQUALS:
+        return _compile_equals(value)
+    elif operator == FilterOperator.NOT_EQUALS:
+        return lambda field_value: field_value != value
+    elif operator == FilterOperator.IN:
+        return _compile_membership(value, negate=False)
+    elif operator == FilterOperator.NOT_IN:
+        return _compile_membership(value, negate=True)
+    elif operator == FilterOperator.CONTAINS:
+        needle = str(value).lower()
+        return lambda field_value: needle in str(field_value).lower()
+    elif operator == FilterOperator.EXISTS:
+        return lambda field_value: field_value is not None
+    elif operator == FilterOperator.GREATER_THAN:
+        return _compile_comparison(value, lambda a, b: a > b)
+    elif operator == FilterOperator.GREATER_THAN_EQUAL:
+        return _compile_comparison(value, lambda a, b: a >= b)
+    elif operator == FilterOperator.LESS_THAN:
+        return _compile_comparison(value, lambda a, b: a < b)
+    elif operator == FilterOperator.LESS_THAN_EQUAL:
+        return _compile_comparison(value, lambda a, b: a <= b)
+    elif operator == FilterOperator.BETWEEN:
+        return _compile_between(value)
+
+    return lambda field_value: False
+
+
+def compile_field_predicate(field_name: str, filter_obj: UniversalFilter) -> Predicate:
+    """Item predicate: item[field_name] matches the filter"""
+    match = compile_value_matcher(filter_obj)
+    return lambda item: match(item.get(field_name))
+
+
+def parse_item_date(value: str) -> Optional[datetime]:
+    """Parse an item date string; timezone offsets are dropped, None when unparseable"""
+    try:
+        if '+' in value or 'Z' in value:
+            # Handle timezone aware dates
+            return datetime.fromisoformat(_TZ_OFFSET.sub('', value).replace('Z', ''))
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def compile_period_predicate(period_filter: PeriodFilter, date_field: str = "created") -> Optional[Predicate]:
+    """Item predicate for a period [start_date, end_date) over date_field; items without a
+    parseable date are kept. None when unbounded"""
+    if not period_filter.start_date:
+        return None
+    start_date = period_filter.start_date
+    end_date = period_filter.end_date
+
+    def in_period(item: Any) -> bool:
+        item_date = item.get(date_field)
+        if not item_date:
+            # If no date field, include the item (don't filter out)
+            return True
+        if isinstance(item_date, str):
+            item_date = parse_item_date(item_date)
+            if item_date is None:
+                # If parsing fails, include the item
+                return True
+        if isinstance(item_date, datetime):
+            return start_date <= item_date < end_date
+        return False
+    return in_period
+
+
+def fuse_all(predicates: Iterable[Optional[Predicate]]) -> Optional[Predicate]:
+    """Conjunction of predicates; None entries match everything. None when nothing is left"""
+    predicates = tuple(p for p in predicates if p is not None)
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def fused(item: Any) -> bool:
+        for predicate in predicates:
+            if not predicate(item):
+                return False
+        return True
+    return fused
+
+
+def fuse_any(predicates: Iterable[Optional[Predicate]]) -> Optional[Predicate]:
+    """Disjunction of predicates; a None entry matches everything, so the result is None too"""
+    predicates = tuple(predicates)
+    if any(p is None for p in predicates):
+        return None
+    if not predicates:
+        return lambda item: False
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def fused(item: Any) -> bool:
+        for predicate in predicates:
+            if predicate(item):
+                return True
+        return False
+    return fused
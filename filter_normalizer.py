@@ -0,0 +1,204 @@
+"""
+Filter Normalizer - canonical form of prompt filters
+Equivalent metrics_filter dicts (key order, '6 months' vs '6 month', '123' vs 123,
+single-element 'in' lists, nested 'and' wrappers) normalize to one canonical form
+with a stable hash, so every cache keyed by it hits for every spelling.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import date, datetime
+import hashlib
+import json
+
+from universal_filter import PeriodFilter, EntityType
+
+ENTITY_KEYS = {e.value for e in EntityType}
+
+# Advanced-syntax operators that mean plain equality / membership
+_EQUALS_OPERATORS = ("eq", "equals")
+
+Term = Tuple
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _canonical_scalar(value: Any) -> Any:
+    """Digit strings become ints, vacancy states lowercase; other values unchanged"""
+    if isinstance(value, str):
+        if value.isdigit():
+            return int(value)
+        if value.lower() in ('open', 'closed'):
+            return value.lower()
+    return value
+
+
+def _canonical_members(values: List[Any]) -> Any:
+    """Membership list in a stable order without duplicates; a single member becomes a plain value"""
+    members = {}
+    for value in values:
+        value = _canonical_scalar(value)
+        members.setdefault(_dump(value), value)
+    ordered = [members[key] for key in sorted(members)]
+    if len(ordered) == 1:
+        return ordered[0]
+    return ordered
+
+
+def canonical_value(value: Any) -> Any:
+    """Canonical entity filter value in the prompt syntax parse_prompt_filters accepts"""
+    if isinstance(value, dict) and "operator" in value and "value" in value:
+        operator = value["operator"]
+        operand = value["value"]
+        if operator in _EQUALS_OPERATORS and not isinstance(operand, (list, dict)):
+            return _canonical_scalar(operand)
+        if operator == "in" and isinstance(operand, list) and operand:
+            return _canonical_members(operand)
+        if operator == "not_in" and isinstance(operand, list) and operand:
+            members = _canonical_members(operand)
+            return {"operator": operator, "value": members if isinstance(members, list) else [members]}
+        if isinstance(operand, list):
+            return {"operator": operator, "value": [_canonical_scalar(v) for v in operand]}
+        return {"operator": operator, "value": _canonical_scalar(operand)}
+
+    if isinstance(value, list) and value:
+        return _canonical_members(value)
+    return _canonical_scalar(value)
+
+
+def _period_term(period_str: Any, today: date) -> Term:
+    period = PeriodFilter.from_string(period_str, today)
+    return ("period", period.period_type, period.start_date.isoformat(), period.end_date.isoformat())
+
+
+def _terms(filters: Dict[str, Any], today: date, logical_only: bool = False) -> List[Term]:
+    """Conjunction of terms of a filter dict, read the way parse_prompt_filters reads it"""
+    terms = []
+    for key, value in filters.items():
+        if key == "and":
+            for condition in value:
+                terms.extend(_condition_terms(condition, today))
+        elif key == "or":
+            terms.extend(_disjunction(value, today))
+        elif logical_only:
+            # A condition carrying 'and'/'or' only contributes its logical keys
+            continue
+        elif key == "period":
+            terms.append(_period_term(value, today))
+        elif key in ENTITY_KEYS:
+            terms.append(("entity", key, canonical_value(value)))
+    return terms
+
+
+def _condition_terms(condition: Any, today: date) -> List[Term]:
+    """Terms of a condition inside a logical filter; non-dict conditions match everything"""
+    if not isinstance(condition, dict):
+        return []
+    return _terms(condition, today, logical_only=("and" in condition or "or" in condition))
+
+
+def _conjunction(terms: List[Term]) -> Tuple[Term, ...]:
+    """AND is commutative and idempotent: sort terms and drop repeats"""
+    unique = {}
+    for term in terms:
+        unique.setdefault(_dump(term), term)
+    return tuple(unique[key] for key in sorted(unique))
+
+
+def _disjunction(conditions: List[Any], today: date) -> List[Term]:
+    """Terms an OR contributes to the enclosing conjunction"""
+    branches = {}
+    for condition in conditions:
+        branch = _conjunction(_condition_terms(condition, today))
+        if not branch:
+            # A branch matching everything makes the whole OR match everything
+            return []
+        # OR of a single OR: lift its branches
+        nested = branch[0][1] if len(branch) == 1 and branch[0][0] == "or" else (branch,)
+        for nested_branch in nested:
+            branches.setdefault(_dump(nested_branch), nested_branch)
+
+    if len(branches) == 1:
+        return list(next(iter(branches.values())))
+    return [("or", tuple(branches[key] for key in sorted(branches)))]
+
+
+def _term_filters(term: Term) -> Dict[str, Any]:
+    if term[0] == "period":
+        return {"period": term[1]}
+    if term[0] == "entity":
+        return {term[1]: term[2]}
+    return {"or": [_branch_filters(branch) for branch in term[1]]}
+
+
+def _branch_filters(terms: Tuple[Term, ...]) -> Dict[str, Any]:
+    """Filter dict of a conjunction that is only entity and period keys, or a single 'and'"""
+    result = {}
+    for term in terms:
+        key = "period" if term[0] == "period" else term[1] if term[0] == "entity" else None
+        if key is None or key in result:
+            return {"and": [_term_filters(t) for t in terms]}
+        result[key] = _term_filters(term)[key]
+    return result
+
+
+@dataclass(frozen=True)
+class CanonicalFilters:
+    """Normalized prompt filters: a resolved top-level period plus a sorted conjunction of terms"""
+    period: Optional[Term]
+    terms: Tuple[Term, ...]
+
+    @property
+    def key(self) -> Tuple:
+        """Hashable form, equal for every equivalent spelling"""
+        return (self.period, self.terms)
+
+    @property
+    def hash(self) -> str:
+        """Stable across processes (unlike hash()), usable as a cache or storage key"""
+        return hashlib.sha1(_dump(self.key).encode('utf-8')).hexdigest()
+
+    @property
+    def period_filter(self) -> Optional[PeriodFilter]:
+        if self.period is None:
+            return None
+        return PeriodFilter(period_type=self.period[1], start_date=datetime.fromisoformat(self.period[2]),
+                            end_date=datetime.fromisoformat(self.period[3]))
+
+    def to_prompt_filters(self) -> Dict[str, Any]:
+        """Equivalent prompt filter dict in canonical spelling"""
+        result = {}
+        if self.period:
+            result["period"] = self.period[1]
+
+        nested = []
+        for term in self.terms:
+            if term[0] == "entity" and term[1] not in result:
+                result[term[1]] = term[2]
+            else:
+                nested.append(_term_filters(term))
+
+        if len(nested) == 1 and "or" in nested[0]:
+            result["or"] = nested[0]["or"]
+        elif nested:
+            result["and"] = nested
+        return result
+
+
+def normalize_filters(prompt_filters: Optional[Dict[str, Any]], today: Optional[date] = None) -> CanonicalFilters:
+    """Canonical form of prompt filters; periods resolve to absolute day-aligned ranges.
+    Raises ValueError for unknown periods like parse_prompt_filters"""
+    today = today or date.today()
+    prompt_filters = prompt_filters or {}
+
+    # The top-level period stays separate: calculators read it from the filter dict
+    period = _period_term(prompt_filters["period"], today) if "period" in prompt_filters else None
+    terms = _terms({k: v for k, v in prompt_filters.items() if k != "period"}, today)
+    return CanonicalFilters(period=period, terms=_conjunction(terms))
+
+
+def filters_hash(prompt_filters: Optional[Dict[str, Any]], today: Optional[date] = None) -> str:
+    """Stable hash of the canonical form of prompt filters"""
+    return normalize_filters(prompt_filters, today).hash
@@ -0,0 +1,175 @@
+"""
+Filter Planner - cost-based ordering of independent filters
+The top-level filters of a FilterSet are ANDed, so they can run in any order.
+Each one becomes a step with an estimated selectivity (from index cardinalities,
+observed pass rates or operator defaults) and a per-item cost (observed timings
+or defaults); steps run cheapest-per-rejected-item first.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+import time
+
+from universal_filter import UniversalFilter, FilterOperator
+from filter_compiler import Predicate, fuse_all
+
+# Step kinds, in the order apply_filters used to run them
+STEP_KINDS = ('logical', 'period', 'cross', 'entity')
+
+# Seconds per item when no timing has been observed yet
+DEFAULT_COSTS = {
+    'logical': 1e-6,
+    'period': 2e-6,   # Parses the date string of every item
+    'cross': 2e-7,
+    'entity': 1e-7
+}
+
+DEFAULT_SELECTIVITY = 0.5
+
+
+def default_selectivity(filter_obj: UniversalFilter) -> float:
+    """Rough fraction of items passing a filter, by operator"""
+    operator = filter_obj.operator
+    if operator == FilterOperator.EQUALS:
+        return 0.1
+    if operator == FilterOperator.IN:
+        count = len(filter_obj.value) if isinstance(filter_obj.value, (list, tuple, set)) else 1
+        return min(0.1 * count, 0.9)
+    if operator in (FilterOperator.NOT_EQUALS, FilterOperator.NOT_IN, FilterOperator.EXISTS):
+        return 0.9
+    if operator == FilterOperator.CONTAINS:
+        return 0.3
+    return DEFAULT_SELECTIVITY
+
+
+@dataclass
+class FilterStep:
+    """One independent filter of a plan with its estimates"""
+    kind: str
+    label: str
+    predicate: Predicate
+    filter: Any = None
+    position: int = 0  # Position in the unplanned order
+    selectivity: float = DEFAULT_SELECTIVITY
+    selectivity_source: str = 'default'
+    cost: float = 0.0
+    cost_source: str = 'default'
+
+    @property
+    def signature(self) -> str:
+        """Stats key: the same filter gets the same signature across requests"""
+        return f"{self.kind}:{self.label}"
+
+    @property
+    def rank(self) -> float:
+        """Expected cost per rejected item; lower runs first"""
+        if self.selectivity >= 1.0:
+            return float('inf')
+        return self.cost / (1.0 - self.selectivity)
+
+
+class FilterStats:
+    """Observed pass rates and per-item evaluation times per filter signature"""
+
+    SMOOTHING = 0.3
+
+    def __init__(self):
+        # signature -> (pass rate, seconds per item, runs)
+        self._stats: Dict[str, Tuple[float, float, int]] = {}
+
+    def record(self, signature: str, evaluated: int, passed: int, seconds: float) -> None:
+        if evaluated <= 0:
+            return
+        pass_rate = passed / evaluated
+        cost = seconds / evaluated
+        previous = self._stats.get(signature)
+        if previous is not None:
+            pass_rate = previous[0] + self.SMOOTHING * (pass_rate - previous[0])
+            cost = previous[1] + self.SMOOTHING * (cost - previous[1])
+        runs = previous[2] + 1 if previous is not None else 1
+        self._stats[signature] = (pass_rate, cost, runs)
+
+    def get(self, signature: str) -> Optional[Tuple[float, float, int]]:
+        return self._stats.get(signature)
+
+
+class FilterPlan:
+    """Steps ordered by rank; runs them as narrowing passes and records their stats"""
+
+    def __init__(self, steps: List[FilterStep], stats: FilterStats):
+        self.original = sorted(steps, key=lambda step: step.position)
+        self.steps = sorted(steps, key=lambda step: (step.rank, step.position))
+        self.stats = stats
+
+    @property
+    def reordered(self) -> bool:
+        return [step.position for step in self.steps] != [step.position for step in self.original]
+
+    def predicate(self) -> Optional[Predicate]:
+        """The steps fused in planned order, so the most selective rejects first"""
+        return fuse_all(step.predicate for step in self.steps)
+
+    def run(self, items: Sequence[Any], trace: Optional[List[Dict[str, Any]]] = None) -> Sequence[Any]:
+        """Narrow items step by step; per-step cardinalities and timings go to trace when given"""
+        for step in self.steps:
+            if not items:
+                break
+            started = time.perf_counter()
+            passed = [item for item in items if step.predicate(item)]
+            elapsed = time.perf_counter() - started
+            self.stats.record(step.signature, len(items), len(passed), elapsed)
+            if trace is not None:
+                trace.append({
+                    "kind": step.kind,
+                    "filter": step.label,
+                    "rows_in": len(items),
+                    "rows_out": len(passed),
+                    "elapsed_ms": round(elapsed * 1000, 3)
+                })
+            items = passed
+        return items
+
+    def explain(self, row_count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Planned steps with their estimates and, given the input size, expected surviving rows"""
+        rows = float(row_count) if row_count is not None else None
+        explained = []
+        for order, step in enumerate(self.steps):
+            entry = {
+                "order": order,
+                "original_order": step.position,
+                "kind": step.kind,
+                "filter": step.label,
+                "selectivity": round(step.selectivity, 4),
+                "selectivity_source": step.selectivity_source,
+                "cost_per_item_us": round(step.cost * 1e6, 4),
+                "cost_source": step.cost_source
+            }
+            if rows is not None:
+                entry["estimated_rows_in"] = int(round(rows))
+                rows *= step.selectivity
+                entry["estimated_rows_out"] = int(round(rows))
+            explained.append(entry)
+        return explained
+
+
+def estimate_step(step: FilterStep, stats: FilterStats,
+                  index_selectivity: Optional[float] = None) -> FilterStep:
+    """Step with estimates: index cardinality, then observed stats, then defaults"""
+    observed = stats.get(step.signature)
+
+    if index_selectivity is not None:
+        selectivity, selectivity_source = index_selectivity, 'index'
+    elif observed is not None:
+        selectivity, selectivity_source = observed[0], 'stats'
+    elif isinstance(step.filter, UniversalFilter):
+        selectivity, selectivity_source = default_selectivity(step.filter), 'default'
+    else:
+        selectivity, selectivity_source = DEFAULT_SELECTIVITY, 'default'
+
+    if observed is not None:
+        cost, cost_source = observed[1], 'stats'
+    else:
+        cost, cost_source = DEFAULT_COSTS.get(step.kind, DEFAULT_COSTS['entity']), 'default'
+
+    return replace(step, selectivity=selectivity, selectivity_source=selectivity_source,
+                   cost=cost, cost_source=cost_source)
@@ -0,0 +1,157 @@
+"""
+Funnel Engine - stage reach, stage-to-stage conversion and time in stage
+Built from ordered status transitions per applicant-vacancy pair, ordered by
+vacancy_statuses.order_number. Logs are consumed incrementally: a new log only
+re-summarizes its own pair, so total work stays linear in the number of logs.
+"""
+
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+from datetime import datetime
+import bisect
+import logging
+
+from log_store import log_vacancy_id
+from duration_sketch import DurationSketch
+
+logger = logging.getLogger(__name__)
+
+PairKey = Tuple[Any, Any]
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Parse an ISO timestamp (with or without offset) to POSIX seconds"""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def funnel_pair_key(log: Dict[str, Any]) -> PairKey:
+    """Applicant-vacancy pair a status log belongs to"""
+    return log.get('applicant_id'), log_vacancy_id(log)
+
+
+class FunnelEngine:
+    """Incremental funnel over status transitions per applicant-vacancy pair"""
+
+    def __init__(self, statuses: List[Dict[str, Any]]):
+        # Trash statuses (rejections) end a pair's journey but are not funnel stages
+        self.stages = sorted(
+            (status for status in statuses if status.get('type') != 'trash'),
+            key=lambda x: (x.get('order_number') if x.get('order_number') is not None else x.get('order', 0))
+        )
+        self._stage_order = {
+            stage.get('id'): (stage.get('order_number') if stage.get('order_number') is not None else stage.get('order', 0))
+            for stage in self.stages
+        }
+        self._transitions: Dict[PairKey, List[Tuple[float, Any]]] = {}
+        self._summaries: Dict[PairKey, Dict[str, Any]] = {}
+
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> int:
+        """Consume logs not ingested before; only the pairs they touch are re-summarized"""
+        touched = set()
+        for log in logs:
+            if log.get('type') != 'STATUS':
+                continue
+
+            status_id = log.get('status_id')
+            timestamp = parse_timestamp(log.get('created'))
+            pair = funnel_pair_key(log)
+            if status_id is None or timestamp is None or pair[0] is None:
+                continue
+
+            bisect.insort(self._transitions.setdefault(pair, []), (timestamp, status_id))
+            touched.add(pair)
+
+        for pair in touched:
+            self._summaries[pair] = self._summarize(self._transitions[pair])
+
+        return len(touched)
+
+    def _summarize(self, transitions: List[Tuple[float, Any]]) -> Dict[str, Any]:
+        """Furthest stage order reached, current status and closed stays (status_id, days) of one pair"""
+        max_order = None
+        stays = []
+        for i, (timestamp, status_id) in enumerate(transitions):
+            order = self._stage_order.get(status_id)
+            if order is not None and (max_order is None or order > max_order):
+                max_order = order
+            if i + 1 < len(transitions) and status_id in self._stage_order:
+                stays.append((status_id, (transitions[i + 1][0] - timestamp) / 86400))
+
+        return {
+            'max_order': max_order,
+            'current_status': transitions[-1][1],
+            'stays': stays
+        }
+
+    def time_in_stage_sketches(self, pairs: Optional[Iterable[PairKey]] = None) -> Dict[Any, DurationSketch]:
+        """status_id -> sketch of completed stay durations (days), for all pairs or a cohort"""
+        summaries = self._summaries.values() if pairs is None else (
+            self._summaries[pair] for pair in pairs if pair in self._summaries
+        )
+        sketches: Dict[Any, DurationSketch] = {}
+        for summary in summaries:
+            for status_id, days in summary['stays']:
+                if status_id not in sketches:
+                    sketches[status_id] = DurationSketch()
+                sketches[status_id].add(days)
+        return sketches
+
+    def report(self, pairs: Optional[Iterable[PairKey]] = None) -> List[Dict[str, Any]]:
+        """Per-stage funnel rows in funnel order, for all pairs or a cohort of pairs
+
+        reached: pairs whose furthest stage is at or beyond this stage
+        current: pairs whose latest status is this stage
+        conversion: reached / reached of the previous stage, %
+        median_days_in_stage / p90_days_in_stage: over completed stays in this stage
+        """
+        if pairs is None:
+            summaries = self._summaries.values()
+        else:
+            summaries = [self._summaries[pair] for pair in pairs if pair in self._summaries]
+
+        reached_by_order: Dict[Any, int] = {}
+        current_counts: Dict[Any, int] = {}
+        stage_sketches: Dict[Any, DurationSketch] = {}
+        for summary in summaries:
+            if summary['max_order'] is not None:
+                reached_by_order[summary['max_order']] = reached_by_order.get(summary['max_order'], 0) + 1
+            current_counts[summary['current_status']] = current_counts.get(summary['current_status'], 0) + 1
+            for status_id, days in summary['stays']:
+                if status_id not in stage_sketches:
+                    stage_sketches[status_id] = DurationSketch()
+                stage_sketches[status_id].add(days)
+
+        # Reach at an order = pairs whose furthest order is >= it (suffix sums over orders)
+        reached_at_or_beyond: Dict[Any, int] = {}
+        running = 0
+        for order in sorted(set(self._stage_order.values()) | set(reached_by_order), reverse=True):
+            running += reached_by_order.get(order, 0)
+            reached_at_or_beyond[order] = running
+
+        rows = []
+        previous_reached = None
+        for stage in self.stages:
+            stage_id = stage.get('id')
+            reached = reached_at_or_beyond.get(self._stage_order[stage_id], 0)
+            sketch = stage_sketches.get(stage_id) or DurationSketch()
+            if previous_reached is None:
+                conversion = 100.0 if reached else 0.0
+            else:
+                conversion = (reached / previous_reached * 100) if previous_reached else 0.0
+            rows.append({
+                'id': stage_id,
+                'name': stage.get('name', 'Unknown'),
+                'order': self._stage_order[stage_id],
+                'reached': reached,
+                'current': current_counts.get(stage_id, 0),
+                'conversion': conversion,
+                'median_days_in_stage': sketch.median,
+                'p90_days_in_stage': sketch.p90
+            })
+            previous_reached = reached
+
+        return rows
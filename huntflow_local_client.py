@@ -4,6 +4,7 @@ Provides the same interface as HuntflowClient but uses local data.
 """
 
 import json
+import os
 import sqlite3
 from typing import Dict, List, Any, Optional
 import asyncio
@@ -24,6 +25,17 @@ class HuntflowLocalClient:
         conn.close()
         return str(result[0]) if result else "55477"
     
+    def data_version(self) -> str:
+        """Changes whenever the cache database is written (file state of the database and its WAL)"""
+        parts = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+            except FileNotFoundError:
+                parts.append("-")
+        return "/".join(parts)
+    
     def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute query and return results as list of dicts."""
         conn = sqlite3.connect(self.db_path)
@@ -0,0 +1,293 @@
+"""
+Log Store - indexed, time-sorted view over merged applicant logs
+Built once from LogAnalyzer.get_merged_logs() and shared by calculator methods,
+so grouped metrics run one pass over the logs instead of rescanning per item.
+"""
+
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Callable, Set, Sequence, FrozenSet
+from datetime import datetime
+import bisect
+import logging
+
+from filter_compiler import parse_item_date
+
+logger = logging.getLogger(__name__)
+
+# Status of the STATUS logs that close a vacancy (see EnhancedMetricsCalculator.vacancies_all)
+HIRED_STATUS_ID = 103682
+
+
+def normalize_id(value: Any) -> Any:
+    """Canonical entity ID: ints and digit strings become int, other values are returned as-is"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped.isdigit():
+            return int(stripped)
+        return stripped
+    return value
+
+
+def log_vacancy_id(log: Dict[str, Any]) -> Any:
+    """Vacancy ID of a log entry (merged logs use both 'vacancy_id' and 'vacancy')"""
+    vacancy = log.get('vacancy_id') or log.get('vacancy')
+    if isinstance(vacancy, dict):
+        return vacancy.get('id')
+    return vacancy
+
+
+def log_recruiter(log: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+    """(recruiter_id, recruiter_name) of a log entry from its account_info"""
+    account_info = log.get('account_info', {})
+    if isinstance(account_info, dict):
+        return account_info.get('id'), account_info.get('name')
+    return None, None
+
+
+def log_source_id(log: Dict[str, Any]) -> Any:
+    """Source ID of a log entry ('source' may be an ID or a {'id': ...} dict)"""
+    source = log.get('source') or log.get('source_id')
+    if isinstance(source, dict):
+        return source.get('id')
+    return source
+
+
+def log_time(log: Dict[str, Any]) -> Optional[datetime]:
+    """Naive 'created' datetime of a log as period filters see it, None when missing or unparseable"""
+    created = log.get('created')
+    if not created or not isinstance(created, str):
+        return None
+    parsed = parse_item_date(created)
+    if parsed is None or parsed.tzinfo is not None:
+        return None
+    return parsed
+
+
+class SequenceSlice(Sequence):
+    """Read-only view of seq[start:stop] that doesn't copy the underlying list"""
+
+    __slots__ = ('_seq', '_start', '_stop')
+
+    def __init__(self, seq: Sequence, start: int, stop: int):
+        self._seq = seq
+        self._start = start
+        self._stop = max(start, stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._seq[i] for i in range(self._start, self._stop)[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SequenceSlice index out of range")
+        return self._seq[self._start + index]
+
+    def __iter__(self):
+        seq = self._seq
+        for i in range(self._start, self._stop):
+            yield seq[i]
+
+
+class LogStore:
+    """Time-sorted merged logs with indexes maintained incrementally on ingest"""
+
+    def __init__(self, logs: Optional[Iterable[Dict[str, Any]]] = None):
+        self.logs: List[Dict[str, Any]] = []
+        self.status_logs: List[Dict[str, Any]] = []
+        self.version = 0
+        # Parsed 'created' of logs / status_logs, None when some log has no comparable date
+        self._log_times: Optional[List[datetime]] = []
+        self._status_log_times: Optional[List[datetime]] = []
+        self._seen_log_ids = set()
+        self._synced_len = 0
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        # applicant_id -> source_id from the first ingested log that carries a source
+        self.source_by_applicant: Dict[Any, Any] = {}
+        # applicant_id -> (created, recruiter_id, recruiter_name) of the most recent log with account_info
+        self.latest_recruiter_by_applicant: Dict[Any, Tuple[str, Any, Optional[str]]] = {}
+        # Reverse relationships between normalized IDs, for filtering recruiters and sources
+        self.recruiters_by_vacancy: Dict[Any, Set[Any]] = {}
+        self.sources_by_vacancy: Dict[Any, Set[Any]] = {}
+        self.sources_by_recruiter: Dict[Any, Set[Any]] = {}
+        self.recruiters_by_source: Dict[Any, Set[Any]] = {}
+        # Vacancy IDs as logs carry them, and the ones with a hire log (closed vacancies)
+        self.vacancy_ids: Set[Any] = set()
+        self.closed_vacancy_ids: Set[Any] = set()
+        self._vacancy_states: Optional[Tuple[int, Dict[str, FrozenSet[Any]]]] = None
+        # Unions of several states, for the same store version as _vacancy_states
+        self._vacancy_state_unions: Dict[Tuple[str, ...], FrozenSet[Any]] = {}
+        # vacancy_id -> position from the first ingested log of the vacancy (its display name)
+        self.vacancy_positions: Dict[Any, str] = {}
+
+        if logs:
+            self.ingest(logs)
+
+    def sync(self, all_logs: List[Dict[str, Any]]) -> int:
+        """Ingest logs not seen yet; O(1) when the analyzer returned the same amount of logs"""
+        if len(all_logs) == self._synced_len:
+            return 0
+        added = self.ingest(all_logs)
+        self._synced_len = len(all_logs)
+        return added
+
+    def ingest(self, logs: Iterable[Dict[str, Any]]) -> int:
+        """Add new logs and update every index in the same pass. Returns number of logs added"""
+        new_logs = []
+        for log in logs:
+            log_id = log.get('id')
+            if log_id is not None:
+                if log_id in self._seen_log_ids:
+                    continue
+                self._seen_log_ids.add(log_id)
+            new_logs.append(log)
+
+        if not new_logs:
+            return 0
+
+        new_logs.sort(key=lambda x: x.get('created') or '')
+        needs_resort = bool(self.logs) and (new_logs[0].get('created') or '') < (self.logs[-1].get('created') or '')
+
+        for log in new_logs:
+            self._index_log(log)
+
+        self.logs.extend(new_logs)
+        self.status_logs.extend(log for log in new_logs if log.get('type') == 'STATUS')
+        if needs_resort:
+            self.logs.sort(key=lambda x: x.get('created') or '')
+            self.status_logs.sort(key=lambda x: x.get('created') or '')
+            self._log_times = self._times(self.logs)
+            self._status_log_times = self._times(self.status_logs)
+        else:
+            self._log_times = self._extend_times(self._log_times, new_logs)
+            self._status_log_times = self._extend_times(
+                self._status_log_times, [log for log in new_logs if log.get('type') == 'STATUS']
+            )
+
+        for listener in self._listeners:
+            listener(new_logs)
+
+        self.version += 1
+        logger.debug(f"LogStore ingested {len(new_logs)} logs (version {self.version}, total {len(self.logs)})")
+        return len(new_logs)
+
+    def subscribe(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Register an incremental consumer: replays current logs, then receives each new batch"""
+        if self.logs:
+            listener(self.logs)
+        self._listeners.append(listener)
+
+    def _times(self, logs: List[Dict[str, Any]]) -> Optional[List[datetime]]:
+        return self._extend_times([], logs)
+
+    def _extend_times(self, times: Optional[List[datetime]], logs: List[Dict[str, Any]]) -> Optional[List[datetime]]:
+        """Append parsed times; None once a log has no date or times stop being ascending"""
+        if times is None:
+            return None
+        for log in logs:
+            parsed = log_time(log)
+            if parsed is None or (times and parsed < times[-1]):
+                return None
+            times.append(parsed)
+        return times
+
+    def time_slice(self, logs: List[Dict[str, Any]], start: datetime, end: datetime) -> Optional[SequenceSlice]:
+        """Logs with start <= created < end as a zero-copy view, found by binary search.
+        Only for this store's logs/status_logs while every log has an ascending, parseable date"""
+        if logs is self.logs:
+            times = self._log_times
+        elif logs is self.status_logs:
+            times = self._status_log_times
+        else:
+            return None
+        if times is None or len(times) != len(logs):
+            return None
+        return SequenceSlice(logs, bisect.bisect_left(times, start), bisect.bisect_left(times, end))
+
+    def _index_log(self, log: Dict[str, Any]) -> None:
+        """Update indexes with a single log entry"""
+        self._index_relationships(log)
+        self._index_vacancy_state(log)
+
+        applicant_id = log.get('applicant_id')
+        if applicant_id is None:
+            return
+
+        source_id = log_source_id(log)
+        if source_id is not None and applicant_id not in self.source_by_applicant:
+            self.source_by_applicant[applicant_id] = source_id
+
+        recruiter_id, recruiter_name = log_recruiter(log)
+        if recruiter_id is not None or recruiter_name:
+            created = log.get('created') or ''
+            latest = self.latest_recruiter_by_applicant.get(applicant_id)
+            if latest is None or created >= latest[0]:
+                self.latest_recruiter_by_applicant[applicant_id] = (created, recruiter_id, recruiter_name)
+
+    def _index_relationships(self, log: Dict[str, Any]) -> None:
+        """Record vacancy/recruiter/source co-occurrence of a log under normalized IDs"""
+        vacancy_id = normalize_id(log_vacancy_id(log))
+        recruiter_id = normalize_id(log_recruiter(log)[0])
+        source_id = normalize_id(log_source_id(log))
+
+        if vacancy_id:
+            if recruiter_id:
+                self.recruiters_by_vacancy.setdefault(vacancy_id, set()).add(recruiter_id)
+            if source_id:
+                self.sources_by_vacancy.setdefault(vacancy_id, set()).add(source_id)
+        if recruiter_id and source_id:
+            self.sources_by_recruiter.setdefault(recruiter_id, set()).add(source_id)
+            self.recruiters_by_source.setdefault(source_id, set()).add(recruiter_id)
+
+    def _index_vacancy_state(self, log: Dict[str, Any]) -> None:
+        vacancy_id = log_vacancy_id(log)
+        if not vacancy_id:
+            return
+        self.vacancy_ids.add(vacancy_id)
+        if vacancy_id not in self.vacancy_positions:
+            self.vacancy_positions[vacancy_id] = log.get('vacancy_position', 'Unknown Position')
+        if log.get('type') == 'STATUS' and log.get('status_id') == HIRED_STATUS_ID:
+            self.closed_vacancy_ids.add(vacancy_id)
+
+    def vacancy_ids_by_state(self) -> Dict[str, FrozenSet[Any]]:
+        """Vacancy state ('OPEN' / 'CLOSED') -> vacancy IDs, frozen once per store version"""
+        if self._vacancy_states is None or self._vacancy_states[0] != self.version:
+            closed = frozenset(self.closed_vacancy_ids)
+            self._vacancy_states = (self.version, {
+                'OPEN': frozenset(self.vacancy_ids - closed),
+                'CLOSED': closed
+            })
+            self._vacancy_state_unions = {}
+        return self._vacancy_states[1]
+
+    def vacancy_ids_in_states(self, states: Iterable[str]) -> FrozenSet[Any]:
+        """Vacancy IDs in any of the states, computed once per store version"""
+        by_state = self.vacancy_ids_by_state()
+        states = tuple(sorted(set(states)))
+        if len(states) == 1:
+            return by_state.get(states[0], frozenset())
+        union = self._vacancy_state_unions.get(states)
+        if union is None:
+            union = frozenset().union(*(by_state.get(state, frozenset()) for state in states))
+            self._vacancy_state_unions[states] = union
+        return union
+
+    def related_ids(self, relation: Dict[Any, Set[Any]], keys: Iterable[Any]) -> Set[Any]:
+        """Union of a reverse relationship over (normalized) keys"""
+        result = set()
+        for key in keys:
+            result |= relation.get(normalize_id(key), set())
+        return result
+
+    def recruiter_name_for_applicant(self, applicant_id: Any) -> str:
+        """Name of the recruiter who most recently worked with the applicant"""
+        latest = self.latest_recruiter_by_applicant.get(applicant_id)
+        return (latest[2] if latest else None) or 'Unknown'
@@ -51,7 +51,7 @@ When user asks about a specific entity (recruiter, vacancy, source, etc.), ALL m
 • 'какая конверсия' -> conversion -> {"operation": "avg", "entity": "vacancies", "value_field": "conversion"}
 • 'какой источник???????????' -> number of applicants with the source that has most applicants -> {"operation": "count", "entity": "applicants", "value_field": null}
 • 'ситуация в воронке' — number of applicants in open vacancies -> {"operation": "count", "entity": "applicants", "value_field": null}
-• 'кто лучше ищет кандидатов' -> ratio of applicants added by recruiter to hires by recruiter -> {"operation": "avg", "entity": "recruiters", "value_field": "applicants"}
+• 'кто лучше ищет кандидатов' -> number of applicants added, grouped by recruiter (compare with hires by recruiter in secondary metrics) -> {"operation": "count", "entity": "applicants", "value_field": null}
 
 ## 4. Choose 2 secondary metrics that allow to understand context of the main metric
 • main metric: hires by recruiter -> secondary: number of applicants added by recutier (to assess hired to added); number of vacancies by recruier (to assess hired to vacancy ratio)
@@ -88,27 +88,25 @@ When user asks about a specific entity (recruiter, vacancy, source, etc.), ALL m
 
 ## Entity Types
 
-applicants | vacancies | recruiters | hiring_managers | stages | sources | hires | rejections | actions | divisions
+applicants | vacancies | recruiters | hiring_managers | stages | sources | hires | rejections | actions | divisions | funnel
 
 ## Operations and Value Fields
 	•	count: for quantities, distributions, totals (value_field = null)
-	•	avg: for averages, rates, duration metrics (value_field = numeric column name)  
-	•	sum: for cumulative values, totals with numeric fields (value_field = numeric column name)
-
-**Available value fields by entity:**
-	•	applicants: count
-	•	vacancies: applicants, hired, days_active, conversion
-	•	recruiters: applicants, hires
-	•	hiring_managers: vacancies, applicants
-	•	stages: applicants, conversion
-	•	sources: applicants, hired
-	•	hires: time_to_hire
-	•	rejections: stage_id
-	•	actions: count
-	•	divisions: vacancies, applicants, recruiters
+	•	avg: for averages, rates, duration metrics (value_field = a measure listed below)  
+	•	sum: for cumulative values, totals with numeric fields (value_field = a measure listed below)
+	•	median, p90: for typical and worst-case durations (value_field = time_to_hire or days_active)
+
+**Available value fields by entity (avg/sum/median/p90 accept ONLY these; other entities can only be counted):**
+	•	hires: time_to_hire (days from application to hire)
+	•	vacancies: days_active (days open), hire_count (hires per vacancy), conversion
+	•	applicants: money (expected salary), conversion
+	•	stages: stay_duration (days allowed on the stage), conversion
+	•	any entity: conversion (hires / applicants, %)
+	•	funnel: reached, current, conversion, median_days_in_stage, p90_days_in_stage (stages in funnel order, no group_by)
+	•	For "average number of X per recruiter/source/...", use count of X grouped by that dimension instead of avg
 
 ## Filtering Parameters
-period: year | 6 month | 3 month | 1 month | 2 weeks | this week | today — required, applies to created
+period: year | 6 month | 3 month | 1 month | 2 weeks | this week | today | yesterday | N day/week/month/quarter/year | this/last week/month/quarter/year | YYYY-MM-DD..YYYY-MM-DD — required, applies to created
 applicants: id | active
 vacancies: open | closed | paused | id
 recruiters: id | with_vacancies | no_vacancies
@@ -139,6 +137,8 @@ Combine filters using logical operators:
 	•	actions: recruiter, source, stage, division, vacancy, hiring_manager, month, day, year
 	•	divisions: recruiters, vacancies, sources, stages, hiring_managers, month, day, year
 	•	CRITICAL: NEVER group an entity by itself (e.g., hires by "hires" is INVALID)
+	•	Time grouping: day, week, month, quarter, year (buckets come out in chronological order, empty ones included)
+	•	Time series per dimension: "operation": "date_trunc", "date_trunc": "week", "group_by": {{ "field": "recruiters" }} - one series per recruiter
   
 Examples:
 	•	For candidate flows: use {{ “field”: “stages” }} to group applicants by recruitment stages
@@ -200,7 +200,7 @@ Examples:
       "properties": {
         "period": {
           "type": "string",
-          "enum": ["year", "6 month", "3 month", "1 month", "2 weeks", "this week", "today"]
+          "description": "year | 6 month | 3 month | 1 month | 2 weeks | this week | today | yesterday | N day/week/month/quarter/year | this/last week/month/quarter/year | YYYY-MM-DD..YYYY-MM-DD"
         },
         "recruiters": { "type": ["string", "null"] },
         "sources": { "type": ["string", "null"] },
@@ -259,10 +259,10 @@ Examples:
       "type": "object",
       "required": ["operation", "entity"],
       "properties": {
-        "operation": { "enum": ["count", "avg", "sum", "date_trunc"] },
-        "entity": { "enum": ["applicants","vacancies","recruiters","hiring_managers","stages","sources","hires","rejections","actions","divisions"] },
+        "operation": { "enum": ["count", "avg", "sum", "median", "p90", "date_trunc"] },
+        "entity": { "enum": ["applicants","vacancies","recruiters","hiring_managers","stages","sources","hires","rejections","actions","divisions","funnel"] },
         "value_field": { "type": ["string", "null"] },
-        "date_trunc": { "type": ["string", "null"], "enum": ["day", "month", "year", null] }
+        "date_trunc": { "type": ["string", "null"], "enum": ["day", "week", "month", "quarter", "year", null] }
       },
       "additionalProperties": false
     },
@@ -270,8 +270,8 @@ Examples:
       "type": "object",
       "required": ["operation", "entity"],
       "properties": {
-        "operation": { "enum": ["count", "avg", "sum", "date_trunc"] },
-        "entity": { "enum": ["applicants","vacancies","recruiters","hiring_managers","stages","sources","hires","rejections","actions","divisions"] },
+        "operation": { "enum": ["count", "avg", "sum", "median", "p90", "date_trunc"] },
+        "entity": { "enum": ["applicants","vacancies","recruiters","hiring_managers","stages","sources","hires","rejections","actions","divisions","funnel"] },
         "value_field": { "type": ["string", "null"] },
         "group_by": {
           "oneOf": [
@@ -279,7 +279,7 @@ Examples:
             { "type": "object", "required": ["field"], "properties": { "field": { "type": "string" } }, "additionalProperties": false }
           ]
         },
-        "date_trunc": { "type": ["string", "null"], "enum": ["day", "month", "year", null] }
+        "date_trunc": { "type": ["string", "null"], "enum": ["day", "week", "month", "quarter", "year", null] }
       },
       "additionalProperties": false
     }
@@ -419,17 +419,17 @@ Result: Automatic recruiter breakdown + pipeline chart
 Question: "Сравни рекрутеров по эффективности"
 ```json
 {
-  "report_title": "Отчет по среднему количеству наймов с детализацией по рекрутерам за 6 месяцев",
+  "report_title": "Отчет по эффективности рекрутеров за 6 месяцев",
   "metrics_filter": {
     "period": "6 month"
   },
   "main_metric": {
-    "label": "Среднее количество наймов",
-    "value": {"operation": "avg", "entity": "recruiters", "value_field": "hires"}
+    "label": "Среднее время найма",
+    "value": {"operation": "avg", "entity": "hires", "value_field": "time_to_hire"}
   },
   "secondary_metrics": [
-    {"label": "Среднее количество кандидатов", "value": {"operation": "avg", "entity": "recruiters", "value_field": "applicants"}},
-    {"label": "Среднее время найма", "value": {"operation": "avg", "entity": "hires", "value_field": "time_to_hire"}}
+    {"label": "Количество наймов", "value": {"operation": "count", "entity": "hires"}},
+    {"label": "Количество кандидатов", "value": {"operation": "count", "entity": "applicants"}}
   ],
   "chart": {
     "label": "Эффективность рекрутеров",
@@ -0,0 +1,100 @@
+"""
+Query Profiler - opt-in explain/profile records for filter and chart evaluation
+While a profile is active (see profiling()), the filter engine, the calculator and
+the chart processor append one record per stage: input/output cardinality, elapsed
+time, access path, cache hits and relationship choices. Without an active profile
+every hook is a single ContextVar lookup.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Iterator
+import json
+import logging
+import time
+
+# Structured profile records go to their own logger so they can be routed separately
+profile_logger = logging.getLogger("query_profile")
+
+
+class QueryProfile:
+    """Stage records and cache counters collected for one request"""
+
+    def __init__(self, label: Optional[str] = None):
+        self.label = label
+        self.stages: List[Dict[str, Any]] = []
+        self.caches: Dict[str, Dict[str, int]] = {}
+        self._started = time.perf_counter()
+
+    def count_cache(self, cache: str, hit: bool) -> None:
+        counters = self.caches.setdefault(cache, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "elapsed_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "stages": self.stages,
+            "caches": self.caches
+        }
+
+
+_active_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _active_profile.get()
+
+
+@contextmanager
+def profiling(label: Optional[str] = None) -> Iterator[QueryProfile]:
+    """Collect a profile for everything evaluated inside the block (including tasks it starts),
+    then emit it as a structured log record"""
+    profile = QueryProfile(label)
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+        log_profile(profile)
+
+
+@contextmanager
+def profile_stage(stage: str, **fields: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """Time a stage and record it with the given fields; yields the record (None when not
+    profiling) so the stage can add cardinalities and decisions"""
+    profile = _active_profile.get()
+    if profile is None:
+        yield None
+        return
+
+    # Records are appended on entry, so stages appear in the order they started
+    record: Dict[str, Any] = {"stage": stage, **fields}
+    profile.stages.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def profile_event(stage: str, **fields: Any) -> None:
+    """Record an instantaneous decision (no timing)"""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.stages.append({"stage": stage, **fields})
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.count_cache(cache, hit)
+
+
+def log_profile(profile: QueryProfile) -> None:
+    """One structured record per profile: JSON in the message, the dict in `extra`"""
+    record = profile.to_dict()
+    profile_logger.info(
+        "query_profile %s", json.dumps(record, ensure_ascii=False, default=str),
+        extra={"query_profile": record}
+    )
@@ -0,0 +1,196 @@
+"""
+Report Cache - processed reports keyed by their spec, the data version and the day
+The same question usually produces the same report JSON, and its processed form only
+changes when the data changes or the day changes (relative periods resolve against
+today). Processed reports are kept in a bounded LRU; evicted entries can spill to a
+directory of JSON files, so repeats are served without recomputing anything.
+"""
+
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Fields process_chart_data adds to a report; they are not part of its spec
+OUTPUT_FIELDS = ("real_data", "real_value", "total_value", "enhanced_label")
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 4096
+
+
+def _spec(value: Any) -> Any:
+    """Report JSON without processing output"""
+    if isinstance(value, dict):
+        return {key: _spec(item) for key, item in value.items() if key not in OUTPUT_FIELDS}
+    if isinstance(value, list):
+        return [_spec(item) for item in value]
+    return value
+
+
+def report_cache_key(report_json: Dict[str, Any], data_version: str, today: Optional[date] = None) -> str:
+    """Canonical hash of a report spec (key order doesn't matter) for a data version and day"""
+    today = today or date.today()
+    raw = json.dumps([_spec(report_json), data_version, today.isoformat()],
+                     sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def report_etag(cache_keys: List[str]) -> str:
+    """Strong ETag of one report, or a batch of them, from their cache keys: it changes with
+    the spec, the data version and the day exactly when the processed result can change"""
+    if len(cache_keys) == 1:
+        return f'"{cache_keys[0]}"'
+    return '"' + hashlib.sha1("/".join(cache_keys).encode('utf-8')).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names the ETag (weak comparison, as for GET/HEAD)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class ReportCache:
+    """Bounded LRU of processed reports with optional spill of evicted entries to disk"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, spill_dir: Optional[str] = None,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Reports being computed: identical concurrent requests wait for the first one
+        self._pending: Dict[str, asyncio.Future] = {}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Copy of a cached report (memory first, then disk), None on a miss"""
+        report = self._entries.get(key)
+        if report is not None:
+            self._entries.move_to_end(key)
+        else:
+            report = self._read_spilled(key)
+            if report is None:
+                return None
+            self._remember(key, report)
+        return copy.deepcopy(report)
+
+    def put(self, key: str, report: Dict[str, Any]) -> None:
+        self._remember(key, copy.deepcopy(report))
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.spill_dir:
+            try:
+                os.remove(self._spill_path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_compute(self, key: str, factory: Callable[[], Awaitable[Dict[str, Any]]],
+                             cacheable: Callable[[Dict[str, Any]], bool] = lambda report: True) -> Dict[str, Any]:
+        """Cached report, or the report computed by factory (once for concurrent identical requests).
+        Results rejected by cacheable (e.g. error reports) are returned but not kept"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return copy.deepcopy(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            report = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception; nobody else has to retrieve it
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+        future.set_result(report)
+        if cacheable(report):
+            self.put(key, report)
+        return copy.deepcopy(report)
+
+    def _remember(self, key: str, report: Dict[str, Any]) -> None:
+        self._entries[key] = report
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._spill(evicted_key, evicted)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _spill(self, key: str, report: Dict[str, Any]) -> None:
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        try:
+            # Written under a temporary name, so readers never see a partial file
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, default=str)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Failed to spill cached report {key}: {e}")
+            return
+        self._prune_spilled()
+
+    def _read_spilled(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._spill_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read spilled report {key}: {e}")
+            return None
+
+    def _prune_spilled(self) -> None:
+        """Drop the oldest spilled reports beyond max_disk_entries"""
+        try:
+            with os.scandir(self.spill_dir) as entries:
+                files = [entry for entry in entries if entry.name.endswith(".json")]
+            if len(files) <= self.max_disk_entries:
+                return
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:len(files) - self.max_disk_entries]:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Failed to prune spilled reports: {e}")
+
+
+_report_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Process-wide report cache; REPORT_CACHE_SIZE and REPORT_CACHE_DIR (spill directory)
+    are read on first use, after the environment is loaded"""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            max_entries=int(os.getenv("REPORT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            spill_dir=os.getenv("REPORT_CACHE_DIR") or None
+        )
+    return _report_cache
@@ -0,0 +1,78 @@
+"""
+Report Executor - concurrent evaluation of the independent parts of a report
+The chart, the main metric and each secondary metric only read the data layer, so
+they run as concurrent tasks and a report takes as long as its slowest part.
+Sub-queries shared by several parts (the same chart query, the same filter name
+lookups) run once per report; every other caller awaits the first one's task.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterator, Callable, Awaitable, Hashable, TypeVar
+import asyncio
+import copy
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def query_key(*parts: Any) -> str:
+    """Hashable key of a sub-query from its parameters (filter dicts included)"""
+    return json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class ReportExecutor:
+    """Single-flight table of the sub-queries of one report"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self.deduplicated = 0
+
+    def prefill(self, key: Hashable, result: Any) -> None:
+        """Provide the result of a sub-query computed ahead of time (see report_planner)"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        self._tasks[key] = future
+
+    async def shared(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """Result of the sub-query; the first caller starts it, later callers await the same task.
+        Each caller gets its own copy, so callers may modify what they get"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+        else:
+            self.deduplicated += 1
+        # Shielded: one cancelled caller must not cancel the query for the others
+        return copy.deepcopy(await asyncio.shield(task))
+
+
+_active_executor: ContextVar[Optional[ReportExecutor]] = ContextVar("report_executor", default=None)
+
+
+def current_executor() -> Optional[ReportExecutor]:
+    return _active_executor.get()
+
+
+@contextmanager
+def report_execution() -> Iterator[ReportExecutor]:
+    """Share sub-queries among everything evaluated inside the block (including tasks it starts)"""
+    executor = ReportExecutor()
+    token = _active_executor.set(executor)
+    try:
+        yield executor
+    finally:
+        _active_executor.reset(token)
+        if executor.deduplicated:
+            logger.info(f"Report executor: {executor.deduplicated} shared sub-queries reused")
+
+
+async def shared_query(key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+    """Run a sub-query through the active report executor, or directly outside of one"""
+    executor = _active_executor.get()
+    if executor is None:
+        return await factory()
+    return await executor.shared(key, factory)
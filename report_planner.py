@@ -0,0 +1,132 @@
+"""
+Report Planner - one scan per record stream for the counts of a report
+A report usually asks for several counts under the same metrics_filter: the chart,
+the main metric and the secondary metrics. The planner groups those queries by the
+filtered record stream they read (entity + canonical filters) and computes every count
+and grouped count of a stream in a single pass, instead of one trip through
+UniversalChartProcessor per query. Other queries are left to the processor.
+Batches plan the queries of all their reports together (see process_report_batch).
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+import logging
+
+from enhanced_metrics_calculator import EnhancedMetricsCalculator
+from universal_chart_processor import UniversalChartProcessor
+from report_executor import query_key
+from query_profiler import profile_stage
+from filter_normalizer import filters_hash
+
+logger = logging.getLogger(__name__)
+
+
+def chart_query_key(entity: str, operation: str, group_by: Optional[str], filters: Optional[Dict[str, Any]],
+                    value_field: Optional[str], chart_type: str, date_trunc: Optional[str] = None) -> str:
+    """Key of a universal engine query; equal parameters give equal keys"""
+    return query_key("chart", entity, operation, group_by, filters, value_field, chart_type, date_trunc)
+
+
+def _filters_key(filters: Optional[Dict[str, Any]]) -> Any:
+    """Equivalent filter sets ('6 months' and '6 month', any key order) read the same records"""
+    try:
+        return filters_hash(filters)
+    except ValueError:
+        return filters
+
+
+@dataclass
+class AggregateQuery:
+    """An engine query of a report slot (chart, main_metric, secondary_metrics[i])"""
+    slot: str
+    entity: str
+    operation: str = "count"
+    group_by: Optional[str] = None
+    filters: Optional[Dict[str, Any]] = None
+    value_field: Optional[str] = None
+    chart_type: str = "bar"
+    date_trunc: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return chart_query_key(self.entity, self.operation, self.group_by, self.filters,
+                               self.value_field, self.chart_type, self.date_trunc)
+
+    @property
+    def fusable(self) -> bool:
+        """Counts that the processor folds over a record stream (not tables, funnels or conversion)"""
+        return (self.operation == "count" and self.chart_type != "table" and
+                self.entity != "funnel" and self.value_field != "conversion")
+
+
+@dataclass
+class StreamScan:
+    """Count queries over the same filtered record stream, computed in one pass"""
+    entity: str
+    filters: Optional[Dict[str, Any]]
+    queries: List[AggregateQuery] = field(default_factory=list)
+
+    @property
+    def groupings(self) -> List[Optional[str]]:
+        """Distinct groupings, in the order queries asked for them"""
+        return list(dict.fromkeys(query.group_by for query in self.queries))
+
+
+class ReportPlan:
+    """Scans of fused count queries plus the queries left to the chart processor"""
+
+    def __init__(self, scans: List[StreamScan], residual: List[AggregateQuery]):
+        self.scans = scans
+        self.residual = residual
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "scans": [
+                {
+                    "entity": scan.entity,
+                    "filters": scan.filters,
+                    "groupings": scan.groupings,
+                    "slots": [query.slot for query in scan.queries]
+                }
+                for scan in self.scans
+            ],
+            "residual": [query.slot for query in self.residual]
+        }
+
+
+class ReportPlanner:
+    """Plans the engine queries of a report and computes the fusable ones"""
+
+    def __init__(self, calc: EnhancedMetricsCalculator):
+        self.processor = UniversalChartProcessor(calc)
+
+    def plan(self, queries: List[AggregateQuery]) -> ReportPlan:
+        scans: Dict[str, StreamScan] = {}
+        residual = []
+        for query in queries:
+            if not query.fusable:
+                residual.append(query)
+                continue
+            stream_key = query_key(query.entity, _filters_key(query.filters))
+            if stream_key not in scans:
+                scans[stream_key] = StreamScan(query.entity, query.filters)
+            scans[stream_key].queries.append(query)
+        return ReportPlan(list(scans.values()), residual)
+
+    async def execute(self, plan: ReportPlan) -> Dict[str, Dict[str, Any]]:
+        """Chart results of the fused queries by query key. Queries of a failed scan, or with a grouping
+        that has no in-stream key, are left out and run through the processor"""
+        results = {}
+        with profile_stage("report_plan", plan=plan.explain()) as record:
+            for scan in plan.scans:
+                try:
+                    by_grouping = await self.processor.count_groupings(scan.entity, scan.filters, scan.groupings)
+                except Exception as e:
+                    logger.warning(f"Fused scan over {scan.entity} failed, falling back to per-query evaluation: {e}")
+                    continue
+                for query in scan.queries:
+                    if query.group_by in by_grouping:
+                        results[query.key] = by_grouping[query.group_by]
+            if record is not None:
+                record["fused_queries"] = len(results)
+        return results
@@ -0,0 +1,238 @@
+"""
+SQL Pushdown - translate filters into WHERE clauses over the SQLite cache
+Filters on log-backed entities (applicants, actions, rejections) that map onto
+applicant_logs columns run in SQLite; everything else is returned as a
+residual FilterSet and evaluated in memory by the compiled predicate.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Callable, Union
+import logging
+
+from universal_filter import UniversalFilter, FilterSet, PeriodFilter, EntityType, FilterOperator, LogicalFilter
+
+logger = logging.getLogger(__name__)
+
+Clause = Tuple[str, List[Any]]
+
+# Entities whose rows are applicant_logs rows
+LOG_ENTITIES = {EntityType.APPLICANTS, EntityType.ACTIONS, EntityType.REJECTIONS}
+
+# Log fields backed by integer columns of applicant_logs ('id' is resolved per store, see LOG_ID_EXPRESSIONS)
+LOG_COLUMNS = {
+    'applicant_id': 'l.applicant_id',
+    'vacancy_id': 'l.vacancy_id',
+    'status_id': 'l.status_id'
+}
+
+RECRUITER_COLUMN = "json_extract(l.raw_data, '$.account_info.id')"
+
+# Where a merged log's 'id' may come from: the row ID or the ID in the API payload
+LOG_ID_EXPRESSIONS = ("l.id", "json_extract(l.raw_data, '$.id')")
+
+TRUE_CLAUSE: Clause = ("1 = 1", [])
+FALSE_CLAUSE: Clause = ("0 = 1", [])
+
+
+@dataclass
+class PushdownPlan:
+    """WHERE clauses for applicant_logs plus the filters left for in-memory evaluation"""
+    where: List[str] = field(default_factory=list)
+    params: List[Any] = field(default_factory=list)
+    residual: FilterSet = field(default_factory=FilterSet)
+
+    @property
+    def pushed(self) -> bool:
+        return bool(self.where)
+
+    def sql(self, id_expression: str = "l.id") -> str:
+        """Query selecting the log IDs (as merged logs carry them) of matching rows"""
+        where = " AND ".join(f"({clause})" for clause in self.where)
+        return f"SELECT {id_expression} FROM applicant_logs l WHERE {where}"
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def translate_value_filter(column: str, filter_obj: UniversalFilter) -> Optional[Clause]:
+    """SQL for a filter over an integer column, with the semantics of the in-memory matcher.
+    None when the combination can't be expressed exactly"""
+    operator = filter_obj.operator
+    value = filter_obj.value
+
+    if operator == FilterOperator.EQUALS:
+        if _is_number(value):
+            return (f"{column} = ?", [value])
+        if isinstance(value, str):
+            # Numeric fields compare to the number in the string; non-numeric strings never match
+            try:
+                return (f"{column} = ?", [int(value)])
+            except ValueError:
+                try:
+                    return (f"{column} = ?", [float(value)])
+                except ValueError:
+                    return FALSE_CLAUSE
+        return None
+
+    elif operator == FilterOperator.NOT_EQUALS:
+        if _is_int(value):
+            return (f"({column} IS NULL OR {column} != ?)", [value])
+        return None
+
+    elif operator in (FilterOperator.IN, FilterOperator.NOT_IN):
+        if not isinstance(value, (list, tuple)) or not all(_is_int(v) for v in value):
+            return None
+        if not value:
+            return FALSE_CLAUSE if operator == FilterOperator.IN else TRUE_CLAUSE
+        placeholders = ", ".join("?" for _ in value)
+        if operator == FilterOperator.IN:
+            return (f"{column} IN ({placeholders})", list(value))
+        return (f"({column} IS NULL OR {column} NOT IN ({placeholders}))", list(value))
+
+    elif operator == FilterOperator.EXISTS:
+        return (f"{column} IS NOT NULL", [])
+
+    elif operator in (FilterOperator.GREATER_THAN, FilterOperator.GREATER_THAN_EQUAL,
+                      FilterOperator.LESS_THAN, FilterOperator.LESS_THAN_EQUAL):
+        try:
+            threshold = float(value)
+        except (ValueError, TypeError):
+            return FALSE_CLAUSE
+        sql_operator = {
+            FilterOperator.GREATER_THAN: ">",
+            FilterOperator.GREATER_THAN_EQUAL: ">=",
+            FilterOperator.LESS_THAN: "<",
+            FilterOperator.LESS_THAN_EQUAL: "<="
+        }[operator]
+        return (f"{column} {sql_operator} ?", [threshold])
+
+    elif operator == FilterOperator.BETWEEN:
+        if isinstance(value, (list, tuple)) and len(value) >= 2 and _is_number(value[0]) and _is_number(value[1]):
+            return (f"{column} BETWEEN ? AND ?", [value[0], value[1]])
+        return None
+
+    return None
+
+
+def translate_period(period_filter: PeriodFilter) -> Clause:
+    """Period [start, end) over applicant_logs.created at second precision, offsets ignored like in memory.
+    Rows without a full ISO timestamp are kept, as the in-memory filter keeps unparseable dates"""
+    if not period_filter.start_date:
+        return TRUE_CLAUSE
+    start = period_filter.start_date.strftime('%Y-%m-%dT%H:%M:%S')
+    end = period_filter.end_date.strftime('%Y-%m-%dT%H:%M:%S')
+    return (
+        "l.created IS NULL OR l.created = '' OR substr(l.created, 11, 1) != 'T' "
+        "OR (substr(l.created, 1, 19) >= ? AND substr(l.created, 1, 19) < ?)",
+        [start, end]
+    )
+
+
+class SQLPushdownPlanner:
+    """Splits a FilterSet into applicant_logs WHERE clauses and an in-memory residual"""
+
+    def __init__(self, entity_relationships: Dict[str, Dict[str, str]],
+                 parse_filters: Callable[[Dict[str, Any]], FilterSet]):
+        self.entity_relationships = entity_relationships
+        self.parse_filters = parse_filters
+
+    def plan(self, entity_type: EntityType, filter_set: FilterSet) -> Optional[PushdownPlan]:
+        """Pushdown plan for a log-backed entity, None for entities without a log table"""
+        if entity_type not in LOG_ENTITIES:
+            return None
+
+        plan = PushdownPlan()
+        residual = plan.residual
+
+        if filter_set.period_filter:
+            self._add(plan, translate_period(filter_set.period_filter))
+
+        for filter_obj in filter_set.cross_entity_filters:
+            clause = self._translate_cross_entity(filter_obj, entity_type)
+            if clause is None:
+                residual.cross_entity_filters.append(filter_obj)
+            else:
+                self._add(plan, clause)
+
+        for filter_obj in filter_set.entity_filters:
+            column = LOG_COLUMNS.get(filter_obj.field)
+            clause = translate_value_filter(column, filter_obj) if column else None
+            if clause is None:
+                residual.entity_filters.append(filter_obj)
+            else:
+                self._add(plan, clause)
+
+        for logical_filter in filter_set.logical_filters:
+            clause = self._translate_logical(logical_filter, entity_type)
+            if clause is None:
+                residual.logical_filters.append(logical_filter)
+            else:
+                self._add(plan, clause)
+
+        return plan
+
+    def _add(self, plan: PushdownPlan, clause: Clause) -> None:
+        sql, params = clause
+        plan.where.append(sql)
+        plan.params.extend(params)
+
+    def _translate_cross_entity(self, filter_obj: UniversalFilter, target_entity: EntityType) -> Optional[Clause]:
+        """Relationship filters that are plain columns of applicant_logs"""
+        relationship_key = self.entity_relationships.get(target_entity.value, {}).get(filter_obj.entity_type.value)
+        if not relationship_key:
+            return None
+
+        # Vacancy state is derived from hire logs, not stored in the cache
+        if filter_obj.entity_type == EntityType.VACANCIES and filter_obj.field == "state":
+            return None
+
+        if target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.RECRUITERS:
+            clause = translate_value_filter(RECRUITER_COLUMN, filter_obj)
+            if clause is None:
+                return None
+            # Logs without an account_info object never match a recruiter filter
+            return (f"json_type(l.raw_data, '$.account_info') = 'object' AND ({clause[0]})", clause[1])
+
+        # Sources are stored as a mix of numbers and strings; matched in memory
+        if target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.SOURCES:
+            return None
+
+        column = LOG_COLUMNS.get(relationship_key)
+        return translate_value_filter(column, filter_obj) if column else None
+
+    def _translate_logical(self, logical_filter: LogicalFilter, entity_type: EntityType) -> Optional[Clause]:
+        """AND/OR of conditions; pushed only when every condition translates"""
+        clauses = []
+        for condition in logical_filter.filters:
+            clause = self._translate_condition(condition, entity_type)
+            if clause is None:
+                return None
+            clauses.append(clause)
+
+        if not clauses:
+            return TRUE_CLAUSE if logical_filter.operator == "and" else FALSE_CLAUSE
+        joiner = " AND " if logical_filter.operator == "and" else " OR "
+        return (
+            joiner.join(f"({sql})" for sql, _ in clauses),
+            [param for _, params in clauses for param in params]
+        )
+
+    def _translate_condition(self, condition: Union[LogicalFilter, Dict[str, Any]],
+                             entity_type: EntityType) -> Optional[Clause]:
+        if isinstance(condition, LogicalFilter):
+            return self._translate_logical(condition, entity_type)
+        if not isinstance(condition, dict):
+            return TRUE_CLAUSE
+
+        plan = self.plan(entity_type, self.parse_filters(condition))
+        residual = plan.residual
+        if residual.cross_entity_filters or residual.entity_filters or residual.logical_filters:
+            return None
+        if not plan.where:
+            return TRUE_CLAUSE
+        return (" AND ".join(f"({sql})" for sql in plan.where), plan.params)
@@ -0,0 +1,152 @@
+"""
+Table Engine - top-K pages of table charts and cursor pagination
+A rendered table keeps its complete, unsorted row list in a bounded in-process store.
+Every page is a top-K selection (heap of size K) over those rows instead of a full
+sort, and rows are ordered by (column value, original position), so ties keep the
+order in which rows were built and the order is the same on every request. A cursor
+is the sort key of the last row of a page; the next page is the top-K of the rows
+after it, so later pages are served from the stored rows without re-running the report.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rendered tables kept for paging; the least recently used one is dropped beyond this
+MAX_STORED_TABLES = 64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SORT_ORDERS = ('desc', 'asc')
+
+
+class TablePageError(ValueError):
+    """Unknown sort column or order, or a malformed cursor"""
+
+
+def table_id(*parts: Any) -> str:
+    """Stable ID of a table from the parameters of its query"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _value_key(value: Any) -> Tuple[int, Any]:
+    """Comparable key of a cell: missing < numbers < text"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    return (2, str(value))
+
+
+def encode_cursor(sort_by: str, order: str, key: Tuple[Tuple[int, Any], int]) -> str:
+    raw = json.dumps([sort_by, order, key[0][0], key[0][1], key[1]], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, Tuple[Tuple[int, Any], int]]:
+    """(sort_by, order, sort key of the last row served)"""
+    try:
+        sort_by, order, kind, value, position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return sort_by, order, ((int(kind), value), int(position))
+    except Exception as e:
+        raise TablePageError(f"Invalid cursor: {e}")
+
+
+class TableRows:
+    """All rows of a rendered table, with their columns"""
+
+    def __init__(self, table_id: str, entity: str, columns: List[Dict[str, Any]], rows: List[Dict[str, Any]]):
+        self.table_id = table_id
+        self.entity = entity
+        self.columns = columns
+        self.rows = rows
+
+    def _row_key(self, position: int, sort_by: str, descending: bool) -> Tuple[Tuple[int, Any], int]:
+        # Descending pages take the largest keys, so ties must still prefer the earlier row
+        return (_value_key(self.rows[position].get(sort_by)), -position if descending else position)
+
+    def _check_sort(self, sort_by: str, order: str) -> None:
+        if order not in SORT_ORDERS:
+            raise TablePageError(f"order must be one of: {', '.join(SORT_ORDERS)}")
+        if sort_by != "count" and sort_by not in {column["key"] for column in self.columns}:
+            raise TablePageError(f"Unknown sort column: {sort_by}")
+
+    def sorted_rows(self, sort_by: str = "count", order: str = "desc") -> List[Dict[str, Any]]:
+        """Every row, in page order (a full sort, for exports)"""
+        self._check_sort(sort_by, order)
+        descending = order == "desc"
+        positions = sorted(range(len(self.rows)), key=lambda i: self._row_key(i, sort_by, descending),
+                           reverse=descending)
+        return [self.rows[i] for i in positions]
+
+    def page(self, limit: int = DEFAULT_PAGE_SIZE, sort_by: str = "count", order: str = "desc",
+             cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of rows: the top `limit` rows after the cursor, plus metadata with the
+        cursor of the next page (None on the last page)"""
+        self._check_sort(sort_by, order)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        descending = order == "desc"
+
+        positions = range(len(self.rows))
+        if cursor is not None:
+            cursor_sort_by, cursor_order, after = decode_cursor(cursor)
+            if (cursor_sort_by, cursor_order) != (sort_by, order):
+                raise TablePageError("Cursor belongs to a different sort order")
+            if descending:
+                positions = [i for i in positions if self._row_key(i, sort_by, True) < after]
+            else:
+                positions = [i for i in positions if self._row_key(i, sort_by, False) > after]
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        # One extra row tells whether there is a next page
+        selected = select(limit + 1, positions, key=lambda i: self._row_key(i, sort_by, descending))
+        has_more = len(selected) > limit
+        selected = selected[:limit]
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(sort_by, order, self._row_key(selected[-1], sort_by, descending))
+        return {
+            "columns": self.columns,
+            "rows": [self.rows[i] for i in selected],
+            "metadata": {
+                "total_rows": len(self.rows),
+                "sorted_by": sort_by,
+                "sort_order": order,
+                "entity_type": self.entity,
+                "table_id": self.table_id,
+                "next_cursor": next_cursor
+            }
+        }
+
+
+_tables: "OrderedDict[str, TableRows]" = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def store_table(table: TableRows) -> None:
+    """Keep a rendered table for paging (replaces an earlier render of the same query)"""
+    with _tables_lock:
+        _tables[table.table_id] = table
+        _tables.move_to_end(table.table_id)
+        while len(_tables) > MAX_STORED_TABLES:
+            evicted, _ = _tables.popitem(last=False)
+            logger.debug(f"Table {evicted} dropped from the page store")
+
+
+def get_table(table_id: str) -> Optional[TableRows]:
+    """Stored table by ID, None when it was never rendered or has been dropped"""
+    with _tables_lock:
+        table = _tables.get(table_id)
+        if table is not None:
+            _tables.move_to_end(table_id)
+        return table
@@ -0,0 +1,41 @@
+import pytest
+
+from chart_data_processor import ChartProcessingError, chart_operation, report_queries, validate_report_json
+
+
+def test_bar_and_line_charts_keep_their_operation():
+    y_axis = {"operation": "median", "entity": "hires", "value_field": "time_to_hire"}
+    assert chart_operation("bar", y_axis) == ("median", "time_to_hire", None)
+    assert chart_operation("line", {"operation": "date_trunc", "entity": "hires", "date_trunc": "month"}) == \
+        ("date_trunc", None, "month")
+    assert chart_operation("bar", {"entity": "hires"}) == ("count", None, None)
+
+
+def test_tables_always_count():
+    assert chart_operation("table", {"operation": "avg", "entity": "hires", "value_field": "time_to_hire"}) == \
+        ("count", None, None)
+
+
+def test_planned_chart_query_matches_the_section():
+    report = {"metrics_filter": {"period": "year"}, "chart": {"type": "bar", "y_axis": {
+        "operation": "p90", "entity": "stages", "value_field": "stay_duration", "group_by": {"field": "stages"}}}}
+    [query] = report_queries(report)
+    assert (query.operation, query.value_field, query.group_by) == ("p90", "stay_duration", "stages")
+    assert not query.fusable
+
+
+@pytest.mark.parametrize("chart_type", ["bar", "line", "table", "scatter"])
+def test_unknown_y_axis_measure_is_rejected(chart_type):
+    report = {"report_title": "t", "metrics_filter": {"period": "year"}, "chart": {
+        "type": chart_type, "graph_description": "x",
+        "x_axis": {"operation": "count", "entity": "hires"},
+        "y_axis": {"operation": "avg", "entity": "hires", "value_field": "salary"}}}
+    with pytest.raises(ChartProcessingError, match="Chart y_axis"):
+        validate_report_json(report)
+
+
+def test_known_y_axis_measure_is_accepted():
+    report = {"report_title": "t", "metrics_filter": {"period": "year"}, "chart": {
+        "type": "bar", "graph_description": "x",
+        "y_axis": {"operation": "avg", "entity": "hires", "value_field": "time_to_hire"}}}
+    validate_report_json(report)
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from duration_sketch import DurationSketch
+
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+
+def durations(n, seed):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(3, 1.5) for _ in range(n)]
+
+
+def exact_quantile(values, q):
+    """The rank the sketch targets: sorted value at floor(q * (n - 1))"""
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    values = durations(5000, seed=1)
+    sketch = DurationSketch.from_values(values, accuracy)
+    for q in QUANTILES:
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= accuracy * exact + 1e-9
+
+
+def test_quantiles_are_clamped_to_exact_min_and_max():
+    values = durations(1000, seed=2)
+    sketch = DurationSketch.from_values(values)
+    assert (sketch.min, sketch.max) == (min(values), max(values))
+    assert min(values) <= sketch.quantile(0) <= sketch.quantile(1) <= max(values)
+    assert DurationSketch.from_values([7.3]).median == 7.3
+
+
+def test_merge_matches_sketch_of_all_values():
+    left, right = durations(3000, seed=3), durations(2000, seed=4)
+    merged = DurationSketch.from_values(left).merge(DurationSketch.from_values(right))
+    whole = DurationSketch.from_values(left + right)
+
+    assert merged.count == whole.count == 5000
+    assert merged.sum == pytest.approx(whole.sum)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_merge_into_empty_sketch():
+    values = durations(100, seed=5)
+    merged = DurationSketch().merge(DurationSketch.from_values(values))
+    assert merged.summary() == DurationSketch.from_values(values).summary()
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        DurationSketch(0.01).merge(DurationSketch(0.02))
+
+
+def test_zero_and_negative_durations_count_as_zero():
+    sketch = DurationSketch.from_values([-5, 0, 0.0001, 10])
+    assert sketch.count == 4
+    assert sketch.min == 0.0
+    assert sketch.median == 0.0
+    assert sketch.quantile(1) == 10
+
+
+def test_empty_sketch_and_invalid_quantile():
+    sketch = DurationSketch()
+    assert sketch.median == 0.0
+    assert sketch.mean == 0.0
+    sketch.add(1)
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+    with pytest.raises(ValueError):
+        DurationSketch(relative_accuracy=1)
+
+
+def test_histogram_counts_every_value():
+    # Values near an edge may fall on either side of it (buckets are ~1% wide)
+    sketch = DurationSketch.from_values([1, 5, 9, 20, 45, 90, 365])
+    assert sketch.histogram([10, 30, 60]) == {"0-10": 3, "10-30": 1, "30-60": 1, "60+": 2}
@@ -0,0 +1,80 @@
+import io
+import logging
+
+import pytest
+
+import export
+from enhanced_metrics_calculator import (ACTION_RECORD_FIELDS, APPLICANT_RECORD_FIELDS, REJECTION_RECORD_FIELDS,
+                                         EnhancedMetricsCalculator)
+from export import CHUNK_ROWS, ExportError, export_stream, record_rows
+
+
+def late_field_rows(count):
+    """Records whose last one, after the first chunk, has a field none of the earlier records have"""
+    rows = [{"id": i, "name": f"n{i}"} for i in range(count)]
+    rows.append({"id": count, "name": "late", "comment": "first seen here"})
+    return rows
+
+
+def csv_lines(columns, rows):
+    text = b"".join(export_stream("csv", columns, rows)).decode("utf-8-sig")
+    return text.splitlines()
+
+
+def test_record_rows_uses_fixed_fields_as_header():
+    columns, rows = record_rows(iter(late_field_rows(CHUNK_ROWS)), ["id", "name", "comment"])
+    lines = csv_lines(columns, rows)
+    assert lines[0] == "id,name,comment"
+    assert lines[-1] == f"{CHUNK_ROWS},late,first seen here"
+
+
+def test_record_rows_of_a_list_takes_every_key():
+    columns, rows = record_rows(late_field_rows(CHUNK_ROWS))
+    assert columns == ["id", "name", "comment"]
+    assert len(list(rows)) == CHUNK_ROWS + 1
+
+
+def test_record_rows_without_records():
+    with pytest.raises(ExportError):
+        record_rows(iter(()))
+
+
+def test_csv_logs_fields_missing_from_its_header(caplog):
+    columns, rows = record_rows(iter(late_field_rows(CHUNK_ROWS)))
+    with caplog.at_level(logging.WARNING, logger="export"):
+        lines = csv_lines(columns, rows)
+    assert lines[0] == "id,name"
+    assert "comment" in caplog.text
+
+
+def test_staged_columns_include_late_keys():
+    staged = io.StringIO()
+    columns = export._stage_rows(staged, ["id", "name"], late_field_rows(CHUNK_ROWS))
+    assert columns == ["id", "name", "comment"]
+    assert list(export._staged_rows(staged))[-1]["comment"] == "first seen here"
+
+
+def test_xlsx_header_includes_late_keys():
+    openpyxl = pytest.importorskip("openpyxl")
+    data = b"".join(export_stream("xlsx", ["id", "name"], iter(late_field_rows(CHUNK_ROWS))))
+    sheet = openpyxl.load_workbook(io.BytesIO(data)).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("id", "name", "comment")
+    assert rows[-1] == (CHUNK_ROWS, "late", "first seen here")
+
+
+def test_parquet_schema_includes_late_keys():
+    pytest.importorskip("pyarrow")
+    from pyarrow import parquet
+    data = b"".join(export_stream("parquet", ["id", "name"], iter(late_field_rows(CHUNK_ROWS))))
+    table = parquet.read_table(io.BytesIO(data))
+    assert table.column_names == ["id", "name", "comment"]
+    assert table.column("comment").to_pylist() == [None] * CHUNK_ROWS + ["first seen here"]
+
+
+def test_record_fields_match_the_record_builders():
+    calc = EnhancedMetricsCalculator(object(), None)
+    log = {"id": 1, "applicant_id": 2, "vacancy_id": 3, "created": "2025-01-01"}
+    assert list(next(calc._applicant_records([log], None, {}))) == APPLICANT_RECORD_FIELDS
+    assert list(calc._action_record(log)) == ACTION_RECORD_FIELDS
+    assert list(calc._rejection_record(log, {})) == REJECTION_RECORD_FIELDS
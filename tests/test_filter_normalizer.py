@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from filter_normalizer import filters_hash, normalize_filters
+
+TODAY = date(2025, 6, 20)
+
+
+def same_hash(*spellings):
+    return len({filters_hash(filters, TODAY) for filters in spellings}) == 1
+
+
+def test_key_order_does_not_matter():
+    assert same_hash({"period": "year", "recruiters": "1", "sources": "2"},
+                     {"sources": "2", "recruiters": "1", "period": "year"})
+
+
+def test_period_spellings():
+    assert same_hash({"period": "6 months"}, {"period": "6 month"}, {"period": " 6  Months "},
+                     {"period": "last 6 months"})
+    assert same_hash({"period": "year"}, {"period": "1 year"}, {"period": "1 years"})
+    assert same_hash({"period": "previous quarter"}, {"period": "last quarter"})
+    assert same_hash({"period": "2024-01-01 to 2024-03-31"}, {"period": "2024-01-01..2024-03-31"})
+
+
+def test_entity_value_spellings():
+    assert same_hash({"recruiters": "123"}, {"recruiters": 123}, {"recruiters": ["123"]},
+                     {"recruiters": {"operator": "eq", "value": "123"}},
+                     {"recruiters": {"operator": "in", "value": [123]}})
+    assert same_hash({"recruiters": ["2", "1", "2"]}, {"recruiters": [1, 2]})
+    assert same_hash({"vacancies": "Open"}, {"vacancies": "open"})
+
+
+def test_and_is_flattened_sorted_and_deduplicated():
+    assert same_hash({"recruiters": "1", "sources": "2"},
+                     {"and": [{"sources": "2"}, {"recruiters": "1"}]},
+                     {"and": [{"recruiters": "1"}, {"and": [{"sources": 2}, {"recruiters": 1}]}]})
+
+
+def test_or_is_commutative():
+    assert same_hash({"or": [{"recruiters": "1"}, {"sources": "2"}]},
+                     {"or": [{"sources": 2}, {"recruiters": 1}]},
+                     {"or": [{"sources": 2}, {"or": [{"recruiters": 1}]}]})
+
+
+def test_or_with_an_unconstrained_branch_matches_everything():
+    assert same_hash({"period": "year", "or": [{"recruiters": "1"}, {}]}, {"period": "year"})
+
+
+def test_different_filters_differ():
+    assert not same_hash({"recruiters": "1"}, {"recruiters": "2"})
+    assert not same_hash({"recruiters": "1"}, {"sources": "1"})
+    assert not same_hash({"period": "6 month"}, {"period": "3 month"})
+    assert not same_hash({"recruiters": "1"}, {"recruiters": {"operator": "ne", "value": "1"}})
+    assert not same_hash({"or": [{"recruiters": "1"}, {"sources": "2"}]},
+                         {"and": [{"recruiters": "1"}, {"sources": "2"}]})
+
+
+def test_relative_periods_resolve_against_today():
+    assert filters_hash({"period": "year"}, TODAY) != filters_hash({"period": "year"}, date(2025, 6, 21))
+    fixed = {"period": "2024-01-01..2024-03-31"}
+    assert filters_hash(fixed, TODAY) == filters_hash(fixed, date(2025, 6, 21))
+
+
+def test_empty_filters():
+    assert same_hash(None, {})
+
+
+def test_canonical_prompt_filters_round_trip():
+    filters = {"period": "6 months", "recruiters": ["2", "1"],
+               "or": [{"sources": "3"}, {"vacancies": "Open"}], "and": [{"divisions": "101"}]}
+    canonical = normalize_filters(filters, TODAY)
+    assert filters_hash(canonical.to_prompt_filters(), TODAY) == canonical.hash
+    assert canonical.period_filter.period_type == "6 month"
+
+
+def test_unknown_period_raises():
+    with pytest.raises(ValueError):
+        normalize_filters({"period": "sometime"}, TODAY)
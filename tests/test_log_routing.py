@@ -0,0 +1,113 @@
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from enhanced_metrics_calculator import EnhancedMetricsCalculator
+from huntflow_local_client import HuntflowLocalClient
+from log_store import HIRED_STATUS_ID
+from universal_filter import EntityType
+
+RECRUITERS = [(501, "Anna"), (502, "Boris")]
+# vacancy -> division; only vacancy 11 has a hire, so it is the one closed vacancy
+VACANCIES = {11: 101, 12: 101, 13: 102}
+STATUSES = [1, 2, 3]
+
+
+class FixtureLogs:
+    """Plays the log analyzer: the merged logs the log store syncs with"""
+
+    def __init__(self, logs):
+        self.logs = logs
+
+    def get_merged_logs(self):
+        return self.logs
+
+
+def make_logs(count=90):
+    now = datetime.now().replace(microsecond=0)
+    logs = []
+    for i in range(count):
+        recruiter_id, recruiter_name = RECRUITERS[i % len(RECRUITERS)]
+        vacancy_id = list(VACANCIES)[i % len(VACANCIES)]
+        status_id = STATUSES[i % 7 % len(STATUSES)]
+        logs.append({
+            "id": 1000 + i,
+            "type": "STATUS",
+            "applicant_id": 200 + i % 30,
+            "vacancy_id": vacancy_id,
+            "division_id": VACANCIES[vacancy_id],
+            "status_id": HIRED_STATUS_ID if vacancy_id == 11 and status_id == 3 else status_id,
+            # Spread over two years, so period filters cut through the logs
+            "created": (now - timedelta(days=8 * (count - i))).isoformat(),
+            "account_info": {"id": recruiter_id, "name": recruiter_name},
+            "source": 7
+        })
+    return logs
+
+
+@pytest.fixture
+def engine_and_store(tmp_path):
+    db_path = str(tmp_path / "fixture.db")
+    logs = make_logs()
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE accounts (id INTEGER);
+        CREATE TABLE applicant_logs (id INTEGER, applicant_id INTEGER, vacancy_id INTEGER, status_id INTEGER,
+                                     created TEXT, raw_data TEXT);
+        CREATE TABLE vacancies (id INTEGER, raw_data TEXT);
+        CREATE TABLE divisions (id INTEGER, name TEXT);
+        CREATE TABLE coworkers (id INTEGER, name TEXT);
+    """)
+    conn.executemany("INSERT INTO applicant_logs VALUES (?, ?, ?, ?, ?, ?)",
+                     [(log["id"], log["applicant_id"], log["vacancy_id"], log["status_id"], log["created"],
+                       json.dumps(log)) for log in logs])
+    conn.executemany("INSERT INTO vacancies VALUES (?, ?)",
+                     [(vacancy_id, json.dumps({"account_division": division_id}))
+                      for vacancy_id, division_id in VACANCIES.items()])
+    conn.executemany("INSERT INTO divisions VALUES (?, ?)", [(101, "Sales"), (102, "IT")])
+    conn.executemany("INSERT INTO coworkers VALUES (?, ?)", RECRUITERS)
+    conn.commit()
+    conn.close()
+
+    calc = EnhancedMetricsCalculator(HuntflowLocalClient(db_path), None)
+    calc._cached_log_analyzer = FixtureLogs(logs)
+    return calc.filter_engine, calc.log_store
+
+
+# (prompt filters, logs of the store or a copy, expected access path)
+ROUTES = [
+    ({"period": "year"}, "store", "period_slice"),
+    ({"period": "year", "recruiters": "501"}, "store", "period_slice+sql"),
+    ({"period": "year", "divisions": "101"}, "store", "period_slice+in_memory"),
+    ({"recruiters": "502"}, "store", "sql"),
+    ({"recruiters": "502"}, "copy", "sql"),
+    ({"divisions": "102"}, "store", "bitmap"),
+    ({"divisions": "102"}, "copy", "in_memory"),
+    ({"period": "6 months", "vacancies": "open"}, "copy", "sql+residual"),
+]
+
+
+@pytest.mark.parametrize("prompt_filters,source,expected_path", ROUTES)
+def test_routes_return_the_rows_of_apply_filters(engine_and_store, prompt_filters, source, expected_path):
+    engine, store = engine_and_store
+    logs = store.status_logs if source == "store" else list(store.status_logs)
+    filters = engine.parse_prompt_filters(prompt_filters)
+
+    async def run():
+        routed, path = await engine._apply_log_filters(EntityType.APPLICANTS, filters, logs)
+        reference = await engine.apply_filters(EntityType.APPLICANTS, filters, list(store.status_logs))
+        explained = await engine.explain(EntityType.APPLICANTS, filters, logs)
+        return routed, path, reference, explained
+
+    routed, path, reference, explained = asyncio.run(run())
+    assert path == expected_path
+    assert 0 < len(reference) < len(store.status_logs)
+    assert sorted(log["id"] for log in routed) == sorted(log["id"] for log in reference)
+    assert explained["access_path"] == path
+    if path in ("period_slice", "period_slice+sql", "sql", "bitmap"):
+        assert explained["steps"] == []
+    else:
+        assert explained["steps"]
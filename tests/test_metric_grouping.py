@@ -0,0 +1,42 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from chart_data_processor import (calculate_main_metric_value, chart_query, metric_group_by,
+                                  process_main_metric)
+from enhanced_metrics_calculator import shared_calculator
+from huntflow_local_client import HuntflowLocalClient
+
+DB_PATH = Path(__file__).resolve().parent.parent / "huntflow_cache.db"
+
+
+@pytest.mark.parametrize("operation", ["avg", "sum", "median", "p90"])
+def test_measure_operations_are_not_grouped(operation):
+    assert metric_group_by(operation, {"period": "year"}) is None
+
+
+def test_counts_are_grouped_by_recruiters_without_entity_filters():
+    assert metric_group_by("count", {"period": "year"}) == "recruiters"
+    assert metric_group_by("count", {"period": "year", "recruiters": "1"}) is None
+
+
+def test_period_only_average_is_not_a_sum_of_group_averages():
+    pytest.importorskip("analyze_logs")
+    calc = shared_calculator(HuntflowLocalClient(str(DB_PATH)))
+    filters = {"period": "year"}
+    report = {"metrics_filter": filters, "main_metric": {"label": "m", "value": {
+        "operation": "avg", "entity": "vacancies", "value_field": "days_active"}}}
+
+    async def run():
+        await process_main_metric(report, calc)
+        per_recruiter = await chart_query(calc, "vacancies", operation="avg", group_by="recruiters",
+                                          filters=filters, value_field="days_active")
+        overall = await calculate_main_metric_value("vacancies", "avg", calc, filters,
+                                                    value_field="days_active")
+        return per_recruiter, overall
+
+    per_recruiter, overall = asyncio.run(run())
+    assert report["main_metric"]["real_value"] == pytest.approx(overall)
+    if len(per_recruiter["values"]) > 1:
+        assert overall < sum(per_recruiter["values"])
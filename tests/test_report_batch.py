@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import chart_data_processor
+from chart_data_processor import process_report_batch, process_reports
+from huntflow_local_client import HuntflowLocalClient
+import report_cache
+
+DB_PATH = Path(__file__).resolve().parent.parent / "huntflow_cache.db"
+
+
+def make_report(title):
+    return {"report_title": title, "metrics_filter": {"period": "year"},
+            "main_metric": {"label": "m", "value": {"operation": "count", "entity": "applicants"}}}
+
+
+def fail_one(monkeypatch, failing_title):
+    async def process(report_json, client, calc=None):
+        if report_json["report_title"] == failing_title:
+            raise sqlite3.OperationalError("database is locked")
+        report_json["main_metric"]["real_value"] = 1
+        return report_json
+
+    async def plan(reports, calc):
+        pass
+
+    monkeypatch.setattr(chart_data_processor, "_process_report", process)
+    monkeypatch.setattr(chart_data_processor, "plan_reports", plan)
+    monkeypatch.setattr(chart_data_processor, "shared_calculator", lambda client: None)
+    monkeypatch.setattr(report_cache, "_report_cache", report_cache.ReportCache())
+
+
+def test_failing_report_does_not_abort_the_batch(monkeypatch):
+    fail_one(monkeypatch, "batch 2")
+    reports = [make_report(f"batch {i}") for i in range(4)]
+    client = HuntflowLocalClient(str(DB_PATH))
+
+    async def collect():
+        return {i: report async for i, report in process_report_batch(reports, client)}
+
+    results = asyncio.run(collect())
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[2] == {"error": "database is locked"}
+    assert all(results[i]["main_metric"]["real_value"] == 1 for i in (0, 1, 3))
+
+    # The failure is not cached: the next batch computes it again
+    cache = report_cache.get_report_cache()
+    fail_one(monkeypatch, None)
+    monkeypatch.setattr(report_cache, "_report_cache", cache)
+    again = asyncio.run(process_reports([make_report("batch 2")], client))
+    assert again[0]["main_metric"]["real_value"] == 1
+
+
+def test_process_reports_keeps_failures_in_their_slot(monkeypatch):
+    fail_one(monkeypatch, "list 0")
+    client = HuntflowLocalClient(str(DB_PATH))
+    results = asyncio.run(process_reports([make_report("list 0"), make_report("list 1")], client))
+    assert results[0] == {"error": "database is locked"}
+    assert results[1]["main_metric"]["real_value"] == 1
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+
+import table_engine
+from table_engine import TablePageError, TableRows, decode_cursor, get_table, store_table, table_id
+from universal_chart_processor import UniversalChartProcessor
+
+COLUMNS = [{"key": "name"}, {"key": "count"}]
+
+
+def make_table(counts):
+    rows = [{"name": f"row{i}", "count": count} for i, count in enumerate(counts)]
+    return TableRows("t", "applicants", COLUMNS, rows)
+
+
+def walk(table, limit, sort_by="count", order="desc"):
+    """Rows of every page, following next_cursor to the end"""
+    rows, cursor = [], None
+    while True:
+        page = table.page(limit, sort_by=sort_by, order=order, cursor=cursor)
+        rows.extend(page["rows"])
+        cursor = page["metadata"]["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 100])
+def test_pages_cover_every_row_once_in_sorted_order(order, limit):
+    table = make_table([5, 3, 5, 1, 3, 5, 0, 3, 8])
+    rows = walk(table, limit, order=order)
+    assert rows == table.sorted_rows("count", order)
+    assert len({row["name"] for row in rows}) == len(table.rows)
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_ties_keep_build_order(order):
+    table = make_table([2, 1, 2, 1, 2])
+    names = [row["name"] for row in walk(table, 2, order=order)]
+    if order == "desc":
+        assert names == ["row0", "row2", "row4", "row1", "row3"]
+    else:
+        assert names == ["row1", "row3", "row0", "row2", "row4"]
+
+
+def test_missing_numbers_and_text_sort_apart():
+    table = make_table([None, 3, "n/a", 1])
+    assert [row["count"] for row in walk(table, 1, order="asc")] == [None, 1, 3, "n/a"]
+    assert [row["count"] for row in walk(table, 3, order="desc")] == ["n/a", 3, 1, None]
+
+
+def test_page_metadata():
+    table = make_table([1, 2, 3])
+    page = table.page(2)
+    assert page["columns"] == COLUMNS
+    assert page["metadata"]["total_rows"] == 3
+    assert page["metadata"]["next_cursor"] is not None
+    last = table.page(2, cursor=page["metadata"]["next_cursor"])
+    assert [row["count"] for row in last["rows"]] == [1]
+    assert last["metadata"]["next_cursor"] is None
+
+
+def test_limit_is_clamped():
+    table = make_table(list(range(table_engine.MAX_PAGE_SIZE + 10)))
+    assert len(table.page(0)["rows"]) == 1
+    assert len(table.page(10 ** 6)["rows"]) == table_engine.MAX_PAGE_SIZE
+
+
+def test_cursor_must_match_the_sort():
+    table = make_table([1, 2, 3])
+    cursor = table.page(1, order="desc")["metadata"]["next_cursor"]
+    assert decode_cursor(cursor)[:2] == ("count", "desc")
+    with pytest.raises(TablePageError):
+        table.page(1, order="asc", cursor=cursor)
+    with pytest.raises(TablePageError):
+        table.page(1, sort_by="name", cursor=cursor)
+
+
+@pytest.mark.parametrize("kwargs", [{"cursor": "not a cursor"}, {"sort_by": "missing"}, {"order": "up"}])
+def test_invalid_requests_raise(kwargs):
+    with pytest.raises(TablePageError):
+        make_table([1, 2]).page(1, **kwargs)
+
+
+def test_table_id_is_stable():
+    assert table_id("hires", "count", {"b": 1, "a": 2}) == table_id("hires", "count", {"a": 2, "b": 1})
+    assert table_id("hires", "count", None) != table_id("applicants", "count", None)
+
+
+def test_store_keeps_most_recently_used_tables(monkeypatch):
+    monkeypatch.setattr(table_engine, "_tables", type(table_engine._tables)())
+    monkeypatch.setattr(table_engine, "MAX_STORED_TABLES", 2)
+    tables = [TableRows(f"t{i}", "applicants", COLUMNS, []) for i in range(3)]
+    store_table(tables[0])
+    store_table(tables[1])
+    assert get_table("t0") is tables[0]  # t0 becomes the most recently used
+    store_table(tables[2])
+    assert get_table("t1") is None
+    assert get_table("t0") is tables[0] and get_table("t2") is tables[2]
+
+
+def test_table_id_follows_canonical_filters_and_data_version():
+    class Client:
+        version = "1"
+
+        def data_version(self):
+            return self.version
+
+    calc = SimpleNamespace(client=Client(), filter_engine=None)
+    processor = UniversalChartProcessor(calc)
+    table = processor._table_id("applicants", "count", "sources", {"period": "year", "recruiters": "1"}, None)
+    assert table == processor._table_id("applicants", "count", "sources",
+                                        {"recruiters": 1, "period": "1 year"}, None)
+    calc.client.version = "2"
+    assert table != processor._table_id("applicants", "count", "sources",
+                                        {"period": "year", "recruiters": "1"}, None)
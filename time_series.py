@@ -0,0 +1,147 @@
+"""
+Time Series - day/week/month/quarter/year bucketing of record timestamps
+Each timestamp is reduced to an integer bucket key (day ordinal, Monday ordinal,
+year * 12 + month, year * 4 + quarter, year) from its 'YYYY-MM-DD' prefix, parsed
+once per distinct day. Counts are accumulated per (series, bucket) in one pass,
+empty buckets are filled and buckets come out in chronological order.
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
+
+TIME_UNITS = ('day', 'week', 'month', 'quarter', 'year')
+
+# group_by values that mean time bucketing, and their unit
+TIME_GROUPINGS = {
+    'day': 'day',
+    'date': 'day',
+    'week': 'week',
+    'month': 'month',
+    'quarter': 'quarter',
+    'year': 'year'
+}
+
+# Beyond this many buckets only non-empty buckets are returned
+MAX_FILLED_BUCKETS = 1000
+
+
+def bucket_key(day: date, unit: str) -> int:
+    if unit == 'day':
+        return day.toordinal()
+    if unit == 'week':
+        return day.toordinal() - day.weekday()
+    if unit == 'month':
+        return day.year * 12 + day.month - 1
+    if unit == 'quarter':
+        return day.year * 4 + (day.month - 1) // 3
+    if unit == 'year':
+        return day.year
+    raise ValueError(f"Unknown time unit: {unit}")
+
+
+def bucket_start(key: int, unit: str) -> date:
+    """First day of a bucket"""
+    if unit in ('day', 'week'):
+        return date.fromordinal(key)
+    if unit == 'month':
+        return date(key // 12, key % 12 + 1, 1)
+    if unit == 'quarter':
+        return date(key // 4, (key % 4) * 3 + 1, 1)
+    return date(key, 1, 1)
+
+
+def bucket_label(key: int, unit: str) -> str:
+    start = bucket_start(key, unit)
+    if unit in ('day', 'week'):
+        return start.isoformat()
+    if unit == 'month':
+        return start.strftime("%B %Y")  # e.g., "January 2024"
+    if unit == 'quarter':
+        return f"Q{key % 4 + 1} {start.year}"
+    return str(start.year)
+
+
+class TimeSeriesBuilder:
+    """Counts per series and time bucket, accumulated in one pass over records"""
+
+    def __init__(self, unit: str, bounds: Optional[Tuple[date, date]] = None):
+        """bounds: [first day, end day) to fill with empty buckets; the data range otherwise"""
+        if unit not in TIME_UNITS:
+            raise ValueError(f"Unknown time unit: {unit}")
+        self.unit = unit
+        self.bounds = bounds
+        # series -> bucket key -> count
+        self.counts: Dict[Optional[str], Dict[int, int]] = {}
+        # 'YYYY-MM-DD' -> bucket key (None when not a date)
+        self._keys: Dict[str, Optional[int]] = {}
+
+    def key_of(self, timestamp: Any) -> Optional[int]:
+        """Bucket key of an ISO timestamp string, datetime or date; None when it has no date"""
+        if isinstance(timestamp, str):
+            prefix = timestamp[:10]
+            if prefix not in self._keys:
+                try:
+                    self._keys[prefix] = bucket_key(date.fromisoformat(prefix), self.unit)
+                except ValueError:
+                    self._keys[prefix] = None
+            return self._keys[prefix]
+        if isinstance(timestamp, datetime):
+            return bucket_key(timestamp.date(), self.unit)
+        if isinstance(timestamp, date):
+            return bucket_key(timestamp, self.unit)
+        return None
+
+    def add(self, timestamp: Any, series: Optional[str] = None) -> bool:
+        """Count one record; False when its timestamp has no date"""
+        key = self.key_of(timestamp)
+        if key is None:
+            return False
+        series_counts = self.counts.get(series)
+        if series_counts is None:
+            series_counts = self.counts[series] = {}
+        series_counts[key] = series_counts.get(key, 0) + 1
+        return True
+
+    def bucket_keys(self) -> List[int]:
+        """Chronological bucket keys: every bucket of the bounds or the data range, or only the
+        non-empty ones when that would be more than MAX_FILLED_BUCKETS"""
+        present = set()
+        for series_counts in self.counts.values():
+            present.update(series_counts)
+
+        if self.bounds is not None:
+            first, last = bucket_key(self.bounds[0], self.unit), bucket_key(self.bounds[1] - timedelta(days=1), self.unit)
+            present = {key for key in present if first <= key <= last}
+        elif present:
+            first, last = min(present), max(present)
+        else:
+            return []
+
+        step = 7 if self.unit == 'week' else 1
+        if (last - first) // step + 1 > MAX_FILLED_BUCKETS:
+            return sorted(present)
+        return list(range(first, last + 1, step))
+
+    def to_chart(self) -> Dict[str, Any]:
+        """{"labels", "values"} with per-bucket totals; multi-series builders add
+        "series": [{"name", "values"}], largest series first"""
+        keys = self.bucket_keys()
+        totals = {}
+        for series_counts in self.counts.values():
+            for key, count in series_counts.items():
+                totals[key] = totals.get(key, 0) + count
+
+        chart = {
+            "labels": [bucket_label(key, self.unit) for key in keys],
+            "values": [totals.get(key, 0) for key in keys],
+            "title": ""
+        }
+        named = [(name, series_counts) for name, series_counts in self.counts.items() if name is not None]
+        if named:
+            series = [
+                {"name": name, "values": [series_counts.get(key, 0) for key in keys]}
+                for name, series_counts in named
+            ]
+            series.sort(key=lambda s: sum(s["values"]), reverse=True)
+            chart["series"] = series
+        return chart
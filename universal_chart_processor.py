@@ -3,14 +3,29 @@ Universal Chart Processor - Direct JSON to Data via UniversalFilterEngine
 Eliminates the need for specific methods like hires_by_recruiter()
 """
 
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Iterator, Iterable, Callable, Tuple
+from datetime import date
 from universal_filter_engine import UniversalFilterEngine
 from universal_filter import EntityType
-from enhanced_metrics_calculator import EnhancedMetricsCalculator
+from enhanced_metrics_calculator import (EnhancedMetricsCalculator, APPLICANT_RECORD_FIELDS, ACTION_RECORD_FIELDS,
+                                         REJECTION_RECORD_FIELDS)
+from duration_sketch import DurationSketch
+from query_profiler import profile_stage, profile_event
+from time_series import TimeSeriesBuilder, TIME_UNITS, TIME_GROUPINGS, bucket_label
+from table_engine import TableRows, store_table, table_id
+from field_catalog import Measure, resolve_measure
+from filter_normalizer import filters_hash
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Fixed fields of the records built lazily from logs
+RECORD_FIELDS = {
+    EntityType.APPLICANTS: APPLICANT_RECORD_FIELDS,
+    EntityType.ACTIONS: ACTION_RECORD_FIELDS,
+    EntityType.REJECTIONS: REJECTION_RECORD_FIELDS
+}
+
 class UniversalChartProcessor:
     """Processes any chart configuration directly through UniversalFilterEngine"""
     
@@ -22,24 +37,82 @@ class UniversalChartProcessor:
                                   group_by: Optional[str] = None, 
                                   filters: Optional[Dict[str, Any]] = None,
                                   value_field: Optional[str] = None,
-                                  chart_type: str = "bar") -> Dict[str, Any]:
+                                  chart_type: str = "bar",
+                                  date_trunc: Optional[str] = None) -> Dict[str, Any]:
         """
         Universal chart processor - handles any entity/operation/grouping combination
         
         Args:
             entity: Target entity (applicants, hires, vacancies, etc.)
-            operation: count, avg, sum
-            group_by: Field to group by (recruiters, sources, stages, etc.)
+            operation: count, avg, sum, median, p90, date_trunc
+            group_by: Field to group by (recruiters, sources, stages, etc. or day/week/month/quarter/year)
             filters: Filter conditions (period, entity filters, etc.)
             value_field: Field for avg/sum operations
             chart_type: Type of visualization (bar, line, scatter, table)
+            date_trunc: Time bucket of date_trunc (day, week, month, quarter, year)
             
         Returns:
             Chart-ready data: {"labels": [...], "values": [...]} or table data
         """
+        with profile_stage("process_chart_request", entity=entity, operation=operation, group_by=group_by,
+                           chart_type=chart_type, filters=filters) as record:
+            if record is not None:
+                record["plan"] = await self._explain_filters(entity, filters)
+            result = await self._process_chart_request(entity, operation, group_by, filters, value_field, chart_type,
+                                                       date_trunc)
+            if record is not None:
+                record["rows_out"] = len(result.get("labels", result.get("rows", [])))
+            return result
+    
+    async def _explain_filters(self, entity: str, filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Filter plan of a chart request for its profile record"""
+        if not filters or entity == "funnel":
+            return None
         try:
-            # Step 1: Get base entity data with filtering
             entity_type = self._map_entity_to_type(entity)
+            filter_set = self.filter_engine.parse_prompt_filters(filters)
+            logs = self.calc.log_store.status_logs if entity_type == EntityType.APPLICANTS else None
+            return await self.filter_engine.explain(entity_type, filter_set, logs)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def _process_chart_request(self, entity: str, operation: str, group_by: Optional[str],
+                                     filters: Optional[Dict[str, Any]], value_field: Optional[str],
+                                     chart_type: str, date_trunc: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            # Funnel rows are already aggregated per stage, in funnel order
+            if entity == "funnel":
+                profile_event("chart_path", path="funnel")
+                return await self._process_funnel_request(filters, value_field, chart_type)
+            
+            # Conversion is a derived ratio computed in one grouped pass by the calculator
+            if value_field == "conversion" and chart_type != "table":
+                profile_event("chart_path", path="conversion")
+                return await self._process_conversion_request(entity, group_by, filters)
+            
+            entity_type = self._map_entity_to_type(entity)
+            # Aggregations read one declared column; unknown measures fail before any data is read
+            measure = resolve_measure(entity, operation, value_field)
+            
+            # Counts per time bucket (one series per group for date_trunc with a grouping)
+            if chart_type != "table" and (operation == "date_trunc" or (operation == "count" and group_by in TIME_GROUPINGS)):
+                profile_event("chart_path", path="time_series")
+                return await self._process_time_series(entity_type, group_by, filters, date_trunc)
+            
+            # Counts are folded over a lazy record stream, without materializing entity lists
+            if operation == "count" and chart_type != "table":
+                if not group_by:
+                    profile_event("chart_path", path="count_stream")
+                    records = await self._iter_filtered_entity_data(entity_type, filters)
+                    return self._format_for_chart({entity: sum(1 for _ in records)})
+                key_func = await self._stream_group_key(entity_type, group_by)
+                if key_func is not None:
+                    profile_event("chart_path", path="grouped_count_stream")
+                    records = await self._iter_filtered_entity_data(entity_type, filters)
+                    return self._format_for_chart(self._count_stream(records, key_func))
+            
+            # Step 1: Get base entity data with filtering
+            profile_event("chart_path", path="materialized")
             base_data = await self._get_filtered_entity_data(entity_type, filters)
             
             # Step 2: Apply grouping if specified
@@ -51,17 +124,123 @@ class UniversalChartProcessor:
             
             # Step 3: Format based on chart type
             if chart_type == "table":
-                # For tables, return grouped data with full details
-                return self._format_for_table(grouped_data, entity, operation, value_field)
+                # For tables, return grouped data with full details; ID group keys get display names
+                names = await self.calc.dimensions.names(group_by) if group_by else {}
+                return self._format_for_table(grouped_data, entity, operation, measure, names,
+                                              self._table_id(entity, operation, group_by, filters, value_field))
             else:
                 # For charts, apply operation and format
-                result_data = self._apply_operation(grouped_data, operation, value_field)
+                result_data = self._apply_operation(grouped_data, operation, measure)
                 return self._format_for_chart(result_data)
             
         except Exception as e:
             logger.error(f"Universal chart processing error: {e}")
             return {"labels": ["Error"], "values": [0], "title": f"Error processing {entity}"}
     
+    def _table_id(self, entity: str, operation: str, group_by: Optional[str],
+                  filters: Optional[Dict[str, Any]], value_field: Optional[str]) -> str:
+        """Table ID from the canonical filters, the data version and the day (like report_cache_key),
+        so spellings of the same query share a table and new data gets a new one"""
+        today = date.today()
+        return table_id(entity, operation, group_by, value_field, filters_hash(filters, today),
+                        self.calc.client.data_version(), today.isoformat())
+    
+    async def _process_conversion_request(self, entity: str, group_by: Optional[str],
+                                          filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Conversion rate (hires/applicants, %) overall or per recruiter/source/vacancy/division"""
+        if group_by in ("recruiters", "sources", "vacancies", "divisions"):
+            stats = await self.calc.conversion_stats(group_by, filters)
+            result_data = {name: group["conversion"] for name, group in stats.items()}
+        else:
+            result_data = {entity: await self.calc.overall_conversion_rate(filters)}
+        return self._format_for_chart(result_data)
+    
+    async def _process_funnel_request(self, filters: Optional[Dict[str, Any]], value_field: Optional[str],
+                                      chart_type: str) -> Dict[str, Any]:
+        """Funnel by stage: reached (default), current, conversion or median_days_in_stage"""
+        rows = await self.calc.funnel(filters)
+        
+        if chart_type == "table":
+            return {
+                "columns": self._get_table_columns("funnel"),
+                "rows": [
+                    {
+                        "name": row["name"],
+                        "reached": row["reached"],
+                        "current": row["current"],
+                        "conversion": row["conversion"],
+                        "median_days_in_stage": row["median_days_in_stage"],
+                        "p90_days_in_stage": row["p90_days_in_stage"]
+                    }
+                    for row in rows
+                ],
+                "metadata": {
+                    "total_rows": len(rows),
+                    "sorted_by": "order",
+                    "sort_order": "asc",
+                    "entity_type": "funnel"
+                }
+            }
+        
+        measure = value_field if value_field in ("reached", "current", "conversion", "median_days_in_stage", "p90_days_in_stage") else "reached"
+        return self._format_for_chart({row["name"]: row[measure] for row in rows})
+    
+    async def _process_time_series(self, entity_type: EntityType, group_by: Optional[str],
+                                   filters: Optional[Dict[str, Any]], date_trunc: Optional[str]) -> Dict[str, Any]:
+        """Record counts per time bucket in one pass, with empty buckets filled over the period;
+        a non-time group_by gives one series per group"""
+        unit = date_trunc if date_trunc in TIME_UNITS else TIME_GROUPINGS.get(group_by, "month")
+        series_by = group_by if group_by and group_by not in TIME_GROUPINGS else None
+        builder = TimeSeriesBuilder(unit, self._period_bounds(filters))
+        
+        if series_by is None:
+            for item in await self._iter_filtered_entity_data(entity_type, filters):
+                builder.add(self._record_date(entity_type, item))
+            return builder.to_chart()
+        
+        key_func = await self._stream_group_key(entity_type, series_by)
+        if key_func is not None:
+            for item in await self._iter_filtered_entity_data(entity_type, filters):
+                builder.add(self._record_date(entity_type, item), key_func(item))
+        else:
+            data = await self._get_filtered_entity_data(entity_type, filters)
+            grouped_data = await self._group_data(data, series_by, entity_type, filters)
+            for group_name, group_items in grouped_data.items():
+                for item in group_items:
+                    builder.add(self._record_date(entity_type, item), group_name)
+        return builder.to_chart()
+    
+    def _period_bounds(self, filters: Optional[Dict[str, Any]]) -> Optional[Tuple[date, date]]:
+        """[first day, end day) of the filter period, None without a period"""
+        if not filters or "period" not in filters:
+            return None
+        try:
+            period_filter = self.filter_engine.parse_prompt_filters(filters).period_filter
+        except ValueError:
+            return None
+        if period_filter is None or period_filter.start_date is None:
+            return None
+        return period_filter.start_date.date(), period_filter.end_date.date()
+    
+    @staticmethod
+    def _record_date(entity_type: EntityType, item: Dict[str, Any]) -> Any:
+        """Timestamp a record is bucketed by: hire date for hires, creation date otherwise"""
+        if entity_type == EntityType.HIRES:
+            return item.get('hired_date') or item.get('created')
+        return item.get('created')
+    
+    async def iter_records(self, entity: str, filters: Optional[Dict[str, Any]] = None
+                           ) -> Tuple[Optional[List[str]], Iterable[Dict[str, Any]]]:
+        """(fields, records) of an entity for exports: records built from logs come lazily with their
+        fixed fields; other records come as a list (fields None: their keys vary by record)"""
+        if entity == "funnel":
+            raise ValueError("Funnel rows are aggregates, not records")
+        entity_type = self._map_entity_to_type(entity)
+        records = await self._iter_filtered_entity_data(entity_type, filters)
+        if isinstance(records, list):
+            return None, records
+        return RECORD_FIELDS[entity_type], records
+    
     def _map_entity_to_type(self, entity: str) -> EntityType:
         """Map entity string to EntityType enum"""
         mapping = {
@@ -71,7 +250,8 @@ class UniversalChartProcessor:
             "recruiters": EntityType.RECRUITERS,
             "sources": EntityType.SOURCES,
             "stages": EntityType.STAGES,
-            "actions": EntityType.ACTIONS
+            "actions": EntityType.ACTIONS,
+            "funnel": EntityType.FUNNEL
         }
         return mapping.get(entity, EntityType.APPLICANTS)
     
@@ -107,6 +287,62 @@ class UniversalChartProcessor:
         # No need for additional UniversalFilterEngine filtering
         return base_data
     
+    async def _iter_filtered_entity_data(self, entity_type: EntityType,
+                                         filters: Optional[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """Lazy variant of _get_filtered_entity_data for entities built from logs (a list for the others)"""
+        if entity_type == EntityType.APPLICANTS:
+            return await self.calc.iter_applicants(filters)
+        elif entity_type == EntityType.ACTIONS:
+            return await self.calc.iter_actions(filters)
+        elif entity_type == EntityType.REJECTIONS:
+            return await self.calc.iter_rejections(filters)
+        return await self._get_filtered_entity_data(entity_type, filters)
+    
+    async def _stream_group_key(self, entity_type: EntityType,
+                                group_by: str) -> Optional[Callable[[Dict[str, Any]], str]]:
+        """Per-record group key for groupings that can be counted in-stream, None otherwise"""
+        if group_by == "recruiters" and entity_type in [EntityType.HIRES, EntityType.APPLICANTS]:
+            return self._recruiter_key()
+        if group_by == "sources":
+            return await self._source_key()
+        if group_by == "vacancies":
+            return self._vacancy_name
+        return None
+    
+    async def count_groupings(self, entity: str, filters: Optional[Dict[str, Any]],
+                              groupings: List[Optional[str]]) -> Dict[Optional[str], Dict[str, Any]]:
+        """Chart results of count queries over one filtered record stream, for several groupings
+        at once, in a single pass. Groupings that can't be counted in-stream are left out"""
+        entity_type = self._map_entity_to_type(entity)
+        key_funcs = {}
+        for group_by in groupings:
+            key_func = await self._stream_group_key(entity_type, group_by) if group_by else (lambda item: entity)
+            if key_func is not None:
+                key_funcs[group_by] = key_func
+        if not key_funcs:
+            return {}
+        groupings = list(key_funcs)
+        
+        profile_event("chart_path", path="fused_count_stream", entity=entity, groupings=groupings)
+        # Ungrouped counts report the entity even when nothing matched, as the count_stream path does
+        counts = [{} if group_by else {entity: 0} for group_by in groupings]
+        accumulators = list(zip(key_funcs.values(), counts))
+        for item in await self._iter_filtered_entity_data(entity_type, filters):
+            for key_func, group_counts in accumulators:
+                group_name = key_func(item)
+                group_counts[group_name] = group_counts.get(group_name, 0) + 1
+        
+        return {group_by: self._format_for_chart(group_counts) for group_by, group_counts in zip(groupings, counts)}
+    
+    def _count_stream(self, records: Iterator[Dict[str, Any]],
+                      key_func: Callable[[Dict[str, Any]], str]) -> Dict[str, int]:
+        """Count records per group key in one pass"""
+        counts: Dict[str, int] = {}
+        for item in records:
+            group_name = key_func(item)
+            counts[group_name] = counts.get(group_name, 0) + 1
+        return counts
+    
     async def _group_data(self, data: List[Dict[str, Any]], group_by: str, 
                          entity_type: EntityType, filters: Optional[Dict[str, Any]]) -> Dict[str, List]:
         """Group data by the specified field"""
@@ -119,7 +355,7 @@ class UniversalChartProcessor:
             return await self._group_by_stages(data, entity_type, filters)
         elif group_by == "vacancies":
             return self._group_by_vacancies(data)
-        elif group_by == "month" or group_by == "date":
+        elif group_by in TIME_GROUPINGS:
             return self._group_by_date(data, entity_type, group_by)
         else:
             # Generic grouping by field name
@@ -128,45 +364,52 @@ class UniversalChartProcessor:
     async def _group_by_recruiters(self, data: List[Dict[str, Any]], 
                                  entity_type: EntityType) -> Dict[str, List]:
         """Group data by recruiters using log analysis"""
-        from analyze_logs import LogAnalyzer
         
-        # For hires and applicants, get recruiter from logs
+        # For hires and applicants, get recruiter from the log store index
         if entity_type in [EntityType.HIRES, EntityType.APPLICANTS]:
-            analyzer = LogAnalyzer(self.calc.client.db_path)
-            all_logs = analyzer.get_merged_logs()
-            
-            groups = {}
-            for item in data:
-                # Get applicant_id from item (different field names for different entities)
-                applicant_id = item.get('applicant_id') or item.get('id')
-                recruiter_name = 'Unknown'
-                
-                # Find recruiter from logs
-                applicant_logs = [log for log in all_logs if log.get('applicant_id') == applicant_id]
-                if applicant_logs:
-                    recent_log = max(applicant_logs, key=lambda x: x.get('created', ''))
-                    account_info = recent_log.get('account_info', {})
-                    if isinstance(account_info, dict):
-                        recruiter_name = account_info.get('name', 'Unknown')
-                
-                if recruiter_name not in groups:
-                    groups[recruiter_name] = []
-                groups[recruiter_name].append(item)
-            
-            return groups
+            return self._group_by_key(data, self._recruiter_key())
         
         # For other entities, try to use recruiter field directly
         return self._group_by_field(data, 'recruiter')
     
+    def _recruiter_key(self) -> Callable[[Dict[str, Any]], str]:
+        """Key: the recruiter who most recently worked with the item's applicant"""
+        store = self.calc.log_store
+        return lambda item: store.recruiter_name_for_applicant(item.get('applicant_id') or item.get('id'))
+    
     async def _group_by_sources(self, data: List[Dict[str, Any]]) -> Dict[str, List]:
         """Group data by sources using logs and API mapping"""
+        return self._group_by_key(data, await self._source_key())
+    
+    async def _source_key(self) -> Callable[[Dict[str, Any]], str]:
+        """Key: display name of the item's applicant source, from the log store index"""
         
-        # Get source mapping from API
-        try:
-            api_sources = await self.calc.sources_all()
-            source_map = {str(src['id']): src['name'] for src in api_sources}
-        except:
-            source_map = {}
+        # Source names from the dimension dictionary (loaded once per data version)
+        source_map = await self.calc.dimensions.names("sources")
+        
+        source_by_applicant = self.calc.log_store.source_by_applicant
+        labels: Dict[str, str] = {}
+        
+        def key(item: Dict[str, Any]) -> str:
+            # Get applicant ID from either 'applicant_id' or 'id' field
+            applicant_id = item.get('applicant_id') or item.get('id')
+            source_id = source_by_applicant.get(applicant_id) if applicant_id else None
+            if source_id is None:
+                return 'Unknown'
+            
+            source_id = str(source_id)
+            if source_id not in labels:
+                labels[source_id] = self._source_label(source_id, source_map)
+            return labels[source_id]
+        
+        return key
+    
+    def _source_label(self, source_id: str, source_map: Dict[str, str]) -> str:
+        """Display name for a source ID: API mapping, then common name patterns, then a short ID"""
+        
+        # Try API mapping first
+        if source_id in source_map:
+            return source_map[source_id]
         
         # Add common source name patterns for better mapping
         source_patterns = {
@@ -183,64 +426,22 @@ class UniversalChartProcessor:
             'facebook': 'Facebook'
         }
         
-        # Get logs for source information
-        analyzer = self.calc.cached_log_analyzer
-        all_logs = analyzer.get_merged_logs()
-        
-        groups = {}
-        for item in data:
-            # Get applicant ID from either 'applicant_id' or 'id' field
-            applicant_id = item.get('applicant_id') or item.get('id')
-            source_name = 'Unknown'
-            
-            # Find source from logs for this applicant
-            if applicant_id:
-                applicant_logs = [log for log in all_logs if log.get('applicant_id') == applicant_id]
-                for log in applicant_logs:
-                    if log.get('source'):
-                        source_id = str(log['source'])
-                        
-                        # Try API mapping first
-                        if source_id in source_map:
-                            source_name = source_map[source_id]
-                        else:
-                            # Try pattern matching for common sources
-                            source_lower = source_id.lower()
-                            matched = False
-                            for pattern, name in source_patterns.items():
-                                if pattern in source_lower:
-                                    source_name = name
-                                    matched = True
-                                    break
-                            
-                            # If no pattern match, use a cleaner name
-                            if not matched:
-                                if len(source_id) > 10:  # Long IDs get shortened
-                                    source_name = f'External Source #{source_id[-6:]}'
-                                else:
-                                    source_name = f'Source {source_id}'
-                        break
-            
-            if source_name not in groups:
-                groups[source_name] = []
-            groups[source_name].append(item)
+        # Try pattern matching for common sources
+        source_lower = source_id.lower()
+        for pattern, name in source_patterns.items():
+            if pattern in source_lower:
+                return name
         
-        return groups
+        # If no pattern match, use a cleaner name
+        if len(source_id) > 10:  # Long IDs get shortened
+            return f'External Source #{source_id[-6:]}'
+        return f'Source {source_id}'
     
     async def _group_by_stages(self, data: List[Dict[str, Any]], 
                              entity_type: EntityType, filters: Optional[Dict[str, Any]]) -> Dict[str, List]:
         """Group data by stages/status using log data"""
-        from analyze_logs import LogAnalyzer
-        
-        analyzer = LogAnalyzer(self.calc.client.db_path)
-        all_logs = analyzer.get_merged_logs()
-        status_logs = [log for log in all_logs if log.get('type') == 'STATUS']
-        
-        # Apply period filtering to logs if specified
-        if filters:
-            from universal_filter import EntityType
-            filter_set = self.filter_engine.parse_prompt_filters(filters)
-            status_logs = await self.filter_engine.apply_filters(EntityType.APPLICANTS, filter_set, status_logs)
+        # Filtered status logs are shared with the calculator's metrics for equivalent filters
+        status_logs = await self.calc.filtered_status_logs(filters)
         
         # Group by status name
         groups = {}
@@ -253,72 +454,34 @@ class UniversalChartProcessor:
         return groups
     
     def _group_by_date(self, data: List[Dict[str, Any]], entity_type: EntityType, group_by: str) -> Dict[str, List]:
-        """Group data by date periods (month, week, etc.) based on actual data range"""
-        from datetime import datetime, timedelta
-        from dateutil.relativedelta import relativedelta
-        
-        groups = {}
-        
-        # Group data by date and track all months
-        date_groups = {}
-        
+        """Group data into time buckets (day, week, month, quarter, year) in chronological order"""
+        builder = TimeSeriesBuilder(TIME_GROUPINGS.get(group_by, "month"))
+        buckets: Dict[int, List] = {}
         for item in data:
-            # Determine the date field to use based on entity type
-            date_field = None
-            if entity_type == EntityType.HIRES:
-                date_field = item.get('hired_date') or item.get('created')
-            elif entity_type == EntityType.APPLICANTS:
-                date_field = item.get('created')
-            else:
-                date_field = item.get('created')
-            
-            if not date_field:
-                continue
-                
-            try:
-                # Parse the date
-                if isinstance(date_field, str):
-                    if 'T' in date_field and '+' in date_field:
-                        date_part = date_field.split('+')[0]
-                        parsed_date = datetime.fromisoformat(date_part)
-                    else:
-                        parsed_date = datetime.fromisoformat(date_field)
-                else:
-                    continue
-                
-                # Group by month
-                if group_by == "month":
-                    month_label = parsed_date.strftime("%B %Y")  # e.g., "January 2024"
-                else:
-                    # Default to month grouping
-                    month_label = parsed_date.strftime("%B %Y")
-                
-                # Add to group
-                if month_label not in date_groups:
-                    date_groups[month_label] = []
-                date_groups[month_label].append(item)
-                
-            except Exception as e:
-                logger.warning(f"Date parsing error: {e}")
-                continue
+            key = builder.key_of(self._record_date(entity_type, item))
+            if key is not None:
+                buckets.setdefault(key, []).append(item)
         
-        # Return the grouped data (sorted by date)
-        return dict(sorted(date_groups.items()))
+        return {bucket_label(key, builder.unit): buckets[key] for key in sorted(buckets)}
     
     def _group_by_vacancies(self, data: List[Dict[str, Any]]) -> Dict[str, List]:
         """Group data by vacancies"""
+        return self._group_by_key(data, self._vacancy_name)
+    
+    @staticmethod
+    def _vacancy_name(item: Dict[str, Any]) -> str:
+        """Key: vacancy position of the item"""
+        if 'vacancy_position' in item:
+            return item['vacancy_position']
+        elif 'position' in item:
+            return item['position']
+        return 'Unknown'
+    
+    def _group_by_key(self, data: List[Dict[str, Any]], key_func: Callable[[Dict[str, Any]], str]) -> Dict[str, List]:
+        """Group items by a key function in one pass"""
         groups = {}
         for item in data:
-            vacancy_name = 'Unknown'
-            if 'vacancy_position' in item:
-                vacancy_name = item['vacancy_position']
-            elif 'position' in item:
-                vacancy_name = item['position']
-            
-            if vacancy_name not in groups:
-                groups[vacancy_name] = []
-            groups[vacancy_name].append(item)
-        
+            groups.setdefault(key_func(item), []).append(item)
         return groups
     
     def _group_by_field(self, data: List[Dict[str, Any]], field_name: str) -> Dict[str, List]:
@@ -419,50 +582,37 @@ class UniversalChartProcessor:
         logger.warning(f"No meaningful grouping found for field '{original_field}', returning single group")
         return {"All Items": data}
     
-    def _apply_operation(self, grouped_data: Dict[str, List], operation: str, value_field: Optional[str] = None) -> Dict[str, Union[int, float]]:
-        """Apply count/avg/sum operations to grouped data"""
+    def _apply_operation(self, grouped_data: Dict[str, List], operation: str,
+                         measure: Optional[Measure] = None) -> Dict[str, Union[int, float]]:
+        """Apply count/avg/sum/median/p90 to grouped data; aggregations read the measure's column
+        (resolved by resolve_measure)"""
         result = {}
         
         for group_name, group_items in grouped_data.items():
-            if operation == "count":
+            if operation == "count" or measure is None:
                 result[group_name] = len(group_items)
             elif operation == "avg":
-                # Calculate average of specified field or default fields
-                numeric_values = []
-                for item in group_items:
-                    if value_field and value_field in item:
-                        # Use specified value_field (e.g., "days_active")
-                        if isinstance(item[value_field], (int, float)):
-                            numeric_values.append(item[value_field])
-                    elif 'time_to_hire' in item and isinstance(item['time_to_hire'], (int, float)):
-                        # Default: prioritize time_to_hire field (in days) over time_to_hire_hours
-                        numeric_values.append(item['time_to_hire'])
-                    else:
-                        # Fallback to any numeric field with 'time' in name
-                        for key, value in item.items():
-                            if isinstance(value, (int, float)) and 'time' in key.lower() and 'hour' not in key.lower():
-                                numeric_values.append(value)
-                                break
-                
-                if numeric_values:
-                    result[group_name] = sum(numeric_values) / len(numeric_values)
-                else:
-                    result[group_name] = 0
+                values = measure.values(group_items)
+                result[group_name] = sum(values) / len(values) if values else 0
+            elif operation in ("median", "p90"):
+                # Quantiles come from a one-pass mergeable sketch, no sorted copy of the values
+                sketch = self._duration_sketch(group_items, measure)
+                result[group_name] = sketch.median if operation == "median" else sketch.p90
             elif operation == "sum":
-                # Sum numeric values
-                total = 0
-                for item in group_items:
-                    for key, value in item.items():
-                        if isinstance(value, (int, float)):
-                            total += value
-                            break
-                result[group_name] = total
+                result[group_name] = sum(measure.values(group_items))
             else:
                 # Default to count
                 result[group_name] = len(group_items)
         
         return result
     
+    def _duration_sketch(self, items: List[Dict[str, Any]], measure: Measure) -> DurationSketch:
+        """Sketch of the measure over items with a value"""
+        sketch = DurationSketch()
+        for value in measure.values(items):
+            sketch.add(value)
+        return sketch
+    
     def _format_for_chart(self, data: Dict[str, Union[int, float]]) -> Dict[str, Any]:
         """Format data for chart consumption"""
         return {
@@ -471,12 +621,17 @@ class UniversalChartProcessor:
             "title": ""
         }
     
-    def _format_for_table(self, grouped_data: Dict[str, List[Dict]], entity: str, operation: str, value_field: Optional[str] = None) -> Dict[str, Any]:
+    def _format_for_table(self, grouped_data: Dict[str, List[Dict]], entity: str, operation: str, measure: Optional[Measure] = None,
+                          names: Optional[Dict[str, str]] = None, table_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Format data for table display with columns and rows
         
-        Returns table structure with columns definition and row data
+        measure: column aggregated by avg/median/p90 (see field_catalog)
+        names: display names for group keys that are entity IDs (see DimensionDictionary)
+        table_key: ID under which all rows are kept for further pages (see table_engine)
+        Returns table structure with columns definition and the first page of rows
         """
+        names = names or {}
         # Define columns based on entity type
         columns = self._get_table_columns(entity)
         
@@ -490,7 +645,7 @@ class UniversalChartProcessor:
         if is_individual_listing and entity == 'applicants':
             # For individual applicant listings, show each record as a row
             all_items = list(grouped_data.values())[0]  # Get the applicants list
-            for item in all_items[:50]:  # Limit to first 50 for performance
+            for item in all_items:
                 row = {
                     "name": item.get('full_name', item.get('first_name', 'Unknown')),
                     "count": 1,  # Each individual counts as 1
@@ -505,20 +660,21 @@ class UniversalChartProcessor:
         else:
             # Regular grouped data handling
             for group_name, group_items in grouped_data.items():
-                row = {"name": group_name}
+                row = {"name": names.get(group_name, group_name)}
                 
                 # Calculate metrics for this group
                 if operation == "count":
                     row["count"] = len(group_items)
                     row["percentage"] = (len(group_items) / total_count * 100) if total_count > 0 else 0
-                elif operation == "avg" and value_field:
-                    # Calculate average for specified field
-                    numeric_values = []
-                    for item in group_items:
-                        if value_field in item and isinstance(item[value_field], (int, float)):
-                            numeric_values.append(item[value_field])
+                elif operation == "avg" and measure is not None:
+                    numeric_values = measure.values(group_items)
                     row["avg_value"] = sum(numeric_values) / len(numeric_values) if numeric_values else 0
                     row["count"] = len(group_items)
+                elif operation in ("median", "p90") and measure is not None:
+                    sketch = self._duration_sketch(group_items, measure)
+                    row["median_value"] = sketch.median
+                    row["p90_value"] = sketch.p90
+                    row["count"] = len(group_items)
                 
                 # Add entity-specific additional data
                 if entity == 'recruiters' and group_items:
@@ -535,10 +691,7 @@ class UniversalChartProcessor:
                 
                 rows.append(row)
         
-        # Sort rows by count descending by default
-        rows.sort(key=lambda x: x.get("count", 0), reverse=True)
-        
-        # Apply row limit based on entity type
+        # First page size based on entity type; further pages come from the table store
         row_limits = {
             'recruiters': 50,
             'vacancies': 100,
@@ -546,21 +699,13 @@ class UniversalChartProcessor:
             'stages': 20,
             'divisions': 50
         }
+        limit = 50 if is_individual_listing and entity == 'applicants' else row_limits.get(entity, 100)
         
-        limit = row_limits.get(entity, 100)
-        if len(rows) > limit:
-            rows = rows[:limit]
-        
-        return {
-            "columns": columns,
-            "rows": rows,
-            "metadata": {
-                "total_rows": len(rows),
-                "sorted_by": "count",
-                "sort_order": "desc",
-                "entity_type": entity
-            }
-        }
+        table = TableRows(table_key or table_id(entity, operation, measure and measure.name, list(grouped_data)),
+                          entity, columns, rows)
+        store_table(table)
+        # Top rows by count descending by default
+        return table.page(limit, sort_by="count", order="desc")
     
     def _get_table_columns(self, entity: str) -> List[Dict[str, Any]]:
         """Get column definitions based on entity type"""
@@ -601,6 +746,14 @@ class UniversalChartProcessor:
                 {"key": "name", "label": "Подразделение", "type": "text", "sortable": True},
                 {"key": "count", "label": "Вакансий", "type": "number", "sortable": True},
                 {"key": "percentage", "label": "% от общего", "type": "percentage", "sortable": True}
+            ],
+            'funnel': [
+                {"key": "name", "label": "Этап", "type": "text", "sortable": False},
+                {"key": "reached", "label": "Дошли до этапа", "type": "number", "sortable": True},
+                {"key": "current", "label": "Сейчас на этапе", "type": "number", "sortable": True},
+                {"key": "conversion", "label": "Конверсия из предыдущего", "type": "percentage", "sortable": True},
+                {"key": "median_days_in_stage", "label": "Медиана дней на этапе", "type": "number", "sortable": True},
+                {"key": "p90_days_in_stage", "label": "90-й перцентиль дней", "type": "number", "sortable": True}
             ]
         }
         
@@ -617,7 +770,8 @@ async def process_chart_via_universal_engine(entity: str, operation: str = "coun
                                            filters: Optional[Dict[str, Any]] = None,
                                            calc: EnhancedMetricsCalculator = None,
                                            value_field: Optional[str] = None,
-                                           chart_type: str = "bar") -> Dict[str, Any]:
+                                           chart_type: str = "bar",
+                                           date_trunc: Optional[str] = None) -> Dict[str, Any]:
     """
     Main entry point for universal chart processing
     
@@ -631,4 +785,4 @@ async def process_chart_via_universal_engine(entity: str, operation: str = "coun
         )
     """
     processor = UniversalChartProcessor(calc)
-    return await processor.process_chart_request(entity, operation, group_by, filters, value_field, chart_type)
\ No newline at end of file
+    return await processor.process_chart_request(entity, operation, group_by, filters, value_field, chart_type, date_trunc)
\ No newline at end of file
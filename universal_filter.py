@@ -1,7 +1,8 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Union, List, Any, Optional, Dict
-from datetime import datetime, timedelta
+from typing import Union, List, Any, Optional, Dict, Tuple
+from datetime import datetime, date, time, timedelta
+import re
 
 class EntityType(Enum):
     """All entity types that can be filtered"""
@@ -15,6 +16,43 @@ class EntityType(Enum):
     REJECTIONS = "rejections"
     ACTIONS = "actions"
     DIVISIONS = "divisions"
+    FUNNEL = "funnel"
+
+# Field holding each entity's date for period filters; None means the entity has no date
+ENTITY_DATE_FIELDS = {
+    EntityType.APPLICANTS: "created",
+    EntityType.VACANCIES: "created",
+    EntityType.RECRUITERS: None,
+    EntityType.HIRING_MANAGERS: None,
+    EntityType.STAGES: None,
+    EntityType.SOURCES: None,
+    EntityType.HIRES: "created",
+    EntityType.REJECTIONS: "created",
+    EntityType.ACTIONS: "created",
+    EntityType.DIVISIONS: None,
+    EntityType.FUNNEL: "created"
+}
+
+# Length in days of one unit of a rolling period: '3 month' starts 90 days before today
+PERIOD_UNIT_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30,
+    "quarter": 90,
+    "year": 365
+}
+
+# Months in one calendar unit of 'this'/'last' periods
+_CALENDAR_UNIT_MONTHS = {
+    "month": 1,
+    "quarter": 3,
+    "year": 12
+}
+
+_PERIOD_SPELLING = re.compile(r'^(?:last |past )?(\d+)\s*(day|week|month|quarter|year)s?$')
+_CALENDAR_PERIOD = re.compile(r'^(this|last|previous) (week|month|quarter|year)$')
+_DATE_RANGE = re.compile(r'^(\d{4}-\d{2}-\d{2})\s*(?:\.\.|to|/|–|—|\s-\s)\s*(\d{4}-\d{2}-\d{2})$')
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
 
 class FilterOperator(Enum):
     """All supported filter operations"""
@@ -53,40 +91,88 @@ class PeriodFilter:
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     
+    @staticmethod
+    def normalize_name(period_str: str) -> str:
+        """Canonical spelling of a period string: '6 months' -> '6 month', a bare unit means one of it
+        ('year' -> '1 year', 'quarter' -> '1 quarter'), 'previous quarter' -> 'last quarter',
+        '2024-01-01 to 2024-03-31' -> '2024-01-01..2024-03-31'"""
+        text = " ".join(str(period_str).lower().split())
+        if text in PERIOD_UNIT_DAYS:
+            text = f"1 {text}"
+        match = _PERIOD_SPELLING.match(text)
+        if match:
+            text = f"{int(match.group(1))} {match.group(2)}"
+        match = _CALENDAR_PERIOD.match(text)
+        if match:
+            text = f"{'this' if match.group(1) == 'this' else 'last'} {match.group(2)}"
+        match = _DATE_RANGE.match(text)
+        if match:
+            text = f"{match.group(1)}..{match.group(2)}"
+        return text
+    
+    @staticmethod
+    def _month_start(day: date, months_back: int = 0, unit_months: int = 1) -> date:
+        """First day of the calendar unit containing day, moved months_back units earlier"""
+        month_index = day.year * 12 + day.month - 1
+        month_index -= month_index % unit_months + months_back * unit_months
+        return date(month_index // 12, month_index % 12 + 1, 1)
+    
     @classmethod
-    def from_string(cls, period_str: str) -> 'PeriodFilter':
-        """Create period filter from string like '3 month'"""
-        now = datetime.now()
+    def resolve_days(cls, period_str: str, today: Optional[date] = None) -> Tuple[date, date]:
+        """(first day, day after the last day) of a period; raises ValueError for unknown periods.
+        Rolling periods ('N day/week/month/quarter/year') end with today, 'this X' runs from the
+        start of the calendar unit to today, 'last X' is the whole previous calendar unit"""
+        period_str = cls.normalize_name(period_str)
+        today = today or date.today()
+        tomorrow = today + timedelta(days=1)
         
         if period_str == "today":
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now
-        elif period_str == "this week":
-            days_since_monday = now.weekday()
-            start_date = now - timedelta(days=days_since_monday)
-            end_date = now
-        elif period_str == "1 month":
-            start_date = now - timedelta(days=30)
-            end_date = now
-        elif period_str == "2 month":
-            start_date = now - timedelta(days=60)
-            end_date = now
-        elif period_str == "3 month":
-            start_date = now - timedelta(days=90)
-            end_date = now
-        elif period_str == "6 month":
-            start_date = now - timedelta(days=180)
-            end_date = now
-        elif period_str == "year" or period_str == "1 year":
-            start_date = now - timedelta(days=365)
-            end_date = now
-        else:
-            raise ValueError(f"Unknown period type: {period_str}")
+            return today, tomorrow
+        if period_str == "yesterday":
+            return today - timedelta(days=1), today
         
+        match = _PERIOD_SPELLING.match(period_str)
+        if match and int(match.group(1)) > 0:
+            days = int(match.group(1)) * PERIOD_UNIT_DAYS[match.group(2)]
+            try:
+                return today - timedelta(days=days), tomorrow
+            except OverflowError:
+                raise ValueError(f"Period too long: {period_str}")
+        
+        match = _CALENDAR_PERIOD.match(period_str)
+        if match:
+            relation, unit = match.groups()
+            if unit == "week":
+                this_start = today - timedelta(days=today.weekday())
+                if relation == "this":
+                    return this_start, tomorrow
+                return this_start - timedelta(days=7), this_start
+            unit_months = _CALENDAR_UNIT_MONTHS[unit]
+            this_start = cls._month_start(today, 0, unit_months)
+            if relation == "this":
+                return this_start, tomorrow
+            return cls._month_start(today, 1, unit_months), this_start
+        
+        match = _DATE_RANGE.match(period_str)
+        if match or _DATE.match(period_str):
+            first, last = match.groups() if match else (period_str, period_str)
+            first_day, last_day = date.fromisoformat(first), date.fromisoformat(last)
+            if last_day < first_day:
+                raise ValueError(f"Period ends before it starts: {period_str}")
+            return first_day, last_day + timedelta(days=1)
+        
+        raise ValueError(f"Unknown period type: {period_str}")
+    
+    @classmethod
+    def from_string(cls, period_str: str, today: Optional[date] = None) -> 'PeriodFilter':
+        """Create period filter from string like '3 month', 'last quarter' or '2024-01-01..2024-03-31'.
+        The range is whole days, [start_date, end_date) with both at midnight, so it is the
+        same for the whole day and can be used as a cache key"""
+        first_day, end_day = cls.resolve_days(period_str, today)
         return cls(
-            period_type=period_str,
-            start_date=start_date,
-            end_date=end_date
+            period_type=cls.normalize_name(period_str),
+            start_date=datetime.combine(first_day, time.min),
+            end_date=datetime.combine(end_day, time.min)
         )
 
 @dataclass
@@ -105,4 +191,6 @@ class FilterSet:
     period_filter: Optional[PeriodFilter] = None
     entity_filters: List[UniversalFilter] = field(default_factory=list)
     cross_entity_filters: List[UniversalFilter] = field(default_factory=list)
-    logical_filters: List[LogicalFilter] = field(default_factory=list)
\ No newline at end of file
+    logical_filters: List[LogicalFilter] = field(default_factory=list)
+    # Stable hash of the normalized prompt filters this set was parsed from (see filter_normalizer)
+    canonical_hash: Optional[str] = None
\ No newline at end of file
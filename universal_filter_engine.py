@@ -1,10 +1,34 @@
-from typing import Dict, List, Any, Optional, Union
-from universal_filter import UniversalFilter, FilterSet, PeriodFilter, EntityType, FilterOperator, LogicalFilter
-from datetime import datetime
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, Set, FrozenSet, Sequence
+from universal_filter import UniversalFilter, FilterSet, PeriodFilter, EntityType, FilterOperator, LogicalFilter, ENTITY_DATE_FIELDS
+from filter_compiler import (
+    Predicate, compile_value_matcher, compile_field_predicate, compile_period_predicate, fuse_all, fuse_any
+)
+from sql_pushdown import SQLPushdownPlanner, PushdownPlan, LOG_ID_EXPRESSIONS, LOG_ENTITIES
+from filter_planner import FilterPlan, FilterStep, FilterStats, STEP_KINDS, estimate_step
+from query_profiler import profile_stage, profile_event, count_cache
+from bitmap_index import LogBitmapIndex
+from filter_normalizer import normalize_filters
+from log_store import LogStore, normalize_id
+from dataclasses import dataclass, replace
+from datetime import datetime, date
+import json
 import logging
+import sqlite3
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class LogRoute:
+    """Access path of apply_log_filters and what it runs on"""
+    path: str
+    sliced: Optional[Sequence] = None  # Period slice of the store's logs
+    rest: Optional[FilterSet] = None  # Filters left after the period slice
+    plan: Optional[PushdownPlan] = None
+    id_expression: Optional[str] = None
+    indexed: Optional[Tuple[LogBitmapIndex, int]] = None  # (index, universe) of the store's logs
+
+
 class UniversalFilterEngine:
     """Centralized engine for processing all filters"""
     
@@ -13,6 +37,19 @@ class UniversalFilterEngine:
         self.log_analyzer = log_analyzer
         self.calculator = calculator  # Reference to parent calculator to avoid circular imports
         self.entity_relationships = self._build_entity_relationships()
+        # Compiled non-period filter steps keyed by (entity, canonical filter, data version, day)
+        self._compiled_filters: Dict[Tuple, List[FilterStep]] = {}
+        # Observed pass rates and timings per filter, used to order filter steps
+        self.filter_stats = FilterStats()
+        # Index-based selectivity per (entity, step signature, data version)
+        self._index_selectivity: Dict[Tuple, Optional[float]] = {}
+        self.pushdown_planner = SQLPushdownPlanner(self.entity_relationships, self.parse_prompt_filters)
+        # (log store version, log ID expression) - None expression when the store doesn't mirror applicant_logs
+        self._pushdown_state: Optional[Tuple[int, Optional[str]]] = None
+        # Reverse relationship indexes when there is no calculator log store to share
+        self._reverse_store: Optional[LogStore] = None
+    
+    COMPILED_FILTER_CACHE_SIZE = 256
     
     def _build_entity_relationships(self) -> Dict[str, Dict[str, str]]:
         """Define how entities relate to each other"""
@@ -87,81 +124,447 @@ class UniversalFilterEngine:
     
     async def apply_filters(self, entity_type: EntityType, filters: FilterSet, 
                           base_data: Optional[List] = None) -> List:
-        """Apply all filters to get filtered entity data"""
+        """Apply all filters to get filtered entity data, most selective and cheapest filter first"""
         
         if base_data is None:
             base_data = await self._fetch_base_data(entity_type)
         
-        result = base_data
-        
-        # Apply logical filters first (they might contain period/entity filters)
-        if filters.logical_filters:
-            result = await self._apply_logical_filters(result, filters.logical_filters, entity_type)
-        
-        # Apply period filters
-        if filters.period_filter:
-            result = self._apply_period_filter(result, filters.period_filter)
-        
-        # Apply cross-entity filters (relationships)
-        if filters.cross_entity_filters:
-            result = await self._apply_cross_entity_filters(result, filters.cross_entity_filters, entity_type)
-        
-        # Apply direct entity filters
-        if filters.entity_filters:
-            result = self._apply_entity_filters(result, filters.entity_filters)
-        
-        return result
-    
-    def _apply_period_filter(self, data: List, period_filter: PeriodFilter) -> List:
-        """Apply time-based filtering"""
-        if not period_filter.start_date:
-            return data
-        
-        filtered_data = []
-        for item in data:
-            # Try different date field names
-            item_date = item.get("created") or item.get("created_at") or item.get("date")
-            if item_date:
-                # Convert string dates to datetime if needed
-                if isinstance(item_date, str):
-                    try:
-                        # Try parsing ISO format with timezone
-                        if '+' in item_date or 'Z' in item_date:
-                            # Handle timezone aware dates
-                            import re
-                            clean_date = re.sub(r'[+]\d{2}:\d{2}$', '', item_date)
-                            clean_date = clean_date.replace('Z', '')
-                            item_date = datetime.fromisoformat(clean_date)
-                        else:
-                            item_date = datetime.fromisoformat(item_date)
-                    except (ValueError, TypeError):
-                        # If parsing fails, include the item
-                        filtered_data.append(item)
-                        continue
-                
-                if isinstance(item_date, datetime):
-                    if period_filter.start_date <= item_date <= period_filter.end_date:
-                        filtered_data.append(item)
-            else:
-                # If no date field, include the item (don't filter out)
-                filtered_data.append(item)
+        plan = await self.plan_filters(entity_type, filters)
+        if not plan.steps:
+            return base_data
+        if plan.reordered:
+            logger.debug(f"Filter order for {entity_type.value}: {[step.label for step in plan.steps]}")
+        
+        with profile_stage("apply_filters", entity=entity_type.value, rows_in=len(base_data),
+                           reordered=plan.reordered) as record:
+            trace = [] if record is not None else None
+            filtered = plan.run(base_data, trace)
+            if record is not None:
+                record.update(rows_out=len(filtered), steps=trace)
+            return filtered
+    
+    async def explain(self, entity_type: EntityType, filters: FilterSet,
+                      logs: Optional[List] = None) -> Dict[str, Any]:
+        """How a FilterSet would be evaluated: the access path apply_log_filters takes for logs
+        (in memory for other data) and the planned order of the filters that path evaluates in
+        memory, with its estimates. Paths answered by the period slice, SQL or bitmaps have no steps"""
+        if logs is None:
+            access_path, planned, row_count = "in_memory", filters, None
+        else:
+            route = self._log_route(entity_type, filters, logs)
+            access_path, planned, row_count = route.path, None, None
+            if route.path == "in_memory":
+                planned, row_count = filters, len(logs)
+            elif route.path == "period_slice+in_memory":
+                planned, row_count = route.rest, len(route.sliced)
+            elif route.path == "sql+residual":
+                # Only the residual runs in memory, over rows SQL matches when it runs
+                planned = route.plan.residual
+        plan = await self.plan_filters(entity_type, planned) if planned is not None else None
+        return {
+            "entity": entity_type.value,
+            "access_path": access_path,
+            "reordered": plan.reordered if plan is not None else False,
+            "steps": plan.explain(row_count) if plan is not None else []
+        }
+    
+    def _log_route(self, entity_type: EntityType, filters: FilterSet, logs: List) -> LogRoute:
+        """Branch of apply_log_filters for these logs and filters, chosen without filtering anything.
+        Shared by the executor and explain(), so both report the same access path"""
+        sliced = self._period_slice(entity_type, filters, logs)
+        if sliced is not None:
+            rest = replace(filters, period_filter=None)
+            if self._is_empty_filter_set(rest):
+                return LogRoute("period_slice", sliced=sliced)
+            plan = self.pushdown_planner.plan(entity_type, rest)
+            if plan is not None and plan.pushed and self._is_empty_filter_set(plan.residual):
+                id_expression = self._pushdown_id_expression()
+                if id_expression is not None:
+                    return LogRoute("period_slice+sql", sliced=sliced, rest=rest, plan=plan, id_expression=id_expression)
+            return LogRoute("period_slice+in_memory", sliced=sliced, rest=rest)
+        
+        plan = self.pushdown_planner.plan(entity_type, filters)
+        id_expression = self._pushdown_id_expression() if plan is not None and plan.pushed else None
+        if id_expression is not None and self._is_empty_filter_set(plan.residual):
+            return LogRoute("sql", plan=plan, id_expression=id_expression)
+        indexed = self._bitmap_index_for(logs)
+        if indexed is not None:
+            return LogRoute("bitmap", indexed=indexed)
+        if id_expression is not None:
+            return LogRoute("sql+residual", plan=plan, id_expression=id_expression)
+        return LogRoute("in_memory")
+    
+    async def apply_log_filters(self, entity_type: EntityType, filters: FilterSet, logs: List) -> List:
+        """apply_filters for merged log rows
+        
+        Filters that translate completely to SQL run in SQLite over applicant_logs. Otherwise,
+        rows of the log store are filtered with bitmap indexes, and any other rows with SQL
+        for the supported part plus the compiled predicate for the rest.
+        """
+        with profile_stage("apply_log_filters", entity=entity_type.value, rows_in=len(logs)) as record:
+            filtered, access_path = await self._apply_log_filters(entity_type, filters, logs)
+            if record is not None:
+                record.update(access_path=access_path, rows_out=len(filtered))
+            return filtered
+    
+    async def _apply_log_filters(self, entity_type: EntityType, filters: FilterSet, logs: List) -> Tuple[List, str]:
+        """(filtered logs, access path taken). A failed SQL query falls back to the compiled
+        predicate, reported as an in-memory path"""
+        route = self._log_route(entity_type, filters, logs)
+        if route.path == "period_slice":
+            return route.sliced, route.path
+        if route.path == "bitmap":
+            index, universe = route.indexed
+            return index.materialize(await self._filter_bitmap(index, filters, entity_type, universe)), route.path
+        
+        source = logs if route.sliced is None else route.sliced
+        remaining = filters if route.sliced is None else route.rest
+        if route.id_expression is not None:
+            matching_ids = self._try_pushdown(route.plan, route.id_expression)
+            if matching_ids is not None:
+                residual = None
+                if route.path == "sql+residual":
+                    residual = await self.compile_filters(entity_type, route.plan.residual)
+                if residual is None:
+                    return [log for log in source if log.get('id') in matching_ids], route.path
+                return [log for log in source if log.get('id') in matching_ids and residual(log)], route.path
+        
+        path = "period_slice+in_memory" if route.sliced is not None else "in_memory"
+        return await self.apply_filters(entity_type, remaining, source), path
+    
+    def _period_slice(self, entity_type: EntityType, filters: FilterSet, logs: List) -> Optional[List]:
+        """Binary-searched view of the period when logs is a time-sorted list of the log store"""
+        period_filter = filters.period_filter
+        if not period_filter or not period_filter.start_date or self.calculator is None:
+            return None
+        if ENTITY_DATE_FIELDS.get(entity_type) != "created":
+            return None
+        try:
+            return self.calculator.log_store.time_slice(logs, period_filter.start_date, period_filter.end_date)
+        except Exception as e:
+            logger.debug(f"Period slice unavailable: {e}")
+            return None
+    
+    def _period_predicate(self, period_filter: PeriodFilter, entity_type: EntityType) -> Optional[Predicate]:
+        """Period predicate over the entity's configured date field; None for entities without dates"""
+        date_field = ENTITY_DATE_FIELDS.get(entity_type, "created")
+        if date_field is None:
+            return None
+        return compile_period_predicate(period_filter, date_field)
+    
+    def _is_empty_filter_set(self, filter_set: FilterSet) -> bool:
+        return not (filter_set.period_filter or filter_set.cross_entity_filters or
+                    filter_set.entity_filters or filter_set.logical_filters)
+    
+    def _try_pushdown(self, plan: PushdownPlan, id_expression: str) -> Optional[set]:
+        """Matching log IDs from SQLite, None when the query fails"""
+        with profile_stage("sql_pushdown", sql=plan.sql(id_expression)) as record:
+            try:
+                matching_ids = self._run_pushdown(plan, id_expression)
+            except sqlite3.Error as e:
+                logger.warning(f"SQL pushdown failed, filtering in memory: {e}")
+                matching_ids = None
+            if record is not None:
+                record["rows_out"] = len(matching_ids) if matching_ids is not None else None
+            return matching_ids
+    
+    def _bitmap_index_for(self, logs: List) -> Optional[Tuple[LogBitmapIndex, int]]:
+        """(index, rows of logs as a bitset) when logs is a list of the calculator's log store"""
+        if self.calculator is None:
+            return None
+        try:
+            store = self.calculator.log_store
+            if logs is store.logs:
+                index = self.calculator.log_bitmap_index
+                return index, index.universe
+            if logs is store.status_logs:
+                index = self.calculator.log_bitmap_index
+                return index, index.bitmap('type', 'STATUS')
+        except Exception as e:
+            logger.debug(f"Bitmap index unavailable: {e}")
+        return None
+    
+    async def _filter_bitmap(self, index: LogBitmapIndex, filter_set: FilterSet,
+                             entity_type: EntityType, universe: int) -> int:
+        """Rows of universe matching a FilterSet, as a bitset"""
+        bitmap = universe
+        
+        period_filter = filter_set.period_filter
+        period = self._period_predicate(period_filter, entity_type) if period_filter else None
+        if period is not None:
+            # Month bitmaps are keyed on 'created', the date field of every log entity
+            bitmap &= index.period(period_filter.start_date, period_filter.end_date, period)
+        
+        for filter_obj in filter_set.cross_entity_filters:
+            bitmap &= await self._cross_entity_bitmap(index, filter_obj, entity_type, bitmap)
+        
+        for filter_obj in filter_set.entity_filters:
+            bitmap &= index.match_rows(compile_field_predicate(filter_obj.field, filter_obj), bitmap)
+        
+        for logical_filter in filter_set.logical_filters:
+            bitmap &= await self._logical_bitmap(index, logical_filter, entity_type, universe)
+        
+        return bitmap
+    
+    async def _cross_entity_bitmap(self, index: LogBitmapIndex, filter_obj: UniversalFilter,
+                                   target_entity: EntityType, within: int) -> int:
+        """Rows matching a cross-entity filter: an OR of dimension bitmaps where the
+        relationship is indexed, the compiled predicate over the rows in `within` otherwise"""
+        relationship_key = self.entity_relationships.get(
+            target_entity.value, {}
+        ).get(filter_obj.entity_type.value)
+        
+        if not relationship_key:
+            return within
+        
+        indexed = await self._cross_entity_dimension(index, filter_obj, target_entity)
+        if indexed is not None:
+            return index.match(*indexed)
         
-        return filtered_data
+        predicate = await self._compile_cross_entity_filter(filter_obj, target_entity)
+        return within if predicate is None else index.match_rows(predicate, within)
     
-    async def _apply_cross_entity_filters(self, data: List, filters: List[UniversalFilter], 
-                                  target_entity: EntityType) -> List:
-        """Apply filters based on entity relationships"""
+    async def _cross_entity_dimension(self, index: LogBitmapIndex, filter_obj: UniversalFilter,
+                                      target_entity: EntityType) -> Optional[Tuple[str, Callable[[Any], bool]]]:
+        """(dimension, key matcher) answering a cross-entity filter from the bitmap index, None when not indexed"""
+        relationship_key = self.entity_relationships.get(
+            target_entity.value, {}
+        ).get(filter_obj.entity_type.value)
         
-        for filter_obj in filters:
-            data = await self._apply_cross_entity_filter(data, filter_obj, target_entity)
+        if not relationship_key:
+            return None
         
-        return data
+        if filter_obj.entity_type == EntityType.VACANCIES and filter_obj.field == "state":
+            if relationship_key != 'vacancy_id':
+                return None
+            matching_vacancy_ids = await self._get_matching_vacancy_ids(filter_obj)
+            dimension, matcher = 'vacancy', lambda vacancy_id: vacancy_id in matching_vacancy_ids
+        elif target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.RECRUITERS:
+            dimension, matcher = 'recruiter', compile_value_matcher(filter_obj)
+        elif target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.SOURCES:
+            dimension, matcher = 'source', compile_value_matcher(filter_obj)
+        elif relationship_key == 'vacancy_id':
+            dimension, matcher = 'vacancy', compile_value_matcher(filter_obj)
+        else:
+            return None
+        
+        if dimension in index.unindexable:
+            return None
+        return dimension, matcher
     
-    async def _apply_cross_entity_filter(self, data: List, filter_obj: UniversalFilter, 
-                                        target_entity: EntityType) -> List:
-        """Apply a single cross-entity filter with proper entity lookup"""
+    async def _logical_bitmap(self, index: LogBitmapIndex, logical_filter: LogicalFilter,
+                              entity_type: EntityType, universe: int) -> int:
+        """AND/OR of condition bitsets"""
+        if logical_filter.operator == "and":
+            bitmap = universe
+            for condition in logical_filter.filters:
+                bitmap &= await self._condition_bitmap(index, condition, entity_type, universe)
+            return bitmap
+        
+        elif logical_filter.operator == "or":
+            bitmap = 0
+            for condition in logical_filter.filters:
+                bitmap |= await self._condition_bitmap(index, condition, entity_type, universe)
+            return bitmap
         
-        logger.debug(f"Applying cross-entity filter: {target_entity.value} filtered by {filter_obj.entity_type.value}.{filter_obj.field} = {filter_obj.value}")
+        return universe
+    
+    async def _condition_bitmap(self, index: LogBitmapIndex, condition: Union[LogicalFilter, Dict[str, Any]],
+                                entity_type: EntityType, universe: int) -> int:
+        if isinstance(condition, LogicalFilter):
+            return await self._logical_bitmap(index, condition, entity_type, universe)
+        elif isinstance(condition, dict):
+            return await self._filter_bitmap(index, self.parse_prompt_filters(condition), entity_type, universe)
+        return universe
+    
+    def _run_pushdown(self, plan: PushdownPlan, id_expression: str) -> set:
+        """IDs of applicant_logs rows matching the pushed-down clauses"""
+        conn = sqlite3.connect(self.db_client.db_path)
+        try:
+            return {row[0] for row in conn.execute(plan.sql(id_expression), plan.params)}
+        finally:
+            conn.close()
+    
+    def _pushdown_id_expression(self) -> Optional[str]:
+        """How applicant_logs rows map to log store IDs; None disables pushdown.
+        Pushdown is exact only while the log store holds the same rows as applicant_logs,
+        checked once per store version."""
+        if self.calculator is None or not getattr(self.db_client, 'db_path', None):
+            return None
+        try:
+            store = self.calculator.log_store
+        except Exception:
+            return None
+        
+        if self._pushdown_state is None or self._pushdown_state[0] != store.version:
+            store_ids = {log.get('id') for log in store.logs}
+            id_expression = None
+            try:
+                conn = sqlite3.connect(self.db_client.db_path)
+                try:
+                    for expression in LOG_ID_EXPRESSIONS:
+                        table_ids = {row[0] for row in conn.execute(f"SELECT {expression} FROM applicant_logs l")}
+                        if table_ids == store_ids and len(store_ids) == len(store.logs):
+                            id_expression = expression
+                            break
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not compare log store with applicant_logs: {e}")
+            if id_expression is None:
+                logger.info("Log store differs from applicant_logs, SQL pushdown disabled")
+            self._pushdown_state = (store.version, id_expression)
+        
+        return self._pushdown_state[1]
+    
+    async def compile_filters(self, entity_type: EntityType, filters: FilterSet) -> Optional[Predicate]:
+        """Compile a FilterSet into one item predicate (None when nothing filters)
+        
+        Logical, cross-entity and entity filters are compiled once per canonical filter and data
+        version; the period bounds are taken from the FilterSet on every call. The filters are
+        fused in planned order, so the most selective one rejects an item first.
+        """
+        return (await self.plan_filters(entity_type, filters)).predicate()
+    
+    async def plan_filters(self, entity_type: EntityType, filters: FilterSet) -> FilterPlan:
+        """The independent (ANDed) filters of a FilterSet as steps ordered by estimated
+        selectivity and cost"""
+        steps = list(await self._compiled_steps(entity_type, filters))
+        
+        period_filter = filters.period_filter
+        period = self._period_predicate(period_filter, entity_type) if period_filter else None
+        if period is not None:
+            date_field = ENTITY_DATE_FIELDS.get(entity_type, "created")
+            steps.append(FilterStep('period', f"{date_field} within {period_filter.period_type}", period, period_filter))
+        
+        # Positions follow the fixed order filters used to run in: logical, period, cross-entity, entity
+        steps.sort(key=lambda step: STEP_KINDS.index(step.kind))
+        estimated = []
+        for position, step in enumerate(steps):
+            step = replace(step, position=position)
+            estimated.append(estimate_step(step, self.filter_stats, await self._step_index_selectivity(step, entity_type)))
+        return FilterPlan(estimated, self.filter_stats)
+    
+    async def _compiled_steps(self, entity_type: EntityType, filters: FilterSet) -> List[FilterStep]:
+        """Compiled logical, cross-entity and entity filter steps, cached per canonical filter and data version"""
+        cache_key = self._compiled_filter_key(entity_type, filters)
+        if cache_key is not None and cache_key in self._compiled_filters:
+            count_cache("compiled_filters", hit=True)
+            return self._compiled_filters[cache_key]
+        count_cache("compiled_filters", hit=False)
+        
+        steps = []
+        for logical_filter in filters.logical_filters:
+            steps.append(FilterStep('logical', self._describe_condition(logical_filter),
+                                    await self._compile_logical_filter(logical_filter, entity_type), logical_filter))
+        for filter_obj in filters.cross_entity_filters:
+            steps.append(FilterStep('cross', self._describe_filter(filter_obj),
+                                    await self._compile_cross_entity_filter(filter_obj, entity_type), filter_obj))
+        for filter_obj in filters.entity_filters:
+            steps.append(FilterStep('entity', self._describe_filter(filter_obj),
+                                    compile_field_predicate(filter_obj.field, filter_obj), filter_obj))
+        # Filters compiling to None match everything
+        steps = [step for step in steps if step.predicate is not None]
+        
+        if cache_key is not None:
+            if len(self._compiled_filters) >= self.COMPILED_FILTER_CACHE_SIZE:
+                self._compiled_filters.pop(next(iter(self._compiled_filters)))
+            self._compiled_filters[cache_key] = steps
+        return steps
+    
+    def _describe_filter(self, filter_obj: UniversalFilter) -> str:
+        return f"{filter_obj.entity_type.value}.{filter_obj.field} {filter_obj.operator.value} {json.dumps(filter_obj.value, ensure_ascii=False, default=str)}"
+    
+    def _describe_condition(self, condition: Union[LogicalFilter, Dict[str, Any]]) -> str:
+        return json.dumps(self._canonical_condition(condition), ensure_ascii=False, sort_keys=True, default=str)
+    
+    async def _step_index_selectivity(self, step: FilterStep, entity_type: EntityType) -> Optional[float]:
+        """Fraction of log store rows a period or cross-entity step keeps, from index cardinalities.
+        None for entities that aren't log rows and for filters without an index"""
+        if entity_type not in LOG_ENTITIES or step.kind not in ('period', 'cross') or self.calculator is None:
+            return None
+        try:
+            store = self.calculator.log_store
+            cache_key = (entity_type.value, step.signature, store.version,
+                         step.filter.start_date if step.kind == 'period' else None)
+            if cache_key in self._index_selectivity:
+                count_cache("index_selectivity", hit=True)
+                return self._index_selectivity[cache_key]
+            count_cache("index_selectivity", hit=False)
+            
+            selectivity = None
+            if step.kind == 'period' and store.logs:
+                sliced = store.time_slice(store.logs, step.filter.start_date, step.filter.end_date)
+                if sliced is not None:
+                    selectivity = len(sliced) / len(store.logs)
+            elif step.kind == 'cross':
+                index = self.calculator.log_bitmap_index
+                indexed = await self._cross_entity_dimension(index, step.filter, entity_type)
+                if indexed is not None and index.rows:
+                    selectivity = index.cardinality(*indexed) / len(index.rows)
+        except Exception as e:
+            logger.debug(f"Index selectivity unavailable for {step.label}: {e}")
+            return None
+        
+        if len(self._index_selectivity) >= self.COMPILED_FILTER_CACHE_SIZE:
+            self._index_selectivity.pop(next(iter(self._index_selectivity)))
+        self._index_selectivity[cache_key] = selectivity
+        return selectivity
+    
+    def _compiled_filter_key(self, entity_type: EntityType, filters: FilterSet) -> Optional[Tuple]:
+        """Cache key for the compiled non-period part of a FilterSet; None disables caching"""
+        if not (filters.logical_filters or filters.cross_entity_filters or filters.entity_filters):
+            return (entity_type.value, None)
+        
+        # Relationship lookups depend on the data, so only cache against a known data version
+        if self.calculator is None:
+            return None
+        try:
+            data_version = self.calculator.log_store.version
+        except Exception:
+            return None
+        
+        # Parsed FilterSets carry the hash of their normalized prompt filters
+        if filters.canonical_hash is not None:
+            return (entity_type.value, filters.canonical_hash, data_version, date.today().isoformat())
+        
+        canonical = {
+            "logical": [self._canonical_condition(f) for f in filters.logical_filters],
+            "cross": [self._canonical_filter(f) for f in filters.cross_entity_filters],
+            "entity": [self._canonical_filter(f) for f in filters.entity_filters]
+        }
+        # Day is part of the key: periods nested in logical filters are resolved at compile time
+        return (entity_type.value, json.dumps(canonical, sort_keys=True, default=str),
+                data_version, date.today().isoformat())
+    
+    def _canonical_filter(self, filter_obj: UniversalFilter) -> List[Any]:
+        return [filter_obj.entity_type.value, filter_obj.field, filter_obj.operator.value, filter_obj.value]
+    
+    def _canonical_condition(self, condition: Union[LogicalFilter, Dict[str, Any]]) -> Any:
+        if isinstance(condition, LogicalFilter):
+            return {condition.operator: [self._canonical_condition(c) for c in condition.filters]}
+        return condition
+    
+    async def _compile_filter_set(self, filter_set: FilterSet, entity_type: EntityType) -> Optional[Predicate]:
+        """Predicate for the period, cross-entity and entity filters of a FilterSet"""
+        predicates = []
+        
+        if filter_set.period_filter:
+            predicates.append(self._period_predicate(filter_set.period_filter, entity_type))
+        
+        for filter_obj in filter_set.cross_entity_filters:
+            predicates.append(await self._compile_cross_entity_filter(filter_obj, entity_type))
+        
+        for filter_obj in filter_set.entity_filters:
+            predicates.append(compile_field_predicate(filter_obj.field, filter_obj))
+        
+        return fuse_all(predicates)
+    
+    async def _compile_cross_entity_filter(self, filter_obj: UniversalFilter,
+                                           target_entity: EntityType) -> Optional[Predicate]:
+        """Compile a single cross-entity filter with proper entity lookup"""
+        
+        logger.debug(f"Compiling cross-entity filter: {target_entity.value} filtered by {filter_obj.entity_type.value}.{filter_obj.field} = {filter_obj.value}")
         
         # Get the relationship field (e.g., "vacancy_id" for applicants->vacancies)
         relationship_key = self.entity_relationships.get(
@@ -170,149 +573,111 @@ class UniversalFilterEngine:
         
         if not relationship_key:
             logger.warning(f"No relationship defined between {target_entity.value} and {filter_obj.entity_type.value}")
-            return data  # No relationship defined, return unfiltered
+            self._profile_relationship(filter_obj, target_entity, None, "unfiltered")
+            return None  # No relationship defined, leave unfiltered
         
         logger.debug(f"Using relationship key: {relationship_key}")
         
         # Special handling for complex cross-entity relationships
         
-        # 1. For vacancy state filtering, we need to look up vacancy IDs that match the criteria
+        # 1. For vacancy state filtering, look up vacancy IDs that match the criteria once
         if filter_obj.entity_type == EntityType.VACANCIES and filter_obj.field == "state":
             matching_vacancy_ids = await self._get_matching_vacancy_ids(filter_obj)
             logger.info(f"Found {len(matching_vacancy_ids)} vacancies with state={filter_obj.value}")
-            
-            # Filter data by those vacancy IDs
-            filtered_data = []
-            for item in data:
-                vacancy_id = item.get(relationship_key)
-                if vacancy_id in matching_vacancy_ids:
-                    filtered_data.append(item)
-            
-            logger.info(f"Filtered {len(data)} items to {len(filtered_data)} items based on vacancy state")
-            return filtered_data
+            self._profile_relationship(filter_obj, target_entity, relationship_key, "vacancy_state_map",
+                                       matched_ids=len(matching_vacancy_ids))
+            return lambda item: item.get(relationship_key) in matching_vacancy_ids
         
         # 2. For sources/recruiters filtering, we need reverse lookup through logs
         elif target_entity in [EntityType.SOURCES, EntityType.RECRUITERS]:
-            return await self._apply_reverse_entity_filter(data, filter_obj, target_entity)
+            self._profile_relationship(filter_obj, target_entity, relationship_key, "reverse_index")
+            return await self._compile_reverse_entity_filter(filter_obj, target_entity)
         
         # 3. For filtering applicants by recruiters, extract recruiter info from account_info
         elif target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.RECRUITERS:
-            filtered_data = []
-            for item in data:
-                account_info = item.get('account_info', {})
-                if isinstance(account_info, dict):
-                    recruiter_id = account_info.get('id')
-                    # Check if recruiter_id matches the filter
-                    if self._matches_filter(recruiter_id, filter_obj):
-                        filtered_data.append(item)
+            self._profile_relationship(filter_obj, target_entity, "account_info.id", "log_field")
+            match = compile_value_matcher(filter_obj)
             
-            logger.info(f"Filtered {len(data)} applicants to {len(filtered_data)} by recruiter {filter_obj.value}")
-            return filtered_data
+            def by_recruiter(item: Dict[str, Any]) -> bool:
+                account_info = item.get('account_info', {})
+                return isinstance(account_info, dict) and match(account_info.get('id'))
+            return by_recruiter
         
         # 4. For filtering applicants by sources, extract source info from source field
         elif target_entity == EntityType.APPLICANTS and filter_obj.entity_type == EntityType.SOURCES:
-            filtered_data = []
-            for item in data:
-                source_id = item.get('source')
-                # Check if source_id matches the filter
-                if self._matches_filter(source_id, filter_obj):
-                    filtered_data.append(item)
-            
-            logger.info(f"Filtered {len(data)} applicants to {len(filtered_data)} by source {filter_obj.value}")
-            return filtered_data
+            self._profile_relationship(filter_obj, target_entity, "source", "log_field")
+            return compile_field_predicate('source', filter_obj)
         
         # For other cross-entity filters, use the simple field matching approach
-        return self._apply_single_filter(data, filter_obj, relationship_key)
+        self._profile_relationship(filter_obj, target_entity, relationship_key, "field")
+        return compile_field_predicate(relationship_key, filter_obj)
     
-    async def _apply_reverse_entity_filter(self, data: List, filter_obj: UniversalFilter,
-                                           target_entity: EntityType) -> List:
-        """Apply filtering for sources/recruiters through reverse lookup in logs"""
-        
-        if not self.log_analyzer:
-            logger.warning("No log analyzer available for reverse entity filtering")
-            return data
-        
-        # Get all logs to find relationships
-        all_logs = self.log_analyzer.get_merged_logs()
-        
-        # Build a mapping of entity IDs that match the filter
+    def _profile_relationship(self, filter_obj: UniversalFilter, target_entity: EntityType,
+                              relationship_key: Optional[str], strategy: str, **fields: Any) -> None:
+        """Profile record of the relationship key a cross-entity filter resolved to"""
+        profile_event("cross_entity_filter", entity=target_entity.value, filter=self._describe_filter(filter_obj),
+                      relationship_key=relationship_key, strategy=strategy, **fields)
+    
+    async def _compile_reverse_entity_filter(self, filter_obj: UniversalFilter,
+                                             target_entity: EntityType) -> Optional[Predicate]:
+        """Predicate keeping sources/recruiters whose ID is related to the filter in the logs"""
+        store = self._relationship_store()
+        if store is None:
+            logger.warning("No log data available for reverse entity filtering")
+            return None
+        
+        matching_entity_ids = await self._reverse_entity_ids(store, filter_obj, target_entity)
+        return lambda item: normalize_id(item.get('id')) in matching_entity_ids
+    
+    def _relationship_store(self) -> Optional[LogStore]:
+        """Log store holding the reverse relationship indexes"""
+        if self.calculator is not None:
+            try:
+                return self.calculator.log_store
+            except Exception as e:
+                logger.debug(f"Calculator log store unavailable: {e}")
+        if self.log_analyzer:
+            if self._reverse_store is None:
+                self._reverse_store = LogStore()
+            self._reverse_store.sync(self.log_analyzer.get_merged_logs())
+            return self._reverse_store
+        return None
+    
+    async def _reverse_entity_ids(self, store: LogStore, filter_obj: UniversalFilter,
+                                  target_entity: EntityType) -> set:
+        """Normalized IDs of sources/recruiters related to the filter: a lookup per filter value
+        in the log store's reverse relationship indexes"""
+        values = filter_obj.value if isinstance(filter_obj.value, (list, tuple, set)) else [filter_obj.value]
         matching_entity_ids = set()
         
         if target_entity == EntityType.SOURCES:
-            # Find sources that match the filter criteria
+            # Sources used for specific vacancies / by specific recruiters
             if filter_obj.entity_type == EntityType.VACANCIES:
-                # Find sources used for specific vacancies
-                target_vacancy_id = filter_obj.value
-                for log in all_logs:
-                    if (log.get('vacancy_id') == target_vacancy_id or 
-                        str(log.get('vacancy_id')) == str(target_vacancy_id)):
-                        source_id = log.get('source_id')
-                        if source_id:
-                            matching_entity_ids.add(source_id)
-            
+                if filter_obj.field == "state":
+                    values = await self._get_matching_vacancy_ids(filter_obj)
+                matching_entity_ids = store.related_ids(store.sources_by_vacancy, values)
             elif filter_obj.entity_type == EntityType.RECRUITERS:
-                # Find sources used by specific recruiters
-                target_recruiter_id = filter_obj.value
-                for log in all_logs:
-                    account_info = log.get('account_info', {})
-                    if isinstance(account_info, dict):
-                        recruiter_id = account_info.get('id')
-                        if (recruiter_id == target_recruiter_id or 
-                            str(recruiter_id) == str(target_recruiter_id)):
-                            source_id = log.get('source_id')
-                            if source_id:
-                                matching_entity_ids.add(source_id)
+                matching_entity_ids = store.related_ids(store.sources_by_recruiter, values)
         
         elif target_entity == EntityType.RECRUITERS:
-            # Find recruiters that match the filter criteria
+            # Recruiters working on specific vacancies / using specific sources
             if filter_obj.entity_type == EntityType.VACANCIES:
-                # Find recruiters working on specific vacancies
                 if filter_obj.field == "state":
-                    # Get vacancies with the specified state
-                    matching_vacancy_ids = await self._get_matching_vacancy_ids(filter_obj)
-                    for log in all_logs:
-                        if log.get('vacancy_id') in matching_vacancy_ids:
-                            account_info = log.get('account_info', {})
-                            if isinstance(account_info, dict):
-                                recruiter_id = account_info.get('id')
-                                if recruiter_id:
-                                    matching_entity_ids.add(recruiter_id)
-                else:
-                    # Direct vacancy ID filter
-                    target_vacancy_id = filter_obj.value
-                    for log in all_logs:
-                        if (log.get('vacancy_id') == target_vacancy_id or 
-                            str(log.get('vacancy_id')) == str(target_vacancy_id)):
-                            account_info = log.get('account_info', {})
-                            if isinstance(account_info, dict):
-                                recruiter_id = account_info.get('id')
-                                if recruiter_id:
-                                    matching_entity_ids.add(recruiter_id)
-            
+                    values = await self._get_matching_vacancy_ids(filter_obj)
+                matching_entity_ids = store.related_ids(store.recruiters_by_vacancy, values)
             elif filter_obj.entity_type == EntityType.SOURCES:
-                # Find recruiters using specific sources
-                target_source_id = filter_obj.value
-                for log in all_logs:
-                    if (log.get('source_id') == target_source_id or 
-                        str(log.get('source_id')) == str(target_source_id)):
-                        account_info = log.get('account_info', {})
-                        if isinstance(account_info, dict):
-                            recruiter_id = account_info.get('id')
-                            if recruiter_id:
-                                matching_entity_ids.add(recruiter_id)
-        
-        # Filter the data based on matching entity IDs
-        filtered_data = []
-        for item in data:
-            item_id = item.get('id')
-            if item_id in matching_entity_ids or str(item_id) in {str(id) for id in matching_entity_ids}:
-                filtered_data.append(item)
-        
-        logger.info(f"Reverse filtered {len(data)} {target_entity.value} to {len(filtered_data)} items")
-        return filtered_data
-    
-    async def _get_matching_vacancy_ids(self, filter_obj: UniversalFilter) -> set:
+                matching_entity_ids = store.related_ids(store.recruiters_by_source, values)
+        
+        logger.info(f"Reverse lookup matched {len(matching_entity_ids)} {target_entity.value}")
+        return matching_entity_ids
+    
+    async def _get_matching_vacancy_ids(self, filter_obj: UniversalFilter) -> Set[Any]:
         """Get vacancy IDs that match the given filter criteria"""
+        if filter_obj.field == "state":
+            matching = self._vacancy_ids_for_state(filter_obj)
+            if matching is not None:
+                return matching
+        
         try:
             # Use the parent calculator if available
             if self.calculator:
@@ -324,12 +689,8 @@ class UniversalFilterEngine:
             
             # Get all vacancies and filter by the criteria
             all_vacancies = await calc.vacancies_all()
-            matching_vacancies = []
-            
-            for vacancy in all_vacancies:
-                field_value = vacancy.get(filter_obj.field)
-                if self._matches_filter(field_value, filter_obj):
-                    matching_vacancies.append(vacancy)
+            match = compile_value_matcher(filter_obj)
+            matching_vacancies = [v for v in all_vacancies if match(v.get(filter_obj.field))]
             
             # Return the set of matching vacancy IDs
             return {v.get('id') for v in matching_vacancies if v.get('id')}
@@ -340,108 +701,35 @@ class UniversalFilterEngine:
             logger.error(f"Error getting matching vacancy IDs: {e}")
             return set()
     
-    def _apply_entity_filters(self, data: List, filters: List[UniversalFilter]) -> List:
-        """Apply direct entity filters"""
-        
-        for filter_obj in filters:
-            data = self._apply_single_filter(data, filter_obj, filter_obj.field)
-        
-        return data
-    
-    def _apply_single_filter(self, data: List, filter_obj: UniversalFilter, 
-                           field_name: str) -> List:
-        """Apply a single filter to the data"""
-        
-        filtered_data = []
-        
-        for item in data:
-            field_value = item.get(field_name)
-            
-            if self._matches_filter(field_value, filter_obj):
-                filtered_data.append(item)
-        
-        return filtered_data
+    def _vacancy_ids_for_state(self, filter_obj: UniversalFilter) -> Optional[FrozenSet[Any]]:
+        """Vacancy IDs in the states a filter accepts, from the shared log store's per-version
+        state maps; None without log data"""
+        store = self._relationship_store()
+        if store is None:
+            return None
+        
+        match = compile_value_matcher(filter_obj)
+        return store.vacancy_ids_in_states(state for state in store.vacancy_ids_by_state() if match(state))
     
     def _matches_filter(self, field_value: Any, filter_obj: UniversalFilter) -> bool:
         """Check if a field value matches the filter"""
-        
-        if filter_obj.operator == FilterOperator.EQUALS:
-            # Handle type conversion for numeric comparisons
-            if isinstance(field_value, (int, float)) and isinstance(filter_obj.value, str):
-                try:
-                    return field_value == int(filter_obj.value)
-                except ValueError:
-                    try:
-                        return field_value == float(filter_obj.value)
-                    except ValueError:
-                        return field_value == filter_obj.value
-            elif isinstance(field_value, str) and isinstance(filter_obj.value, (int, float)):
-                try:
-                    return int(field_value) == filter_obj.value
-                except ValueError:
-                    try:
-                        return float(field_value) == filter_obj.value
-                    except ValueError:
-                        return field_value == str(filter_obj.value)
-            
-            # Handle case insensitive string comparison for common values
-            if isinstance(field_value, str) and isinstance(filter_obj.value, str):
-                # Handle vacancy state case variations: 'open' -> 'OPEN', 'closed' -> 'CLOSED'
-                if filter_obj.value.lower() in ['open', 'closed']:
-                    return field_value.upper() == filter_obj.value.upper()
-                # Default case-sensitive comparison
-                return field_value == filter_obj.value
-            
-            return field_value == filter_obj.value
-        elif filter_obj.operator == FilterOperator.NOT_EQUALS:
-            return field_value != filter_obj.value
-        elif filter_obj.operator == FilterOperator.IN:
-            return field_value in filter_obj.value
-        elif filter_obj.operator == FilterOperator.NOT_IN:
-            return field_value not in filter_obj.value
-        elif filter_obj.operator == FilterOperator.CONTAINS:
-            return str(filter_obj.value).lower() in str(field_value).lower()
-        elif filter_obj.operator == FilterOperator.EXISTS:
-            return field_value is not None
-        elif filter_obj.operator == FilterOperator.GREATER_THAN:
-            try:
-                return float(field_value) > float(filter_obj.value)
-            except (ValueError, TypeError):
-                return False
-        elif filter_obj.operator == FilterOperator.GREATER_THAN_EQUAL:
-            try:
-                return float(field_value) >= float(filter_obj.value)
-            except (ValueError, TypeError):
-                return False
-        elif filter_obj.operator == FilterOperator.LESS_THAN:
-            try:
-                return float(field_value) < float(filter_obj.value)
-            except (ValueError, TypeError):
-                return False
-        elif filter_obj.operator == FilterOperator.LESS_THAN_EQUAL:
-            try:
-                return float(field_value) <= float(filter_obj.value)
-            except (ValueError, TypeError):
-                return False
-        elif filter_obj.operator == FilterOperator.BETWEEN:
-            try:
-                val = float(field_value)
-                return filter_obj.value[0] <= val <= filter_obj.value[1]
-            except (ValueError, TypeError, IndexError):
-                return False
-        
-        return False
+        return compile_value_matcher(filter_obj)(field_value)
     
     def parse_prompt_filters(self, prompt_filters: Dict[str, Any]) -> FilterSet:
-        """Convert prompt.py filter format to FilterSet"""
+        """Convert prompt.py filter format to FilterSet
+        
+        Filters are normalized first, so equivalent spellings parse to the same FilterSet
+        and the period is a day-aligned range.
+        """
+        canonical = normalize_filters(prompt_filters)
         
-        period_filter = None
+        period_filter = canonical.period_filter
         cross_entity_filters = []
         logical_filters = []
         
-        for filter_key, filter_value in prompt_filters.items():
+        for filter_key, filter_value in canonical.to_prompt_filters().items():
             if filter_key == "period":
-                period_filter = PeriodFilter.from_string(filter_value)
+                continue
             elif filter_key in ["and", "or"]:
                 # Logical operator
                 logical_filter = self._parse_logical_filter(filter_key, filter_value)
@@ -455,7 +743,8 @@ class UniversalFilterEngine:
         return FilterSet(
             period_filter=period_filter,
             cross_entity_filters=cross_entity_filters,
-            logical_filters=logical_filters
+            logical_filters=logical_filters,
+            canonical_hash=canonical.hash
         )
     
     def _parse_logical_filter(self, operator: str, conditions: List[Dict[str, Any]]) -> LogicalFilter:
@@ -566,69 +855,33 @@ class UniversalFilterEngine:
                 value=filter_value
             )
     
-    async def _apply_logical_filters(self, data: List, logical_filters: List[LogicalFilter], 
-                             entity_type: EntityType) -> List:
-        """Apply logical filters (AND/OR combinations)"""
-        
-        for logical_filter in logical_filters:
-            data = await self._apply_single_logical_filter(data, logical_filter, entity_type)
-        
-        return data
-    
-    async def _apply_single_logical_filter(self, data: List, logical_filter: LogicalFilter,
-                                   entity_type: EntityType) -> List:
-        """Apply a single logical filter (AND or OR)"""
+    async def _compile_logical_filter(self, logical_filter: LogicalFilter,
+                                      entity_type: EntityType) -> Optional[Predicate]:
+        """Compile a single logical filter (AND or OR)"""
+        conditions = [await self._compile_condition(c, entity_type) for c in logical_filter.filters]
         
         if logical_filter.operator == "and":
-            # AND: Apply all conditions, item must match ALL
-            result = data
-            for condition in logical_filter.filters:
-                result = await self._apply_condition(result, condition, entity_type)
-            return result
+            # AND: item must match ALL conditions
+            return fuse_all(conditions)
         
         elif logical_filter.operator == "or":
-            # OR: Apply all conditions, item must match ANY
-            all_results = set()
-            for condition in logical_filter.filters:
-                condition_results = await self._apply_condition(data, condition, entity_type)
-                # Use item IDs or string representation for set operations
-                for item in condition_results:
-                    item_key = item.get("id", str(item))
-                    all_results.add(item_key)
-            
-            # Return items that matched any condition
-            return [item for item in data if item.get("id", str(item)) in all_results]
+            # OR: item must match ANY condition
+            return fuse_any(conditions)
         
-        return data
+        return None
     
-    async def _apply_condition(self, data: List, condition: Union[LogicalFilter, Dict[str, Any]], 
-                        entity_type: EntityType) -> List:
-        """Apply a single condition (can be logical or simple filter)"""
+    async def _compile_condition(self, condition: Union[LogicalFilter, Dict[str, Any]], 
+                                 entity_type: EntityType) -> Optional[Predicate]:
+        """Compile a single condition (can be logical or simple filter)"""
         
         if isinstance(condition, LogicalFilter):
-            return await self._apply_single_logical_filter(data, condition, entity_type)
+            return await self._compile_logical_filter(condition, entity_type)
         
         elif isinstance(condition, dict):
-            # Convert dict condition to FilterSet and apply
-            temp_filter_set = self.parse_prompt_filters(condition)
-            return await self._apply_filterset_to_data(data, temp_filter_set, entity_type)
-        
-        return data
-    
-    async def _apply_filterset_to_data(self, data: List, filter_set: FilterSet, entity_type: EntityType) -> List:
-        """Apply a FilterSet to data (helper method)"""
-        result = data
-        
-        if filter_set.period_filter:
-            result = self._apply_period_filter(result, filter_set.period_filter)
-        
-        if filter_set.cross_entity_filters:
-            result = await self._apply_cross_entity_filters(result, filter_set.cross_entity_filters, entity_type)
-        
-        if filter_set.entity_filters:
-            result = self._apply_entity_filters(result, filter_set.entity_filters)
+            # Convert dict condition to FilterSet and compile it
+            return await self._compile_filter_set(self.parse_prompt_filters(condition), entity_type)
         
-        return result
+        return None
     
     async def _fetch_base_data(self, entity_type: EntityType) -> List:
         """Fetch base data for an entity type"""